@@ -1,18 +1,16 @@
 import streamlit as st
 import streamlit.components.v1 as components
 import os
-import pandas as pd
 import base64
 import json
+import uuid
 from dotenv import load_dotenv
 
-# --- IMPORT AGENT CLASSES ---
-from src.agent_logic import CodeReviewAgent
-from src.test_agent_logic import TestGenAgent
-from src.sql_agent_logic import BigQueryAgent
-from src.mongo_agent_logic import MongoAgent
-from src.diagram_agent_logic import ClassDiagramAgent
-from src.dependency_agent_logic import DependencyInspectorAgent
+# --- AGENT REGISTRY (agent modules, pandas and provider SDKs are imported on demand) ---
+from src.registry import agent_labels, kind_of, open_agent
+from src.shared.mongo_schema import is_collection_export
+from src.shared.agent_pool import AgentPool
+from src.shared.jobs import JobManager, DONE, FAILED
 
 load_dotenv()
 st.set_page_config(page_title="Smart Developer Assistant", layout="wide")
@@ -66,27 +64,117 @@ def clean_code_output(text: str) -> str:
     return text.replace("```java", "").replace("```sql", "").replace("```json", "").replace("```", "").strip()
 
 
+# --- HELPER: Background Jobs ---
+@st.cache_resource
+def get_job_manager():
+    """One worker pool shared by every session of this app instance."""
+    return JobManager(max_workers=int(os.getenv("AI_WORKSTATION_JOB_WORKERS", "4")))
+
+
+jobs = get_job_manager()
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+    st.session_state.jobs = {}  # UI slot (e.g. "review") -> job id
+    st.session_state.collected_jobs = set()
+
+
+# --- HELPER: Shared Agents ---
+@st.cache_resource
+def get_agent_pool():
+    """Prepared agents shared by every session (AI_WORKSTATION_AGENT_POOL_SIZE / _MB bound it)."""
+    return AgentPool()
+
+
+def checkout_agent(kind: str, **kwargs):
+    """
+    Puts a fork of the shared agent for this context into the session (built on first use).
+    With AI_WORKSTATION_SERVICE_URL set the agent lives on the agent service and this page is a thin client.
+    """
+    if os.getenv("AI_WORKSTATION_SERVICE_URL"):
+        previous = st.session_state.get("agent")
+        if hasattr(previous, "close"):
+            previous.close()  # Re-initialized: release the old session on the service
+        agent = open_agent(kind, **kwargs)
+        reused = agent.reused
+    else:
+        agent, reused = get_agent_pool().checkout(kind, **kwargs)
+    st.session_state.agent = agent
+    if reused:
+        st.caption("♻️ Reusing the prepared context of another session")
+
+
+def start_job(slot: str, name: str, operation):
+    """Submits `operation(job)` to the pool; its result is collected by `watch_job(slot, ...)`."""
+    job = jobs.submit(name, operation, owner=st.session_state.session_id)
+    st.session_state.jobs[slot] = job.id
+    st.rerun()  # Redraw with the buttons of busy slots disabled
+
+
+def current_job(slot: str):
+    job_id = st.session_state.jobs.get(slot)
+    return jobs.get(job_id) if job_id else None
+
+
+def job_running(*slots: str) -> bool:
+    return any(job is not None and not job.finished for job in map(current_job, slots))
+
+
+def watch_job(slot: str, on_done, render_partial=None):
+    """
+    While the slot's job runs, shows its progress (polled every second without rerunning the page)
+    and its partial results. Once it finishes, hands the result to `on_done` exactly once.
+    """
+    job = current_job(slot)
+    if job is None:
+        return
+
+    if job.finished:
+        if job.id not in st.session_state.collected_jobs:
+            st.session_state.collected_jobs.add(job.id)
+            if job.status == DONE:
+                on_done(job.result)
+            elif job.status == FAILED:
+                st.error(f"❌ {job.name} failed: {job.error}")
+            else:
+                st.warning(f"⏹️ {job.name} was cancelled.")
+        return
+
+    @st.fragment(run_every="1s")
+    def poll():
+        if job.finished:
+            st.rerun()  # Full rerun: collect the result and re-enable the buttons
+        text = f"⏳ {job.name} ({job.elapsed:.0f}s)" + (f" — {job.message}" if job.message else "")
+        if job.cancel_requested:
+            text = f"⏹️ {job.name}: cancel requested, waiting for the current model call to return ({job.elapsed:.0f}s)"
+        st.progress(job.progress or 0.0, text=text)
+        if st.button("✖️ Cancel", key=f"cancel_{job.id}", disabled=job.cancel_requested):
+            job.cancel()
+        if render_partial:
+            render_partial(job.snapshot_partial())
+
+    poll()
+
+
 # --- SIDEBAR CONFIGURATION ---
 with st.sidebar:
     st.header("⚙️ Configuration")
-    provider = st.selectbox("AI Model", ["ollama (qwen2.5-coder:14b)", "google (gemini-3-flash)"], index=0)
+    provider = st.selectbox("AI Model",
+                            ["ollama (qwen2.5-coder:14b)", "google (gemini-3-flash)", "replay (recorded fixtures)"],
+                            index=0)
 
-    agent_type = st.radio("Select Agent Role", [
-        "🕵️‍♂️ Code Reviewer",
-        "🧪 Unit Test Generator",
-        "📊 Class Diagram Generator",
-        "📦 Dependency Inspector",
-        "💾 Text-to-BigQuery",
-        "🍃 Text-to-MongoDB"
-    ])
+    agent_type = st.radio("Select Agent Role", agent_labels())
 
     # --- DYNAMIC INPUT TOGGLING ---
     repo_path = None
     uploaded_schema = None
 
     # Group 1: Data Agents (Need Schema, NOT Project Root)
-    if agent_type in ["💾 Text-to-BigQuery", "🍃 Text-to-MongoDB"]:
+    if agent_type == "💾 Text-to-BigQuery":
         uploaded_schema = st.file_uploader("Upload Schema File", type=["sql", "json"])
+    elif agent_type == "🍃 Text-to-MongoDB":
+        # Sample-document schema (.json) and/or full collection exports (NDJSON / JSON array, one file per collection)
+        uploaded_schema = st.file_uploader("Upload Schema or Collection Exports", type=["json", "ndjson", "jsonl"],
+                                           accept_multiple_files=True)
 
     # Group 2: Code Agents (Need Project Root, NOT Schema)
     else:
@@ -98,13 +186,21 @@ with st.sidebar:
 
             # CASE 1: Data Agents (Validate Schema Path)
             if agent_type in ["💾 Text-to-BigQuery", "🍃 Text-to-MongoDB"]:
-                if uploaded_schema is not None:
-                    schema_content = uploaded_schema.getvalue().decode("utf-8")
+                if uploaded_schema:
                     if agent_type == "💾 Text-to-BigQuery":
-                        st.session_state.agent = BigQueryAgent(schema_content=schema_content, provider=provider)
+                        schema_content = uploaded_schema.getvalue().decode("utf-8")
+                        checkout_agent("bigquery", schema_content=schema_content, provider=provider)
                         st.success(f"✅ BigQuery Agent Initialized")
                     elif agent_type == "🍃 Text-to-MongoDB":
-                        st.session_state.agent = MongoAgent(schema_content=schema_content, provider=provider)
+                        schema_content, collections = "", {}
+                        for uploaded_file in uploaded_schema:
+                            if is_collection_export(uploaded_file):
+                                collections[os.path.splitext(uploaded_file.name)[0]] = uploaded_file
+                            else:
+                                schema_content = uploaded_file.getvalue().decode("utf-8")
+                        with st.spinner("Profiling collections..."):
+                            checkout_agent("mongo", schema_content=schema_content, provider=provider,
+                                           collections=collections)
                         st.success(f"✅ Text-to-MongoDB Initialized")
                 else:
                     st.error(f"❌ Please upload a schema file.")
@@ -115,19 +211,19 @@ with st.sidebar:
                     st.session_state.repo_path = repo_path
 
                     if agent_type == "📦 Dependency Inspector":
-                        st.session_state.agent = DependencyInspectorAgent(provider=provider)
+                        checkout_agent("deps", provider=provider)
                         st.success("✅ Dependency Inspector Initialized")
 
                     elif agent_type == "🕵️‍♂️ Code Reviewer":
-                        st.session_state.agent = CodeReviewAgent(repo_path=repo_path, provider=provider)
+                        checkout_agent("review", repo_path=repo_path, provider=provider)
                         st.success("✅ Code Reviewer Initialized")
 
                     elif agent_type == "🧪 Unit Test Generator":
-                        st.session_state.agent = TestGenAgent(repo_path=repo_path, provider=provider)
+                        checkout_agent("tests", repo_path=repo_path, provider=provider)
                         st.success("✅ Unit Test Generator Initialized")
 
                     elif agent_type == "📊 Class Diagram Generator":
-                        st.session_state.agent = ClassDiagramAgent(repo_path=repo_path, provider=provider)
+                        checkout_agent("diagram", repo_path=repo_path, provider=provider)
                         st.success("✅ Class Diagram Generator Initialized")
                 else:
                     st.error(f"❌ Project path not found: {repo_path}")
@@ -135,30 +231,81 @@ with st.sidebar:
         except Exception as e:
             st.error(f"Failed to initialize: {str(e)}")
 
+    # --- PROMPT CONTEXT (code agents compact the sources they send) ---
+    compaction = getattr(st.session_state.get("agent"), "compaction", None)
+    if compaction:
+        original = sum(row["original_tokens"] for row in compaction)
+        saved = sum(row["saved_tokens"] for row in compaction)
+        with st.expander(f"✂️ Context: {original - saved} tokens (-{100 * saved / max(original, 1):.0f}%)"):
+            for row in compaction:
+                st.caption(f"{os.path.basename(row['file'])}: {row['original_tokens']} → {row['compacted_tokens']} "
+                           f"(-{row['saved_pct']}%, -{row['saved_pct_chars']}% by characters)")
+
+    # --- AGENT SERVICE QUEUE ---
+    service_agent = st.session_state.get("agent")
+    if hasattr(service_agent, "handle"):
+        try:
+            metrics = service_agent.client.metrics()
+        except Exception as e:
+            st.warning(f"🚦 Agent service unreachable: {e}")
+        else:
+            with st.expander(f"🚦 Queue: {metrics['queued']} waiting, {metrics['running']} running"):
+                for lane, row in metrics["lanes"].items():
+                    if row["completed"] or row["queued"] or row["running"]:
+                        p95 = row["wait_s"]["p95"]
+                        st.caption(f"{lane}: {row['running']}/{row['limit']} running, {row['queued']} queued"
+                                   + (f", wait p95 {p95:.1f}s" if p95 is not None else ""))
+
+    # --- JOBS OF THIS SESSION ---
+    session_jobs = jobs.jobs(owner=st.session_state.session_id)
+    if session_jobs:
+        st.divider()
+        st.subheader("🧵 Jobs")
+        for job in session_jobs[:10]:
+            st.caption(f"{job.name}: **{job.status_label}** ({job.elapsed:.0f}s)")
+
 # --- MAIN CONTENT ROUTING ---
 if "agent" in st.session_state:
     agent = st.session_state.agent
+    kind = kind_of(agent)
 
     # 1. DEPENDENCY INSPECTOR
-    if isinstance(agent, DependencyInspectorAgent):
+    if kind == "deps":
+        import pandas as pd
+        from src.shared.dependency_report import load_report, outdated_over_time
+
         st.header("📦 Dependency Inspector")
         col1, col2 = st.columns([1, 2])
         with col1:
-            if st.button("🔍 Check for Latest Versions", type="primary"):
-                with st.spinner("Querying Maven Central..."):
-                    df = agent.check_project_dependencies(st.session_state.repo_path)
-                    if not df.empty:
-                        report_path = "dependency_report.parquet"
-                        df.to_parquet(report_path, engine='pyarrow')
-                        st.session_state.last_report = report_path
-                    else:
-                        st.warning("No dependencies found.")
+            agent.maven.offline = st.toggle("📴 Offline (cache only)", value=agent.maven.offline)
+            if st.button("🔍 Check for Latest Versions", type="primary", disabled=job_running("maven")):
+                def check_versions(job, agent=agent, repo_path=st.session_state.repo_path):
+                    def report(done, total, row):
+                        job.report(done / total, f"Checked {done}/{total}: {row['package']}", partial=row)
+
+                    df = agent.check_project_dependencies(repo_path, progress_callback=report)
+                    return agent.write_report(df) if not df.empty else None
+
+                start_job("maven", "Maven version check", check_versions)
+
+        def collect_report(report_path):
+            if report_path:
+                st.session_state.last_report = report_path
+            else:
+                st.warning("No dependencies found.")
+
+        def show_checked(rows):
+            if rows:
+                st.dataframe(pd.DataFrame(rows)[['package', 'module', 'version', 'latest_version', 'status']],
+                             width="stretch", hide_index=True)
+
+        watch_job("maven", collect_report, render_partial=show_checked)
 
         if "last_report" in st.session_state:
             st.divider()
-            report_df = pd.read_parquet(st.session_state.last_report)
-            details = pd.json_normalize(report_df['Current'])
-            final_df = pd.concat([report_df['Package'], details], axis=1)
+            report_df = load_report(st.session_state.last_report)
+            final_df = report_df[['package', 'module', 'version', 'latest_version', 'status', 'source', 'stale',
+                                  'mvn_link']]
 
             st.subheader("📊 Version Drift Analysis")
 
@@ -179,23 +326,32 @@ if "agent" in st.session_state:
                     "status": st.column_config.TextColumn("Status"),
                 }
             )
+
+            # Same coordinate declared with different versions across modules
+            if report_df['module'].nunique() > 1:
+                st.subheader("🧩 Module Drift Matrix")
+                st.dataframe(agent.drift_matrix(report_df), width="stretch", hide_index=True)
             st.info(agent.interpret_report(st.session_state.last_report))
 
+            with st.expander("📈 Drift Over Time"):
+                history = outdated_over_time(os.path.dirname(st.session_state.last_report))
+                st.line_chart(history, x="checked_at", y=["outdated", "total"])
+
     # 2. CODE REVIEWER
-    elif isinstance(agent, CodeReviewAgent):
+    elif kind == "review":
         st.header("🕵️‍♂️ Code Reviewer")
         st.info(f"Scanning: `{st.session_state.repo_path}`")
         col1, col2 = st.columns([1, 1])
         with col1:
-            if st.button("⚡ Run Static Analysis"):
-                with st.spinner("Analyzing code..."):
-                    review = agent.ask("Review the staged code.")
-                    st.session_state.review_result = review
+            # Review and auto-fix share the agent's chat session: one at a time
+            if st.button("⚡ Run Static Analysis", disabled=job_running("review", "fix")):
+                start_job("review", "Code review", lambda job, agent=agent: agent.ask("Review the staged code."))
         with col2:
-            if st.button("🛠️ Auto-Fix Issues"):
-                with st.spinner("Applying fixes..."):
-                    fix = agent.fix_issues()
-                    st.session_state.fix_result = clean_code_output(fix)
+            if st.button("🛠️ Auto-Fix Issues", disabled=job_running("review", "fix")):
+                start_job("fix", "Auto-fix", lambda job, agent=agent: clean_code_output(agent.fix_issues()))
+
+        watch_job("review", lambda review: st.session_state.update(review_result=review))
+        watch_job("fix", lambda fix: st.session_state.update(fix_result=fix))
 
         if "review_result" in st.session_state:
             st.subheader("📝 Review Report")
@@ -205,25 +361,27 @@ if "agent" in st.session_state:
             st.code(st.session_state.fix_result, language='java')
 
     # 3. UNIT TEST GENERATOR
-    elif isinstance(agent, TestGenAgent):
+    elif kind == "tests":
         st.header("🧪 Unit Test Generator")
         st.info(f"Target: `{st.session_state.repo_path}`")
-        if st.button("Generate JUnit 5 Tests"):
-            with st.spinner("Writing tests..."):
-                tests = agent.generate_tests()
-                st.code(clean_code_output(tests), language='java')
+        if st.button("Generate JUnit 5 Tests", disabled=job_running("tests")):
+            start_job("tests", "Test generation", lambda job, agent=agent: clean_code_output(agent.generate_tests()))
+
+        watch_job("tests", lambda tests: st.session_state.update(generated_tests=tests))
+        if st.session_state.get("generated_tests"):
+            st.code(st.session_state.generated_tests, language='java')
 
     # 4. CLASS DIAGRAM GENERATOR
-    elif isinstance(agent, ClassDiagramAgent):
+    elif kind == "diagram":
         st.header("📊 Class Diagram Generator")
 
         if "diagram_code" not in st.session_state:
             st.session_state.diagram_code = None
 
-        if st.button("Generate Mermaid Diagram", type="primary"):
-            with st.spinner("Parsing Java classes..."):
-                code = agent.generate_diagram()
-                st.session_state.diagram_code = code
+        if st.button("Generate Mermaid Diagram", type="primary", disabled=job_running("diagram")):
+            start_job("diagram", "Class diagram", lambda job, agent=agent: agent.generate_diagram())
+
+        watch_job("diagram", lambda code: st.session_state.update(diagram_code=code))
 
         if st.session_state.diagram_code:
             st.divider()
@@ -242,28 +400,86 @@ if "agent" in st.session_state:
                 st.code(st.session_state.diagram_code, language='mermaid')
 
     # 5. BIGQUERY AGENT
-    elif isinstance(agent, BigQueryAgent):
+    elif kind == "bigquery":
+        import pandas as pd
+
         st.header("💾 Text-to-BigQuery")
         question = st.text_area("Ask a question about your BigQuery data:")
         if st.button("Generate SQL"):
             if question:
                 with st.spinner("Generating SQL..."):
                     sql = agent.ask(question)
-                    st.code(clean_code_output(sql), language='sql')
+                    st.session_state.generated_sql = clean_code_output(sql)
+                    st.session_state.pop("dry_run_report", None)
             else:
                 st.warning("Please enter a question.")
 
+        if st.session_state.get("generated_sql"):
+            st.code(st.session_state.generated_sql, language='sql')
+
+            if st.button("🦆 Dry Run (Offline)"):
+                with st.spinner("Running against the local replica..."):
+                    st.session_state.dry_run_report = agent.dry_run(st.session_state.generated_sql)
+
+        if "dry_run_report" in st.session_state:
+            report = st.session_state.dry_run_report
+            if report["ok"]:
+                st.success(f"✅ Query runs offline ({report['row_count']} synthetic rows returned)")
+            else:
+                st.error(f"❌ {report['error']}")
+
+            for finding in report.get("partition_filters", []):
+                if finding["pruned"]:
+                    st.success(f"🗂️ `{finding['table']}` is filtered on its partition (`{finding['partition_by']}`)")
+                else:
+                    st.warning(f"💸 `{finding['table']}` is partitioned by `{finding['partition_by']}` "
+                               f"but the query does not filter on it: full table scan")
+
+            if report.get("result_schema"):
+                st.dataframe(pd.DataFrame(report["result_schema"], columns=["Column", "Type"]), hide_index=True)
+            if report.get("scanned_columns"):
+                st.caption("Columns scanned: " + "; ".join(
+                    f"{table}: {', '.join(cols)}" for table, cols in report["scanned_columns"].items()))
+            if report.get("plan"):
+                with st.expander("Plan (DuckDB)"):
+                    st.text(report["plan"])
+
     # 6. MONGODB AGENT
-    elif isinstance(agent, MongoAgent):
+    elif kind == "mongo":
+        import pandas as pd
+
         st.header("🍃 Text-to-MongoDB")
         question = st.text_area("Ask a question about your MongoDB collections:")
         if st.button("Generate Query"):
             if question:
                 with st.spinner("Generating Mongo Shell query..."):
-                    query = agent.ask(question)
-                    st.code(clean_code_output(query), language='javascript')
+                    st.session_state.mongo_answer = agent.answer(question)
+                    st.session_state.mongo_preview = None
+                    if not st.session_state.mongo_answer["errors"]:
+                        st.session_state.mongo_preview = agent.preview(st.session_state.mongo_answer["query"])
             else:
                 st.warning("Please enter a question.")
 
+        if st.session_state.get("mongo_answer"):
+            answer = st.session_state.mongo_answer
+            for error in answer["errors"]:
+                st.error(f"❌ {error}")
+            st.code(answer["query"], language='javascript')
+
+            for note in answer.get("notes", []):
+                st.caption(f"⚙️ {note}")
+            for index in answer.get("indexes", []):
+                st.info(f"🗂️ Suggested index: `{index['shell']}`")
+
+            preview = st.session_state.get("mongo_preview")
+            if preview:
+                st.subheader("👀 Preview on Sample Documents")
+                if preview["error"]:
+                    st.warning(preview["error"])
+                elif preview["rows"]:
+                    st.dataframe(pd.json_normalize(preview["rows"]), hide_index=True)
+                else:
+                    st.caption("No sample documents match this query.")
+
 else:
     st.info("👈 Select an Agent Role in the sidebar and click **Initialize Agent** to begin.")
@@ -0,0 +1,42 @@
+"""
+Batch text-to-SQL / text-to-Mongo over a JSONL question file.
+
+    python ai_workstation/batch.py --agent bigquery --schema schema.sql \
+        --input questions.jsonl --output answers.jsonl --workers 4
+"""
+import argparse
+import json
+import sys
+
+from dotenv import load_dotenv
+
+from src.registry import open_agent
+from src.shared.batch_runner import run_batch
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions with a data agent.")
+    parser.add_argument("--agent", choices=["bigquery", "mongo"], required=True)
+    parser.add_argument("--schema", required=True, help="Schema file (.sql DDL or .json sample documents)")
+    parser.add_argument("--input", required=True, help="JSONL file with one question per line")
+    parser.add_argument("--output", required=True, help="JSONL file results are appended to")
+    parser.add_argument("--provider", default="ollama", help="ollama, google or replay")
+    parser.add_argument("--workers", type=int, default=4, help="Questions answered concurrently")
+    parser.add_argument("--retry-invalid", action="store_true", help="Re-run questions whose answer failed validation")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    with open(args.schema, "r", encoding="utf-8") as f:
+        schema_content = f.read()
+
+    # On the agent service (AI_WORKSTATION_SERVICE_URL) the questions queue behind interactive traffic
+    agent = open_agent(args.agent, schema_content=schema_content, provider=args.provider, priority="bulk")
+
+    summary = run_batch(agent, args.input, args.output, max_workers=args.workers,
+                        retry_invalid=args.retry_invalid, agent_name=args.agent)
+    print(json.dumps(summary))
+    return 0 if summary["valid"] == summary["answered"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
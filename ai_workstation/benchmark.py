@@ -0,0 +1,270 @@
+"""
+End-to-end agent benchmark on fixture repositories and the bundled schemas, no model or network needed.
+
+    python ai_workstation/benchmark.py
+    python ai_workstation/benchmark.py --runs 5 --only sql:car_sales --decode-ms 20
+    python ai_workstation/benchmark.py --update-baseline
+
+Models are replayed from benchmarks/fixtures/*.jsonl with simulated prefill / decode latency
+(--provider ollama|google measures the real thing, given matching prompts), Maven Central is a
+local stand-in serving benchmarks/fixtures/maven.json. Every scenario reports end-to-end latency,
+prompt / completion tokens and a phase breakdown, and is compared to benchmarks/baseline.json.
+Exit code 1 when a scenario regressed beyond --tolerance.
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+FIXTURES = os.path.join(HERE, "benchmarks", "fixtures")
+DEFAULT_BASELINE = os.path.join(HERE, "benchmarks", "baseline.json")
+
+sys.path.insert(0, HERE)
+from src.registry import create_agent  # noqa: E402
+from src.shared.llm_clients import track_usage  # noqa: E402
+
+
+# --- SCENARIOS ---
+# "run" receives the agent and the fixture repo path
+def _ask_all(questions):
+    return lambda agent, repo_path: [agent.answer(question) for question in questions]
+
+
+SCENARIOS = {
+    "review": {"kind": "review",
+               "run": lambda agent, repo_path: (agent.ask("Review the staged code."), agent.fix_issues())},
+    "tests": {"kind": "tests", "run": lambda agent, repo_path: agent.generate_tests()},
+    "diagram": {"kind": "diagram", "run": lambda agent, repo_path: agent.generate_diagram()},
+    "deps": {"kind": "deps", "run": lambda agent, repo_path: list(agent.iter_dependency_checks(repo_path))},
+    "sql:ecommerce": {"kind": "bigquery", "schema": "schema.sql", "run": _ask_all([
+        "Top 10 customers by total revenue",
+        "Units sold per product category in the last 30 days",
+        "How many prime members signed up per country in 2024?",
+    ])},
+    "sql:car_sales": {"kind": "bigquery", "schema": "car_sales.sql", "run": _ask_all([
+        "Total sales revenue per employee",
+        "Which available cars cost less than 30000?",
+        "Monthly number of cars sold by payment method",
+    ])},
+    "mongo:ecommerce": {"kind": "mongo", "schema": "schema.json", "run": _ask_all([
+        "How many active users are there per city?",
+        "Shipped orders over 100",
+        "Best selling products by quantity",
+    ])},
+    "mongo:car_sales": {"kind": "mongo", "schema": "car_sales.json", "run": _ask_all([
+        "Average price of available cars per make",
+        "Sales paid with financing",
+        "Number of sales per payment method",
+    ])},
+}
+
+
+# --- FIXTURES ---
+def build_fixture_repo(directory: str) -> str:
+    """Copies the fixture project into `directory` as a git repo with its Java sources staged."""
+    from git import Actor, Repo
+
+    repo_path = os.path.join(directory, "repo")
+    shutil.copytree(os.path.join(FIXTURES, "repo"), repo_path)
+    repo = Repo.init(repo_path)
+    repo.index.add(["build.gradle.kts", "gradle/libs.versions.toml"])
+    author = Actor("Benchmark", "benchmark@example.com")
+    repo.index.commit("Build files", author=author, committer=author)
+    java_files = [os.path.relpath(os.path.join(root, name), repo_path)
+                  for root, _, files in os.walk(os.path.join(repo_path, "src")) for name in files]
+    repo.index.add(sorted(java_files))
+    return repo_path
+
+
+class MavenStandIn:
+    """Local Maven Central search endpoint answering from benchmarks/fixtures/maven.json."""
+
+    def __init__(self, latency_ms: float = 0):
+        with open(os.path.join(FIXTURES, "maven.json"), "r", encoding="utf-8") as f:
+            versions = json.load(f)
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(latency_ms / 1000)
+                query = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+                terms = dict(part.split(":", 1) for part in query.split(" AND ") if ":" in part)
+                version = versions.get(f"{terms.get('g')}:{terms.get('a')}")
+                docs = [{"latestVersion": version}] if version else []
+                body = json.dumps({"response": {"docs": docs}}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/solrsearch/select"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# --- MEASUREMENT ---
+def run_scenario(name: str, provider: str, repo_path: str) -> dict:
+    """One cold run: fresh cache directory (no question / version cache hits), new agent."""
+    spec = SCENARIOS[name]
+    with tempfile.TemporaryDirectory(prefix="ai-bench-cache-") as cache_dir:
+        os.environ["AI_WORKSTATION_CACHE_DIR"] = cache_dir
+        kwargs = {"provider": provider}
+        if "schema" in spec:
+            with open(os.path.join(ROOT, spec["schema"]), "r", encoding="utf-8") as f:
+                kwargs["schema_content"] = f.read()
+        elif spec["kind"] != "deps":
+            kwargs["repo_path"] = repo_path
+
+        with track_usage() as calls:
+            started = time.perf_counter()
+            agent = create_agent(spec["kind"], **kwargs)
+            setup_s = time.perf_counter() - started
+            setup_calls = len(calls)
+
+            started = time.perf_counter()
+            spec["run"](agent, repo_path)
+            run_s = time.perf_counter() - started
+
+    run_calls = calls[setup_calls:]
+    prefill_s = sum(call["prefill_s"] or 0 for call in run_calls)
+    decode_s = sum(call["decode_s"] or 0 for call in run_calls)
+    model_s = sum(call["total_s"] for call in run_calls)
+    return {
+        "total_s": setup_s + run_s,
+        "phases": {
+            "setup_s": setup_s,  # Repo scan, linting, schema parsing / profiling, session start
+            "prefill_s": prefill_s,
+            "decode_s": decode_s,
+            "model_other_s": max(0.0, model_s - prefill_s - decode_s),
+            # Validation, repair bookkeeping, dry runs, Maven lookups (parallel repair calls can overlap)
+            "agent_s": max(0.0, run_s - model_s),
+        },
+        "calls": len(calls),
+        "prompt_tokens": sum(call["prompt_tokens"] for call in calls),
+        "cached_tokens": sum(call["cached_tokens"] for call in calls),
+        "completion_tokens": sum(call["completion_tokens"] for call in calls),
+    }
+
+
+def measure(name: str, provider: str, repo_path: str, runs: int) -> dict:
+    samples = [run_scenario(name, provider, repo_path) for _ in range(runs)]
+    median = lambda values: round(statistics.median(values), 4)
+    result = {key: samples[-1][key] for key in ("calls", "prompt_tokens", "cached_tokens", "completion_tokens")}
+    result["total_s"] = median([s["total_s"] for s in samples])
+    result["phases"] = {phase: median([s["phases"][phase] for s in samples]) for phase in samples[0]["phases"]}
+    return result
+
+
+# --- BASELINE ---
+def compare(results: dict, baseline: dict, tolerance: float, min_delta_s: float) -> list:
+    """Regressions against the baseline: slower end-to-end or more tokens beyond the tolerance."""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        slower = result["total_s"] - previous["total_s"]
+        if slower > min_delta_s and result["total_s"] > previous["total_s"] * (1 + tolerance):
+            regressions.append(f"{name}: {previous['total_s']:.3f}s -> {result['total_s']:.3f}s")
+        for key in ("prompt_tokens", "completion_tokens"):
+            if result[key] > previous[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {previous[key]} -> {result[key]}")
+    return regressions
+
+
+def delta(current: float, previous) -> str:
+    if not previous:
+        return "   new"
+    return f"{(current - previous) / previous * 100:+6.1f}%"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark every agent end to end against recorded model replies.")
+    parser.add_argument("--provider", default="replay", help="replay (default), ollama or google")
+    parser.add_argument("--runs", type=int, default=3, help="Cold runs per scenario (median is reported)")
+    parser.add_argument("--only", action="append", choices=list(SCENARIOS), help="Run only these scenarios")
+    parser.add_argument("--prefill-ms", type=float, default=0.1, help="Simulated prefill time per prompt token")
+    parser.add_argument("--decode-ms", type=float, default=2.0, help="Simulated decode time per generated token")
+    parser.add_argument("--maven-latency-ms", type=float, default=20, help="Latency of the Maven stand-in")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline file to compare with / update")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression (0.25 = 25%%)")
+    parser.add_argument("--min-delta", type=float, default=0.05, help="Ignore slow-downs below this many seconds")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args(argv)
+
+    settings = {"provider": args.provider, "prefill_ms": args.prefill_ms, "decode_ms": args.decode_ms,
+                "maven_latency_ms": args.maven_latency_ms}
+    os.environ["AI_WORKSTATION_REPLAY_PREFILL_MS"] = str(args.prefill_ms)
+    os.environ["AI_WORKSTATION_REPLAY_DECODE_MS"] = str(args.decode_ms)
+    os.environ.pop("MAVEN_OFFLINE", None)
+    maven = MavenStandIn(latency_ms=args.maven_latency_ms)
+    os.environ["MAVEN_SEARCH_URL"] = maven.url
+
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory(prefix="ai-bench-repo-") as directory:
+            repo_path = build_fixture_repo(directory)
+            for name in SCENARIOS:
+                if args.only and name not in args.only:
+                    continue
+                print(f"⏱️ benchmark: {name}...", file=sys.stderr)
+                with contextlib.redirect_stdout(sys.stderr):  # Agent logs stay out of the report
+                    results[name] = measure(name, args.provider, repo_path, args.runs)
+    finally:
+        maven.close()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    if baseline and baseline.get("settings") != settings:
+        print(f"⚠️ benchmark: Baseline was recorded with {baseline.get('settings')}", file=sys.stderr)
+    regressions = compare(results, baseline, args.tolerance, args.min_delta)
+
+    if args.json:
+        print(json.dumps({"settings": settings, "scenarios": results, "regressions": regressions}, indent=2))
+    else:
+        previous = baseline.get("scenarios", {})
+        print(f"{'scenario':<16} {'total':>8} {'vs base':>8} {'setup':>7} {'prefill':>8} {'decode':>7} "
+              f"{'agent':>7} {'calls':>5} {'prompt':>7} {'cached':>7} {'compl.':>6}")
+        for name, r in results.items():
+            p = r["phases"]
+            print(f"{name:<16} {r['total_s']:>7.3f}s {delta(r['total_s'], previous.get(name, {}).get('total_s')):>8} "
+                  f"{p['setup_s']:>6.3f}s {p['prefill_s']:>7.3f}s {p['decode_s']:>6.3f}s {p['agent_s']:>6.3f}s "
+                  f"{r['calls']:>5} {r['prompt_tokens']:>7} {r['cached_tokens']:>7} {r['completion_tokens']:>6}")
+        for regression in regressions:
+            print(f"❌ {regression}")
+
+    if args.update_baseline:
+        merged = dict(baseline.get("scenarios", {})) if baseline.get("settings") == settings else {}
+        merged.update(results)
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"settings": settings, "scenarios": merged}, f, indent=2)
+            f.write("\n")
+        print(f"💾 benchmark: Baseline written to {args.baseline}", file=sys.stderr)
+        return 0
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,12 @@
+plugins {
+    java
+}
+
+dependencies {
+    implementation(libs.spring.boot.starter.web)
+    implementation(libs.spring.boot.starter.jdbc)
+    implementation(libs.jackson.databind)
+    implementation(libs.guava)
+    implementation("org.postgresql:postgresql:42.6.0")
+    testImplementation(libs.junit.jupiter)
+}
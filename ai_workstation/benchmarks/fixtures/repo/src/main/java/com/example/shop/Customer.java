@@ -0,0 +1,164 @@
+/*
+ * Copyright 2024 Example Shop Inc.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *      https://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+package com.example.shop;
+
+import java.time.LocalDate;
+import java.util.Objects;
+
+/**
+ * A registered customer of the shop.
+ *
+ * <p>Customers are created at sign-up and are never deleted; inactive
+ * customers are flagged instead.</p>
+ *
+ * @since 1.0
+ */
+public class Customer {
+
+    /** The e-mail address, unique per customer. */
+    private String email;
+
+    /** Display name. */
+    private String name;
+
+    /** Date of the sign-up. */
+    private LocalDate signupDate;
+
+    /** Whether the customer can still place orders. */
+    private boolean active;
+
+    @java.lang.SuppressWarnings("all")
+    @lombok.Generated
+    public Customer() {
+    }
+
+    /**
+     * Returns the e-mail address.
+     *
+     * @return the e-mail address
+     */
+    @java.lang.SuppressWarnings("all")
+    @lombok.Generated
+    public String getEmail() {
+        return this.email;
+    }
+
+    /**
+     * Sets the e-mail address.
+     *
+     * @param email the e-mail address
+     */
+    @java.lang.SuppressWarnings("all")
+    @lombok.Generated
+    public void setEmail(final String email) {
+        this.email = email;
+    }
+
+    /**
+     * Returns the display name.
+     *
+     * @return the display name
+     */
+    @java.lang.SuppressWarnings("all")
+    @lombok.Generated
+    public String getName() {
+        return this.name;
+    }
+
+    /**
+     * Sets the display name.
+     *
+     * @param name the display name
+     */
+    @java.lang.SuppressWarnings("all")
+    @lombok.Generated
+    public void setName(final String name) {
+        this.name = name;
+    }
+
+    /**
+     * Returns the sign-up date.
+     *
+     * @return the sign-up date
+     */
+    @java.lang.SuppressWarnings("all")
+    @lombok.Generated
+    public LocalDate getSignupDate() {
+        return this.signupDate;
+    }
+
+    /**
+     * Sets the sign-up date.
+     *
+     * @param signupDate the sign-up date
+     */
+    @java.lang.SuppressWarnings("all")
+    @lombok.Generated
+    public void setSignupDate(final LocalDate signupDate) {
+        this.signupDate = signupDate;
+    }
+
+    /**
+     * Returns whether the customer is active.
+     *
+     * @return {@code true} when active
+     */
+    @java.lang.SuppressWarnings("all")
+    @lombok.Generated
+    public boolean isActive() {
+        return this.active;
+    }
+
+    /**
+     * Sets whether the customer is active.
+     *
+     * @param active the new state
+     */
+    @java.lang.SuppressWarnings("all")
+    @lombok.Generated
+    public void setActive(final boolean active) {
+        this.active = active;
+    }
+
+    // TODO: customers with the same e-mail but different case are considered different
+    @java.lang.Override
+    @java.lang.SuppressWarnings("all")
+    @lombok.Generated
+    public boolean equals(final java.lang.Object o) {
+        if (o == this) return true;
+        if (!(o instanceof Customer)) return false;
+        final Customer other = (Customer) o;
+        return Objects.equals(this.email, other.email);
+    }
+
+    @java.lang.Override
+    @java.lang.SuppressWarnings("all")
+    @lombok.Generated
+    public int hashCode() {
+        final int PRIME = 59;
+        int result = 1;
+        result = result * PRIME + (this.email == null ? 43 : this.email.hashCode());
+        return result;
+    }
+
+    @java.lang.Override
+    @java.lang.SuppressWarnings("all")
+    @lombok.Generated
+    public java.lang.String toString() {
+        return "Customer(email=" + this.email + ", name=" + this.name
+                + ", signupDate=" + this.signupDate + ", active=" + this.active + ")";
+    }
+}
@@ -0,0 +1,47 @@
+/*
+ * Copyright 2024 Example Shop Inc.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *      https://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+package com.example.shop;
+
+import java.math.BigDecimal;
+import java.time.Instant;
+import java.util.List;
+
+public class Order {
+    private final long id;
+    private final String customerEmail;
+    private final List<OrderLine> lines;
+    private final Instant createdAt;
+
+    public Order(long id, String customerEmail, List<OrderLine> lines, Instant createdAt) {
+        this.id = id;
+        this.customerEmail = customerEmail;
+        this.lines = lines;
+        this.createdAt = createdAt;
+    }
+
+    public long getId() { return id; }
+    public String getCustomerEmail() { return customerEmail; }
+    public List<OrderLine> getLines() { return lines; }
+    public Instant getCreatedAt() { return createdAt; }
+
+    public BigDecimal total() {
+        BigDecimal total = BigDecimal.ZERO;
+        for (OrderLine line : lines) {
+            total = total.add(line.getPrice().multiply(BigDecimal.valueOf(line.getQuantity())));
+        }
+        return total;
+    }
+}
@@ -0,0 +1,34 @@
+/*
+ * Copyright 2024 Example Shop Inc.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *      https://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+package com.example.shop;
+
+import java.math.BigDecimal;
+
+public class OrderLine {
+    private final String sku;
+    private final int quantity;
+    private final BigDecimal price;
+
+    public OrderLine(String sku, int quantity, BigDecimal price) {
+        this.sku = sku;
+        this.quantity = quantity;
+        this.price = price;
+    }
+
+    public String getSku() { return sku; }
+    public int getQuantity() { return quantity; }
+    public BigDecimal getPrice() { return price; }
+}
@@ -0,0 +1,25 @@
+/*
+ * Copyright 2024 Example Shop Inc.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *      https://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+package com.example.shop;
+
+import java.util.List;
+import java.util.Optional;
+
+public interface OrderRepository {
+    Optional<Order> findById(long id);
+    List<Order> findByCustomer(String customerEmail);
+    void save(Order order);
+}
@@ -0,0 +1,69 @@
+/*
+ * Copyright 2024 Example Shop Inc.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *      https://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+package com.example.shop;
+
+import java.math.BigDecimal;
+import java.sql.Connection;
+import java.sql.ResultSet;
+import java.sql.Statement;
+import java.util.ArrayList;
+import java.util.HashMap;
+import java.util.List;
+
+import org.springframework.beans.factory.annotation.Autowired;
+import org.springframework.stereotype.Service;
+
+@Service
+public class OrderService {
+
+    @Autowired
+    private OrderRepository repository;
+
+    @Autowired
+    private Connection connection;
+
+    private int retries = 3;
+
+    public BigDecimal customerTotal(String customerEmail) {
+        BigDecimal sum = BigDecimal.ZERO;
+        for (Order order : repository.findByCustomer(customerEmail)) {
+            sum = sum.add(order.total());
+        }
+        return sum;
+    }
+
+    public List<Long> searchByEmail(String email) throws Exception {
+        List<Long> ids = new ArrayList<>();
+        Statement statement = connection.createStatement();
+        ResultSet rs = statement.executeQuery("SELECT id FROM orders WHERE email = '" + email + "'");
+        while (rs.next()) {
+            ids.add(rs.getLong("id"));
+        }
+        return ids;
+    }
+
+    public String describe(Object value) {
+        String unused = "debug";
+        if (value instanceof Order) {
+            Order order = (Order) value;
+            return "Order " + order.getId();
+        } else if (value instanceof OrderLine) {
+            OrderLine line = (OrderLine) value;
+            return "Line " + line.getSku();
+        }
+        return "Unknown";
+    }
+}
@@ -0,0 +1,208 @@
+"""
+Headless entry point for every agent, with JSON output for CI and pre-commit hooks.
+
+    python ai_workstation/cli.py review ~/repos/api ~/repos/web --jobs 2
+    python ai_workstation/cli.py deps ~/repos/api --fail-on-outdated --offline
+    python ai_workstation/cli.py sql --schema schema.sql "Top 10 customers by revenue"
+
+Exit codes: 0 success, 1 failing verdict (review REJECTED, invalid query, outdated
+dependencies with --fail-on-outdated), 2 usage error, 3 agent error.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from dotenv import load_dotenv
+
+from src.registry import open_agent
+
+EXIT_OK, EXIT_FAILED, EXIT_USAGE, EXIT_ERROR = 0, 1, 2, 3
+
+REPO_COMMANDS = ("review", "tests", "diagram", "deps")
+
+
+# --- REPOSITORY AGENTS (one task per repo, picklable for worker processes) ---
+def _review(repo, options):
+    from src.agent_logic import review_status
+    agent = open_agent("review", repo_path=repo, provider=options["provider"], priority=options.get("priority"))
+    review = agent.ask("Review the staged code.")
+    status = review_status(review)
+    result = {"status": status, "review": review}
+    if status is None:
+        # No verdict to gate on: fail closed (EXIT_ERROR) instead of letting the commit through
+        result.update({"ok": False, "error": "The review has no recognizable Status verdict."})
+        return result
+    if options.get("fix") and status != "APPROVED":
+        result["fix"] = agent.fix_issues()
+
+    failing = {"REJECTED", "CLEANUP REQUIRED"} if options.get("strict") else {"REJECTED"}
+    result["ok"] = status not in failing
+    return result
+
+
+def _tests(repo, options):
+    agent = open_agent("tests", repo_path=repo, provider=options["provider"], priority=options.get("priority"))
+    return {"ok": True, "tests": agent.generate_tests()}
+
+
+def _diagram(repo, options):
+    agent = open_agent("diagram", repo_path=repo, provider=options["provider"], priority=options.get("priority"))
+    return {"ok": True, "diagram": agent.generate_diagram()}
+
+
+def _deps(repo, options):
+    agent = open_agent("deps", provider=options["provider"], offline=options.get("offline"),
+                       priority=options.get("priority"))
+
+    # Streamed rows: no pandas unless a Parquet report is requested
+    rows = [row for _, _, row in sorted(agent.iter_dependency_checks(repo), key=lambda item: item[0])]
+    statuses = [row["status"] for row in rows]
+    summary = {
+        "total": len(rows),
+        "outdated": statuses.count("outdated"),
+        "unresolved": statuses.count("unresolved"),
+        "stale": sum(1 for row in rows if row["stale"]),
+    }
+    result = {"summary": summary, "dependencies": rows}
+    if options.get("report") and rows:
+        import pandas as pd
+        result["report"] = agent.write_report(pd.DataFrame(rows))
+
+    result["ok"] = not (options.get("fail_on_outdated") and summary["outdated"])
+    return result
+
+
+REPO_TASKS = {"review": _review, "tests": _tests, "diagram": _diagram, "deps": _deps}
+
+
+def run_repo_task(command, repo, options) -> dict:
+    """Runs one agent on one repository. Agent logs go to stderr so stdout stays valid JSON."""
+    started = time.perf_counter()
+    result = {"repo": repo}
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            if not os.path.isdir(repo):
+                raise FileNotFoundError(f"Project path not found: {repo}")
+            result.update(REPO_TASKS[command](repo, options))
+        except Exception as e:
+            result.update({"ok": False, "error": f"{type(e).__name__}: {e}"})
+    result["elapsed_s"] = round(time.perf_counter() - started, 2)
+    return result
+
+
+def run_repos(command, repos, options, jobs) -> list:
+    if jobs <= 1 or len(repos) == 1:
+        return [run_repo_task(command, repo, options) for repo in repos]
+    # Separate processes: agents are CPU-heavy to set up (git scans, linting, parsing) and hold
+    # per-repo sessions; each worker only imports the agent it runs
+    with ProcessPoolExecutor(max_workers=min(jobs, len(repos))) as pool:
+        return list(pool.map(run_repo_task, [command] * len(repos), repos, [options] * len(repos)))
+
+
+# --- DATA AGENTS ---
+def run_data_questions(command, args) -> list:
+    schema_content = ""
+    if args.schema:
+        with open(args.schema, "r", encoding="utf-8") as f:
+            schema_content = f.read()
+
+    results = []
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            if command == "sql":
+                agent = open_agent("bigquery", schema_content=schema_content, provider=args.provider,
+                                   priority=args.priority)
+            else:
+                collections = dict(item.split("=", 1) for item in args.collection or [])
+                agent = open_agent("mongo", schema_content=schema_content, provider=args.provider,
+                                   collections=collections, priority=args.priority)
+        except Exception as e:
+            return [{"question": q, "ok": False, "error": f"{type(e).__name__}: {e}"} for q in args.questions]
+
+        for question in args.questions:
+            started = time.perf_counter()
+            try:
+                answer = agent.answer(question)
+                result = {"question": question, "ok": not answer["errors"], **answer}
+            except Exception as e:
+                result = {"question": question, "ok": False, "error": f"{type(e).__name__}: {e}"}
+            result["elapsed_s"] = round(time.perf_counter() - started, 2)
+            results.append(result)
+    return results
+
+
+def exit_code(results) -> int:
+    if any("error" in r for r in results):
+        return EXIT_ERROR
+    if not all(r["ok"] for r in results):
+        return EXIT_FAILED
+    return EXIT_OK
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Run the workstation agents without the UI (JSON output).")
+    parser.add_argument("--provider", default=os.getenv("AI_WORKSTATION_PROVIDER", "ollama"), help="ollama, google or replay")
+    parser.add_argument("--output", help="Also write the JSON result to this file")
+    parser.add_argument("--pretty", action="store_true", help="Indent the JSON output")
+    parser.add_argument("--service", default=None, metavar="URL",
+                        help="Run the agents on the agent service at URL (default: AI_WORKSTATION_SERVICE_URL)")
+    parser.add_argument("--priority", default="bulk", choices=["interactive", "normal", "bulk"],
+                        help="Queue priority of the calls on the agent service")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def repo_command(name, help_text):
+        sub = commands.add_parser(name, help=help_text)
+        sub.add_argument("repos", nargs="+", help="Project root(s)")
+        sub.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Repositories processed in parallel")
+        return sub
+
+    review = repo_command("review", "Review the staged Java files (exit 1 when REJECTED)")
+    review.add_argument("--fix", action="store_true", help="Also generate fixes when not APPROVED")
+    review.add_argument("--strict", action="store_true", help="Fail on CLEANUP REQUIRED as well")
+    repo_command("tests", "Generate JUnit 5 tests for the staged files")
+    repo_command("diagram", "Generate a Mermaid class diagram")
+    deps = repo_command("deps", "Check dependencies against Maven Central")
+    deps.add_argument("--offline", action="store_true", default=None,
+                      help="Answer from the version cache only (default: MAVEN_OFFLINE)")
+    deps.add_argument("--fail-on-outdated", action="store_true", help="Exit 1 when a dependency is outdated")
+    deps.add_argument("--report", action="store_true", help="Also append the run to the Parquet report dataset")
+
+    for name, schema_help in (("sql", "BigQuery DDL (.sql)"), ("mongo", "Sample-document schema (.json)")):
+        sub = commands.add_parser(name, help=f"Text-to-{'BigQuery' if name == 'sql' else 'MongoDB'}")
+        sub.add_argument("--schema", required=name == "sql", help=schema_help)
+        sub.add_argument("questions", nargs="+")
+        if name == "mongo":
+            sub.add_argument("--collection", action="append", metavar="NAME=PATH",
+                             help="Collection export (NDJSON / JSON array) to profile")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    load_dotenv()
+    if args.service:
+        os.environ["AI_WORKSTATION_SERVICE_URL"] = args.service  # Inherited by the worker processes
+
+    if args.command in REPO_COMMANDS:
+        options = {key: value for key, value in vars(args).items() if key not in ("repos", "jobs", "command", "service")}
+        repos = [os.path.abspath(repo) for repo in args.repos]
+        results = run_repos(args.command, repos, options, args.jobs)
+    else:
+        results = run_data_questions(args.command, args)
+
+    code = exit_code(results)
+    output = json.dumps({"command": args.command, "exit_code": code, "results": results},
+                        indent=2 if args.pretty else None, ensure_ascii=False, default=str)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+Cold-start (import time) budget for the app and every agent.
+
+    python ai_workstation/import_budget.py
+    python ai_workstation/import_budget.py --runs 5 --scale 2 --budget app=1500
+
+Each target is measured in fresh interpreters (median of --runs). Exit code 1 when a
+target exceeds its budget; the heaviest imports of that target are listed to help.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from src.registry import AGENTS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Milliseconds, measured in-process (interpreter start-up excluded)
+DEFAULT_BUDGETS_MS = {
+    "app": 1200,
+    "agent:review": 400,
+    "agent:tests": 400,
+    "agent:diagram": 400,
+    "agent:deps": 400,
+    "agent:bigquery": 800,
+    "agent:mongo": 300,
+}
+
+TIMED = """
+import sys, time
+sys.path.insert(0, {here!r})
+t0 = time.perf_counter()
+{code}
+sys.__stdout__.write("IMPORT_MS=%.1f\\n" % ((time.perf_counter() - t0) * 1000))
+"""
+
+
+def target_code(target: str) -> str:
+    if target == "app":
+        # The whole script in Streamlit's bare mode: module imports plus the first render with no agent
+        return f"import runpy; runpy.run_path({os.path.join(HERE, 'app.py')!r}, run_name='__main__')"
+    kind = target.split(":", 1)[1]
+    return f"import {AGENTS[kind]['module']}"
+
+
+def measure(target: str, runs: int) -> float:
+    code = TIMED.format(here=HERE, code=target_code(target))
+    samples = []
+    for _ in range(runs):
+        completed = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True)
+        lines = [l for l in completed.stdout.splitlines() if l.startswith("IMPORT_MS=")]
+        if completed.returncode != 0 or not lines:
+            raise RuntimeError(f"{target} failed to start:\n{completed.stderr[-2000:]}")
+        samples.append(float(lines[-1].split("=", 1)[1]))
+    return statistics.median(samples)
+
+
+def heaviest_imports(target: str, top: int = 5) -> list:
+    """Third-party packages a target imports, by cumulative time (python -X importtime)."""
+    code = TIMED.format(here=HERE, code=target_code(target))
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=HERE,
+                               capture_output=True, text=True)
+    modules = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        if "." not in name and name != "src" and name not in sys.stdlib_module_names:
+            modules.append((int(cumulative) / 1000, name))
+    return sorted(modules, reverse=True)[:top]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Fail when the cold start of the app or an agent is over budget.")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per target (median is used)")
+    parser.add_argument("--scale", type=float, default=float(os.getenv("AI_WORKSTATION_IMPORT_BUDGET_SCALE", 1)),
+                        help="Multiply every budget (slow CI machines)")
+    parser.add_argument("--budget", action="append", default=[], metavar="TARGET=MS", help="Override one budget")
+    parser.add_argument("--only", action="append", help="Measure only these targets")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args(argv)
+
+    budgets = dict(DEFAULT_BUDGETS_MS)
+    for item in args.budget:
+        target, ms = item.split("=", 1)
+        budgets[target] = float(ms)
+
+    results = []
+    for target, budget in budgets.items():
+        if args.only and target not in args.only:
+            continue
+        elapsed = measure(target, args.runs)
+        limit = budget * args.scale
+        result = {"target": target, "ms": round(elapsed, 1), "budget_ms": round(limit, 1), "ok": elapsed <= limit}
+        if not result["ok"]:
+            result["heaviest"] = [{"module": name, "ms": round(ms, 1)} for ms, name in heaviest_imports(target)]
+        results.append(result)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            status = "✅" if result["ok"] else "❌"
+            print(f"{status} {result['target']:<16} {result['ms']:>8.1f} ms  (budget {result['budget_ms']:.0f} ms)")
+            for heavy in result.get("heaviest", []):
+                print(f"      {heavy['ms']:>8.1f} ms  {heavy['module']}")
+
+    return 0 if all(r["ok"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
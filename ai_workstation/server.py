@@ -0,0 +1,50 @@
+"""
+Local agent service: one process hosts the agents for the app, the CLI and batch runs.
+
+    python ai_workstation/server.py --port 8765
+    AI_WORKSTATION_SERVICE_URL=http://127.0.0.1:8765 streamlit run ai_workstation/app.py
+
+Calls are queued per model with a concurrency limit (AI_WORKSTATION_MODEL_CONCURRENCY, e.g.
+"qwen2.5-coder:14b=1,gemini-3-flash-preview=8") and served by priority: interactive (Text-to-SQL /
+MongoDB questions) before normal (review, tests, diagrams) before bulk (batch runs, CI).
+GET /v1/metrics reports queue depth, running requests and wait / run time percentiles per model.
+"""
+import argparse
+import json
+import os
+import sys
+
+from dotenv import load_dotenv
+
+from src.shared.agent_service import AgentService, DEFAULT_PORT, make_server
+from src.shared.scheduler import RequestScheduler, limits_from_env
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve the workstation agents behind a priority request queue.")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (the API has no authentication)")
+    parser.add_argument("--port", type=int, default=int(os.getenv("AI_WORKSTATION_SERVICE_PORT", DEFAULT_PORT)))
+    parser.add_argument("--concurrency", default=None, metavar="MODEL=N,...",
+                        help="Concurrent requests per model lane (default: AI_WORKSTATION_MODEL_CONCURRENCY)")
+    parser.add_argument("--max-batch", type=int, default=None,
+                        help="Queued requests on the same model and context run back to back (default 4)")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    scheduler = RequestScheduler(limits=limits_from_env(args.concurrency), max_batch=args.max_batch)
+    service = AgentService(scheduler=scheduler)
+    server = make_server(service, host=args.host, port=args.port)
+    print(f"🛰️ agent-service: Listening on http://{args.host}:{server.server_port}")
+    print(f"🚦 agent-service: Lanes {json.dumps(scheduler.limits)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
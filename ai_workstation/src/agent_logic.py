@@ -1,6 +1,19 @@
+import copy
+import re
+
+from src.shared.compactor import SourceCompactor
 from src.shared.git_utils import get_staged_files, read_file
 from src.shared.linter import run_static_analysis
-from src.shared.llm_clients import GoogleClient, OllamaClient
+from src.shared.llm_clients import create_client
+
+# Exactly one verdict, alone on its line: an echoed template line ("APPROVED / REJECTED / ...") is no verdict
+REVIEW_STATUS = re.compile(r"Status\W*(APPROVED|REJECTED|CLEANUP\s+REQUIRED)[^\w\n]*$", re.IGNORECASE | re.MULTILINE)
+
+
+def review_status(review: str):
+    """Verdict of a review: "APPROVED", "REJECTED", "CLEANUP REQUIRED" or None if the model omitted it."""
+    match = REVIEW_STATUS.search(review or "")
+    return " ".join(match.group(1).upper().split()) if match else None
 
 
 class CodeReviewAgent:
@@ -18,7 +31,9 @@ Your goal is to enforce modern standards and delete dead code.
 
 **CONTEXT:**
 The user has staged files. I have already run a regex scan for global issues.
-Review the code below.
+Review the code below. It is compacted (license headers and generated annotations removed, comments
+and imports collapsed); `N:` prefixes give the original line number of a line after a gap and on every
+5th line, count from the nearest one when you cite a line.
 
 **DATA:**
 {context_data}
@@ -107,23 +122,24 @@ Modernization Tips: Records, pattern matching, sealed classes, text blocks
 """
 
         # 3. CLIENT SETUP
-        if "google" in provider.lower():
-            self.client = GoogleClient(model_name="gemini-3-flash-preview")
-        else:
-            # Qwen 2.5 Coder 14B is perfect for this prompt
-            self.client = OllamaClient(model_name="qwen2.5-coder:14b")
+        # Gemini, Qwen 2.5 Coder 14B (perfect for this prompt) or recorded replies
+        self.client = create_client(provider)
 
         self.client.start_session(system_prompt)
 
     def _gather_repo_context(self) -> str:
+        self.compaction = []
+        self.sources = []  # (file, original content): the auto-fix rewrites these, not the compacted view
         files = get_staged_files(self.repo_path)
         if not files:
             return "No staged files found."
 
+        compactor = SourceCompactor("review")
         report = []
         for f in files:
             content = read_file(self.repo_path, f)
-            issues = run_static_analysis(content, f)  # Run the upgraded linter
+            self.sources.append((f, content))
+            issues = run_static_analysis(content, f)  # Run the upgraded linter (on the original source)
 
             chunk = f"\n=== FILE: {f} ===\n"
             if issues:
@@ -131,19 +147,31 @@ Modernization Tips: Records, pattern matching, sealed classes, text blocks
             else:
                 chunk += "✅ Regex Scan: Clean\n"
 
-            chunk += f"--- CODE START ---\n{content}\n--- CODE END ---\n"
+            chunk += f"--- CODE START ---\n{compactor.compact(content, f).text}\n--- CODE END ---\n"
             report.append(chunk)
 
+        self.compaction = compactor.report()
+        summary = compactor.summary()
+        print(f"✂️ agent: Compacted {summary['files']} files, {summary['saved_tokens']} tokens saved "
+              f"({summary['saved_pct']}%, {summary['saved_pct_chars']}% by characters)")
         return "\n".join(report)
 
     def ask(self, prompt: str):
         return self.client.ask(prompt)
 
+    def fork(self):
+        """Same prepared context, independent conversation (agents shared between sessions hand out forks)."""
+        forked = copy.copy(self)
+        forked.client = self.client.fork()
+        return forked
+
     def fix_issues(self):
         """
         Auto-Fix Prompt updated for Modern Java + Cleanup.
+        The review only saw compacted code, so the original sources are sent with the fix request.
         """
-        fix_prompt = """
+        sources = "\n".join(f"=== FILE: {f} ===\n{content}" for f, content in self.sources)
+        fix_prompt = f"""
         ACT AS: Senior Java Architect.
         TASK: Rewrite the code to fix ALL detected issues.
 
@@ -154,6 +182,12 @@ Modernization Tips: Records, pattern matching, sealed classes, text blocks
         4. ✅ UPGRADE to Java 17 syntax (Text Blocks, Switch Expressions, Pattern Matching).
         5. ✅ REPLACE Field Injection with Constructor Injection.
 
+        Rewrite the ORIGINAL SOURCES below (not the compacted review view): keep license headers,
+        Javadoc and comments that still apply, and every method body.
+
         OUTPUT: Only the full, clean Java Class.
+
+        **ORIGINAL SOURCES:**
+        {sources}
         """
         return self.client.ask(fix_prompt)
@@ -1,103 +1,129 @@
-import pandas as pd
-import os
-import requests
+import copy
 
-try:
-    import tomllib
-except ImportError:
-    import tomli as tomllib
+from src.shared.build_discovery import discover_dependencies, is_resolved, MANAGED
+from src.shared.maven_client import MavenCentralClient, NOT_FOUND, CONNECTION_ERROR, NOT_CACHED
+from src.shared.version_cache import VersionCache
 
 
 class DependencyInspectorAgent:
-    def __init__(self, provider=None):
+    def __init__(self, provider=None, maven_client=None, offline=None):
         self.provider = provider
-        self.struct_template = {
-            'version': None,
-            'latest_version': 'Checking...',
-            'status': 'unknown',
-            'mvn_link': None,  # <--- NEW FIELD
-            'error': None
-        }
+        # One pooled, rate-limited session for every lookup (MAVEN_SEARCH_URL overrides the endpoint),
+        # backed by the on-disk version cache (MAVEN_CACHE_TTL_HOURS, MAVEN_OFFLINE)
+        self.maven = maven_client or MavenCentralClient(cache=VersionCache(), offline=offline)
+
+    def fork(self):
+        """Shares the pooled HTTP session, rate limiter and version cache; own offline toggle."""
+        forked = copy.copy(self)
+        forked.maven = copy.copy(self.maven)
+        return forked
 
     def _get_latest_maven_version(self, group, name):
         """Queries Maven Central API for the latest version string."""
-        try:
-            url = f"https://search.maven.org/solrsearch/select?q=g:{group}+AND+a:{name}&rows=1&wt=json"
-            response = requests.get(url, timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                docs = data.get("response", {}).get("docs", [])
-                if docs:
-                    return docs[0].get("latestVersion")
-            return "Not Found"
-        except Exception:
-            return "Connection Error"
-
-    def check_project_dependencies(self, repo_path):
-        """Parses libs.versions.toml and checks for updates."""
-        catalog_path = os.path.join(repo_path, "gradle", "libs.versions.toml")
-        if not os.path.exists(catalog_path):
+        return self.maven.latest_version(group, name)
+
+    def _build_row(self, entry, result):
+        """One flat report row (see src.shared.dependency_report.REPORT_SCHEMA)."""
+        latest = result['latest_version']
+        group, name = entry['group'], entry['name']
+
+        # --- NEW: Generate MVNRepository Link ---
+        mvn_link = None
+        if group and name:
+            mvn_link = f"https://mvnrepository.com/artifact/{group}/{name}"
+
+        status = "up-to-date"
+        if entry['version'] == MANAGED:
+            status = "managed"  # Version comes from an imported BOM
+        elif not is_resolved(entry['version']):
+            status = "unresolved"  # Property / placeholder we could not resolve
+        elif latest not in [NOT_FOUND, CONNECTION_ERROR, NOT_CACHED, "unknown"] and latest != entry['version']:
+            status = "outdated"
+
+        return {
+            'package': entry['alias'],
+            'module': entry['module'],
+            'file': entry['file'],
+            'group': group,
+            'artifact': name,
+            'coordinate': f"{group}:{name}" if group and name else None,
+            'kind': entry['kind'],
+            'version': entry['version'],
+            'latest_version': latest,
+            'status': status,
+            'source': result.get('source'),  # cache | network | revalidated | offline
+            'stale': result.get('stale', False),
+            'mvn_link': mvn_link,
+        }
+
+    def iter_dependency_checks(self, repo_path):
+        """
+        Discovers every declaration in the repository (version catalogs, Gradle build scripts, POMs),
+        resolves each distinct coordinate once and yields (index, total, row) as lookups complete.
+        `index` is the declaration's discovery position, so callers can restore the original order.
+        """
+        entries = discover_dependencies(repo_path)
+        total = len(entries)
+        waiting = {}  # (group, name) -> declaration indexes sharing that coordinate (across modules)
+        print(f"📦 deps: {total} declarations, {len({(e['group'], e['name']) for e in entries})} coordinates.")
+
+        for index, entry in enumerate(entries):
+            if entry['group'] and entry['name']:
+                waiting.setdefault((entry['group'], entry['name']), []).append(index)
+            else:
+                yield index, total, self._build_row(entry, {'latest_version': "unknown"})
+
+        for coordinate, result in self.maven.latest_versions(waiting):
+            for index in waiting[coordinate]:
+                yield index, total, self._build_row(entries[index], result)
+
+    def check_project_dependencies(self, repo_path, progress_callback=None):
+        """
+        Discovers the repository's dependencies and checks them for updates.
+        `progress_callback(done, total, row)` is called as each result streams in.
+        """
+        import pandas as pd  # Only the DataFrame API needs pandas (headless runs use iter_dependency_checks)
+
+        rows = {}
+        for index, total, row in self.iter_dependency_checks(repo_path):
+            rows[index] = row
+            if progress_callback:
+                progress_callback(len(rows), total, row)
+
+        if not rows:
             return pd.DataFrame()
+        return pd.DataFrame([rows[i] for i in sorted(rows)])
+
+    def drift_matrix(self, report_df):
+        """
+        Coordinate x module matrix of declared versions, with the latest version and the number of
+        distinct versions in use. Coordinates declared with different versions come first.
+        """
+        import pandas as pd
+
+        flat = report_df.dropna(subset=['coordinate'])
+        if flat.empty:
+            return pd.DataFrame()
+
+        matrix = flat.pivot_table(index='coordinate', columns='module', values='version', observed=True,
+                                  aggfunc=lambda v: ", ".join(sorted(set(v))))
+        matrix.columns = [str(c) for c in matrix.columns]
+        matrix.insert(0, 'latest', flat.groupby('coordinate')['latest_version'].first())
+        matrix.insert(1, 'versions', flat.groupby('coordinate')['version'].nunique())
+        return matrix.sort_values(['versions', 'latest'], ascending=[False, True]).reset_index()
 
-        with open(catalog_path, "rb") as f:
-            data = tomllib.load(f)
-
-        versions = data.get("versions", {})
-        libraries = data.get("libraries", {})
-        results = []
-
-        for alias, info in libraries.items():
-            clean_status = self.struct_template.copy()
-            group, name, local_version = None, None, "unknown"
-
-            # Parse String format: "group:artifact:version"
-            if isinstance(info, str):
-                parts = info.split(":")
-                if len(parts) == 3:
-                    group, name, local_version = parts[0], parts[1], parts[2]
-
-            # Parse Dictionary format
-            elif isinstance(info, dict):
-                module = info.get("module")
-                if module:
-                    m_parts = module.split(":")
-                    group, name = m_parts[0], m_parts[1]
-                else:
-                    group = info.get("group")
-                    name = info.get("name")
-
-                v_data = info.get("version")
-                if isinstance(v_data, dict) and "ref" in v_data:
-                    local_version = versions.get(v_data["ref"], "unknown")
-                else:
-                    local_version = str(v_data) if v_data else "unknown"
-
-            latest = self._get_latest_maven_version(group, name) if group and name else "unknown"
-
-            # --- NEW: Generate MVNRepository Link ---
-            mvn_link = None
-            if group and name:
-                mvn_link = f"https://mvnrepository.com/artifact/{group}/{name}"
-
-            status = "up-to-date"
-            if latest not in ["Not Found", "Connection Error", "unknown"] and latest != local_version:
-                status = "outdated"
-
-            clean_status.update({
-                'version': local_version,
-                'latest_version': latest,
-                'status': status,
-                'mvn_link': mvn_link  # <--- Save Link
-            })
-            results.append({'Package': alias, 'Current': clean_status, 'Required': 'Catalog defined'})
-
-        return pd.DataFrame(results)
+    def write_report(self, report_df, directory=None):
+        """Appends this run to the per-user report dataset and returns the run's parquet path."""
+        from src.shared.dependency_report import write_report
+        return write_report(report_df, directory=directory)
 
     def interpret_report(self, report_path):
-        df = pd.read_parquet(report_path)
-        details = pd.json_normalize(df['Current'])
-        outdated_count = len(details[details['status'] == 'outdated'])
-        return f"Audit complete. Found {outdated_count} libraries with newer versions available on Maven Central."
+        from src.shared.dependency_report import summarize_report
+        summary = summarize_report(report_path)
+        text = f"Audit complete. Found {summary['outdated']} libraries with newer versions available on Maven Central."
+        if summary['stale']:
+            text += f" {summary['stale']} versions come from an expired cache entry (offline or Maven Central unreachable)."
+        return text
 
     def ask(self, prompt):
         return f"Response to: {prompt}"
@@ -1,6 +1,8 @@
+import copy
 import os
 import re
-from src.shared.llm_clients import GoogleClient, OllamaClient
+from src.shared.compactor import SourceCompactor
+from src.shared.llm_clients import create_client
 
 
 class ClassDiagramAgent:
@@ -39,23 +41,24 @@ Convert the following Java code following the EXACT format above.
 2. Do not write method bodies.
 3. Do not use keywords like `public`, `private`, `final` in the diagram.
 4. Output ONLY the mermaid code.
+5. Method bodies are already elided (`{ ... }`); `// accessors:` lines list getters and setters, include them as methods.
 
 **SOURCE CODE:**
 {self.java_context}
 """
 
-        if "google" in self.provider:
-            self.client = GoogleClient(model_name="gemini-3-flash-preview")
-        else:
-            self.client = OllamaClient(model_name="qwen2.5-coder:14b")
+        self.client = create_client(self.provider)
 
         self.client.start_session(self.system_prompt)
 
     def _read_java_files(self) -> str:
         java_code = ""
+        self.compaction = []
         if not os.path.exists(self.repo_path):
             return "Error: Path not found."
 
+        # Optimization: only declarations reach the prompt (no imports, comments or method bodies)
+        compactor = SourceCompactor("diagram")
         for root, _, files in os.walk(self.repo_path):
             for file in files:
                 if file.endswith(".java"):
@@ -63,14 +66,22 @@ Convert the following Java code following the EXACT format above.
                     try:
                         with open(path, "r") as f:
                             content = f.read()
-                            # Optimization: remove imports to save context tokens
-                            lines = [line for line in content.splitlines() if
-                                     not line.strip().startswith("import") and not line.strip().startswith("package")]
-                            java_code += f"\n// File: {file}\n" + "\n".join(lines) + "\n"
+                        java_code += f"\n// File: {file}\n" + compactor.compact(content, path).text + "\n"
                     except Exception:
                         pass
+
+        self.compaction = compactor.report()
+        summary = compactor.summary()
+        print(f"✂️ diagram-agent: Compacted {summary['files']} files, {summary['saved_tokens']} tokens saved "
+              f"({summary['saved_pct']}%, {summary['saved_pct_chars']}% by characters)")
         return java_code[:100000]
 
+    def fork(self):
+        """Same prepared context, independent conversation (agents shared between sessions hand out forks)."""
+        forked = copy.copy(self)
+        forked.client = self.client.fork()
+        return forked
+
     def generate_diagram(self) -> str:
         prompt = "Output the mermaid code now."
         raw_response = self.client.ask(prompt)
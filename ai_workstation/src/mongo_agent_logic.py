@@ -1,18 +1,40 @@
+import copy
 import json
-from src.shared.llm_clients import GoogleClient, OllamaClient
+import threading
+from src.shared.llm_clients import create_client
+from src.shared.mongo_evaluator import UnsupportedOperation, normalize_document, run_pipeline
+from src.shared.mongo_pipeline import (ShellCallError, check_against_schema, optimize_pipeline, parse_shell_query,
+                                       suggest_indexes)
+from src.shared.mongo_schema import iter_documents, profile_collection, profiles_from_sample_schema, render_schema
+from src.shared.query_cache import QueryCache
 
 
 class MongoAgent:
-    def __init__(self, schema_content: str, provider: str):
+    def __init__(self, schema_content: str, provider: str, cache: QueryCache = None, cache_threshold: float = 0.85,
+                 collections: dict = None, max_documents: int = None):
+        """
+        schema_content: hand-written {collection: sample_document} JSON (may be empty when `collections` is given).
+        collections: {collection_name: path or file object} of NDJSON / JSON array exports, streamed and
+                     profiled into a compact schema (optionally only the first `max_documents` per collection).
+        """
         self.provider = provider.lower()
 
         print(f"🍃 mongo-agent: Loading schema from content...")
-        
-        # Try to pretty-print JSON if possible, otherwise use raw content
-        try:
-            data = json.loads(schema_content)
-            schema_context = json.dumps(data, indent=2)
-        except json.JSONDecodeError:
+
+        # Profile every collection into a compact summary instead of pasting raw documents
+        self.profiles = {}
+        if schema_content and schema_content.strip():
+            try:
+                self.profiles.update(profiles_from_sample_schema(json.loads(schema_content)))
+            except (json.JSONDecodeError, AttributeError):
+                pass
+        for name, source in (collections or {}).items():
+            print(f"🍃 mongo-agent: Profiling collection `{name}`...")
+            self.profiles[name] = profile_collection(name, iter_documents(source), max_documents=max_documents)
+
+        if self.profiles:
+            schema_context = render_schema(self.profiles)
+        else:
             # Fallback for non-JSON or malformed content
             schema_context = schema_content
 
@@ -22,7 +44,7 @@ class MongoAgent:
 You are a Principal NoSQL Engineer specialized in MongoDB.
 Your goal is to translate natural language questions into valid MongoDB Shell queries.
 
-**DATABASE STRUCTURE (Sample Documents):**
+**DATABASE STRUCTURE (Inferred schema: `path: type (presence, array sizes) e.g. examples`):**
 {schema_context}
 
 **RULES:**
@@ -57,21 +79,100 @@ Return only the MongoDB query.
 """
 
         # --- CLIENT INITIALIZATION ---
-        if "google" in self.provider:
-            self.client = GoogleClient(model_name="gemini-3-flash-preview")
-        else:
-            # Qwen 2.5 Coder 14B is excellent at MongoDB syntax
-            self.client = OllamaClient(model_name="qwen2.5-coder:14b")
+        # Gemini, Qwen 2.5 Coder 14B (excellent at MongoDB syntax) or recorded replies
+        self.client = create_client(self.provider)
 
         self.client.start_session(self.system_prompt)
 
+        self._preview = {"documents": None, "lock": threading.Lock()}  # Normalized samples, built on first preview, shared by forks
+
+        # --- QUESTION CACHE (Scoped to this schema) ---
+        self.cache = cache or QueryCache(schema_context, namespace="mongo", threshold=cache_threshold)
+
     def ask(self, user_question: str) -> str:
+        answer = self.answer(user_question)
+        if answer["errors"]:
+            error_list = "\n".join(f"- {e}" for e in answer["errors"])
+            return f"⚠️ Validation Warning:\n{error_list}\n\n{answer['query']}"
+        return answer["query"]
+
+    def answer(self, user_question: str) -> dict:
+        """Structured variant of ask(): {"query", "errors", "source", "notes", "indexes"}."""
+        # 0. CACHE (Repeat questions skip the model entirely)
+        cached_query = self.cache.lookup(user_question, validator=self._is_valid)
+        if cached_query:
+            analysis = self.analyze(cached_query)
+            return {"query": cached_query, "errors": [], "source": "cache",
+                    "notes": analysis["notes"], "indexes": analysis["indexes"]}
+
         # 1. GENERATE
         raw_response = self.client.ask(user_question)
 
         # 2. FORMATTING (Simple cleanup)
-        # We don't use sqlglot here because it doesn't support Mongo.
-        # We rely on the LLM's high accuracy for JS/JSON syntax.
         clean_code = raw_response.replace("```javascript", "").replace("```json", "").replace("```", "").strip()
 
-        return clean_code
+        # 3. PARSE, CHECK & OPTIMIZE
+        analysis = self.analyze(clean_code)
+        if not analysis["errors"]:
+            self.cache.store(user_question, analysis["query"])
+        return {"query": analysis["query"], "errors": analysis["errors"], "source": "model",
+                "notes": analysis["notes"], "indexes": analysis["indexes"]}
+
+    def analyze(self, query_text: str) -> dict:
+        """
+        Parses shell code into a structured find/aggregate query, rejects writes, checks fields
+        against the inferred schema, optimizes the pipeline and suggests indexes.
+        Returns {"query" (optimized shell text), "errors", "notes", "indexes", "parsed"}.
+        """
+        result = {"query": query_text, "errors": [], "notes": [], "indexes": [], "parsed": None}
+        try:
+            parsed = parse_shell_query(query_text)
+        except ShellCallError as e:
+            result["errors"] = [str(e)]
+            return result
+
+        if parsed.method == "aggregate":
+            parsed.pipeline, result["notes"] = optimize_pipeline(parsed.pipeline)
+        result["parsed"] = parsed
+        result["query"] = parsed.to_shell()
+        result["indexes"] = suggest_indexes(parsed)
+
+        profile = self.profiles.get(parsed.collection)
+        if self.profiles:
+            result["errors"] = check_against_schema(parsed, profile.field_types() if profile else {},
+                                                    set(self.profiles))
+        return result
+
+    def validate(self, query_text: str) -> list[str]:
+        return self.analyze(query_text)["errors"]
+
+    def _is_valid(self, query_text: str) -> bool:
+        return not self.validate(query_text)
+
+    def preview(self, query_text: str, max_rows: int = 20) -> dict:
+        """
+        Runs the (optimized) query against the uploaded sample documents with the local
+        in-memory evaluator. Returns {"rows", "error"}.
+        """
+        analysis = self.analyze(query_text)
+        if analysis["parsed"] is None:
+            return {"rows": [], "error": "; ".join(analysis["errors"])}
+
+        with self._preview["lock"]:
+            if self._preview["documents"] is None:
+                self._preview["documents"] = {
+                    name: [normalize_document(d) for d in profile.sample] for name, profile in self.profiles.items()
+                }
+        documents = self._preview["documents"]
+        parsed = analysis["parsed"]
+        try:
+            rows = run_pipeline(documents.get(parsed.collection, []), parsed.to_pipeline(), collections=documents)
+        except (UnsupportedOperation, KeyError, TypeError, ValueError) as e:
+            return {"rows": [], "error": f"Preview not available: {e}"}
+        return {"rows": [json.loads(json.dumps(r, default=str)) for r in rows[:max_rows]], "error": None}
+
+    def fork(self):
+        """Same schema, cache and preview samples; independent model session (used for batch runs)."""
+        forked = copy.copy(self)
+        forked.client = self.client.fork()
+        return forked
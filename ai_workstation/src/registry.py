@@ -0,0 +1,55 @@
+import importlib
+import os
+
+# Agent classes are imported on first use: each module pulls in its own heavy dependencies
+# (git, sqlglot, duckdb, pandas...), so start-up only pays for the agent actually selected.
+# "input" tells the UI / CLI what the agent is built from: a project root or a schema.
+AGENTS = {
+    "review": {"label": "🕵️‍♂️ Code Reviewer", "module": "src.agent_logic", "class": "CodeReviewAgent",
+               "input": "repo"},
+    "tests": {"label": "🧪 Unit Test Generator", "module": "src.test_agent_logic", "class": "TestGenAgent",
+              "input": "repo"},
+    "diagram": {"label": "📊 Class Diagram Generator", "module": "src.diagram_agent_logic",
+                "class": "ClassDiagramAgent", "input": "repo"},
+    "deps": {"label": "📦 Dependency Inspector", "module": "src.dependency_agent_logic",
+             "class": "DependencyInspectorAgent", "input": "repo"},
+    "bigquery": {"label": "💾 Text-to-BigQuery", "module": "src.sql_agent_logic", "class": "BigQueryAgent",
+                 "input": "schema"},
+    "mongo": {"label": "🍃 Text-to-MongoDB", "module": "src.mongo_agent_logic", "class": "MongoAgent",
+              "input": "schema"},
+}
+
+
+def agent_labels() -> list[str]:
+    return [spec["label"] for spec in AGENTS.values()]
+
+
+def kind_of(agent) -> str:
+    """Registry key of an agent instance (by class name, so no agent module gets imported)."""
+    if getattr(agent, "kind", None) in AGENTS:
+        return agent.kind  # Remote agent hosted by the agent service
+    name = type(agent).__name__
+    return next(kind for kind, spec in AGENTS.items() if spec["class"] == name)
+
+
+def load_agent_class(kind: str):
+    """Imports (once) and returns the agent class registered under `kind`."""
+    spec = AGENTS[kind]
+    return getattr(importlib.import_module(spec["module"]), spec["class"])
+
+
+def create_agent(kind: str, **kwargs):
+    return load_agent_class(kind)(**kwargs)
+
+
+def open_agent(kind: str, priority: str = None, **kwargs):
+    """
+    Agent for `kind`: hosted by the agent service when AI_WORKSTATION_SERVICE_URL is set (calls are
+    queued there with `priority`), otherwise built in this process.
+    """
+    if os.getenv("AI_WORKSTATION_SERVICE_URL"):
+        from src.shared.service_client import AgentServiceClient
+        agent = AgentServiceClient().open(kind, **kwargs)
+        agent.priority = priority
+        return agent
+    return create_agent(kind, **kwargs)
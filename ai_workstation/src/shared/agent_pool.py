@@ -0,0 +1,172 @@
+import hashlib
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from src.registry import AGENTS, create_agent
+
+DEFAULT_MAX_ENTRIES = 16
+DEFAULT_MAX_MB = 512
+
+
+# --- CONTEXT KEYS ---
+def _java_tree_fingerprint(repo_path: str) -> str:
+    """Paths, sizes and mtimes of every .java file (what the diagram agent reads)."""
+    digest = hashlib.sha1()
+    for root, dirs, files in os.walk(repo_path):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith(".java"):
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                digest.update(f"{path}\0{stat.st_size}:{stat.st_mtime_ns}\0".encode())
+    return digest.hexdigest()
+
+
+def _source_fingerprint(source) -> str:
+    """Content hash of an uploaded file (anything with getvalue()) or size/mtime of a path."""
+    if hasattr(source, "getvalue"):
+        return hashlib.sha256(source.getvalue()).hexdigest()
+    stat = os.stat(source)
+    return f"{os.path.abspath(source)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def context_key(kind: str, provider: str, **kwargs) -> tuple:
+    """
+    (agent type, provider, fingerprint of what the agent prepares at init). Two sessions with the
+    same key would build byte-identical prompts, so they can share one prepared agent.
+    """
+    parts = [kind, provider.lower()]
+    if AGENTS[kind]["input"] == "repo":
+        repo_path = os.path.abspath(kwargs["repo_path"]) if kwargs.get("repo_path") else None
+        parts.append(repo_path)
+        if kind in ("review", "tests"):
+            from src.shared.git_utils import staged_fingerprint
+            parts.append(staged_fingerprint(repo_path))
+        elif kind == "diagram":
+            parts.append(_java_tree_fingerprint(repo_path))
+    else:
+        parts.append(hashlib.sha256((kwargs.get("schema_content") or "").encode("utf-8")).hexdigest())
+        collections = kwargs.get("collections") or {}
+        parts.append(tuple(sorted((name, _source_fingerprint(src)) for name, src in collections.items())))
+    for name, value in sorted(kwargs.items()):
+        if name not in ("repo_path", "schema_content", "collections"):
+            parts.append((name, repr(value)))
+    return tuple(parts)
+
+
+def estimate_size(obj, limit: int = 200_000) -> int:
+    """Approximate deep size in bytes (strings, containers and object attributes; visits at most `limit` objects)."""
+    seen, stack, total = set(), [obj], 0
+    while stack and len(seen) < limit:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, (type, type(sys), type(estimate_size))):
+            continue
+        seen.add(id(current))
+        try:
+            total += sys.getsizeof(current)
+        except TypeError:
+            continue
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        elif hasattr(current, "__dict__") and not isinstance(current, (str, bytes)):
+            stack.append(vars(current))
+    return total
+
+
+# --- POOL ---
+class AgentPool:
+    """
+    Process-wide pool of prepared agents shared by every session of the app.
+    An agent is built once per context key (repo + staged tree, or schema); sessions get a
+    `fork()` of it: the same system prompt, schema and caches with their own conversation. State the
+    agents build lazily (the SQL dry-run replica, the Mongo preview samples) is shared by all forks.
+    Least recently used entries are evicted beyond `max_entries` or `max_mb` of estimated memory.
+    """
+
+    def __init__(self, max_entries: int = None, max_mb: float = None):
+        self.max_entries = max_entries or int(os.getenv("AI_WORKSTATION_AGENT_POOL_SIZE", DEFAULT_MAX_ENTRIES))
+        self.max_bytes = (max_mb or float(os.getenv("AI_WORKSTATION_AGENT_POOL_MB", DEFAULT_MAX_MB))) * 1024 * 1024
+        self._entries = OrderedDict()  # key -> {"agent", "bytes", "created_at", "last_used", "hits"}
+        self._building = {}  # key -> Lock held while the agent is being built
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def checkout(self, kind: str, provider: str, **kwargs):
+        """
+        Returns (forked agent, reused). Concurrent checkouts of the same key build the agent once;
+        the others wait for it.
+        """
+        key = context_key(kind, provider, **kwargs)
+        with self._lock:
+            entry = self._touch(key)
+            if entry is None:
+                build_lock = self._building.setdefault(key, threading.Lock())
+
+        if entry is None:
+            try:
+                with build_lock:
+                    with self._lock:
+                        entry = self._touch(key)
+                    if entry is None:
+                        agent = create_agent(kind, provider=provider, **kwargs)
+                        entry = self._insert(key, agent)
+                        reused = False
+                    else:
+                        reused = True
+            finally:
+                with self._lock:
+                    self._building.pop(key, None)
+        else:
+            reused = True
+
+        return entry["agent"].fork(), reused
+
+    def _touch(self, key):
+        """Entry for `key` marked most recently used (caller holds the lock)."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            entry["last_used"] = time.time()
+            entry["hits"] += 1
+            self.stats["hits"] += 1
+        return entry
+
+    def _insert(self, key, agent) -> dict:
+        entry = {"agent": agent, "bytes": estimate_size(agent), "created_at": time.time(),
+                 "last_used": time.time(), "hits": 0}
+        with self._lock:
+            self.stats["misses"] += 1
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict(keep=key)
+        return entry
+
+    def _evict(self, keep=None):
+        while self._entries and (len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            if oldest == keep:
+                break  # Never evict what was just built, even if it alone is over budget
+            self._entries.pop(oldest)
+            self.stats["evictions"] += 1
+            print(f"♻️ agent-pool: Evicted {oldest[0]} agent ({len(self._entries)} left)")
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(entry["bytes"] for entry in self._entries.values())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "mb": round(self.total_bytes / 1024 / 1024, 1), **self.stats}
@@ -0,0 +1,297 @@
+import io
+import json
+import os
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from src.shared.agent_pool import AgentPool, context_key
+from src.shared.jobs import FINISHED
+from src.shared.scheduler import PRIORITIES, Request, RequestScheduler
+
+DEFAULT_PORT = 8765
+DEFAULT_MAX_SESSIONS = 1024
+DEFAULT_SESSION_TTL_S = 3600
+
+# Methods a client may call per agent kind, with the priority they get unless the client asks for one.
+# Typing a question in the UI is interactive; generating code for staged files can wait a little.
+METHODS = {
+    "review": {"ask": "normal", "fix_issues": "normal"},
+    "tests": {"ask": "normal", "generate_tests": "normal"},
+    "diagram": {"generate_diagram": "normal"},
+    "deps": {"check_dependencies": "normal"},
+    "bigquery": {"ask": "interactive", "answer": "interactive", "validate": "interactive", "dry_run": "interactive"},
+    "mongo": {"ask": "interactive", "answer": "interactive", "validate": "interactive", "analyze": "interactive",
+              "preview": "interactive"},
+}
+
+# Local work that never reaches a model: it runs on the "cpu" lane, not in the model's queue
+CPU_METHODS = {"validate", "dry_run", "analyze", "preview"}
+
+# Answers that only depend on the agent's context and the arguments (not on the conversation):
+# identical queued / running calls share one execution. `answer` is not one of them: it adds the
+# exchange to the calling session's conversation, which follow-up questions rely on.
+STATELESS_METHODS = {
+    "bigquery": {"validate", "dry_run"},
+    "mongo": {"validate", "analyze", "preview"},
+    "diagram": {"generate_diagram"},
+    "deps": {"check_dependencies"},
+}
+
+
+class ServiceError(Exception):
+    """Client error, reported with an HTTP status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def model_of(agent) -> str:
+    """Name of the model an agent talks to (through recording wrappers), or None."""
+    client = getattr(agent, "client", None)
+    while client is not None and not hasattr(client, "model_name"):
+        client = getattr(client, "client", None)
+    return getattr(client, "model_name", None)
+
+
+def decode_collections(collections: dict) -> dict:
+    """Collection exports sent as {"path": ...} (same machine) or {"content": ...} (uploaded file)."""
+    decoded = {}
+    for name, source in (collections or {}).items():
+        if isinstance(source, dict) and "content" in source:
+            decoded[name] = io.BytesIO(source["content"].encode("utf-8"))
+        else:
+            decoded[name] = source["path"] if isinstance(source, dict) else source
+    return decoded
+
+
+class AgentService:
+    """
+    Hosts the agents of every client (app sessions, CLI, batch runs) in one process. Agents come from
+    the shared AgentPool; each client session gets a fork, addressed by a handle. Calls are queued on
+    the RequestScheduler: one lane per model (plus "maven" and "cpu") with its own concurrency limit,
+    served by priority.
+
+    Sessions live until the client closes them or they sit idle (no call queued or running) for
+    `session_ttl_s`. Active sessions are never dropped: beyond `max_sessions`, opening a new one fails.
+    """
+
+    def __init__(self, pool: AgentPool = None, scheduler: RequestScheduler = None, max_sessions: int = None,
+                 session_ttl_s: float = None):
+        self.pool = pool or AgentPool()
+        self.scheduler = scheduler or RequestScheduler()
+        self.max_sessions = max_sessions or int(os.getenv("AI_WORKSTATION_SERVICE_SESSIONS", DEFAULT_MAX_SESSIONS))
+        self.session_ttl_s = session_ttl_s or float(os.getenv("AI_WORKSTATION_SERVICE_SESSION_TTL_S",
+                                                              DEFAULT_SESSION_TTL_S))
+        self._sessions = {}  # handle -> {"kind", "agent", "key", "lock", "last_used", "requests"}
+        self._lock = threading.Lock()
+
+    # --- SESSIONS ---
+    def open(self, kind: str, provider: str, **context) -> dict:
+        if kind not in METHODS:
+            raise ServiceError(400, f"Unknown agent kind: {kind}")
+        if "collections" in context:
+            context["collections"] = decode_collections(context["collections"])
+        key = context_key(kind, provider, **context)
+        agent, reused = self.pool.checkout(kind, provider, **context)
+        return {**self._add_session(kind, agent, key), "reused": reused}
+
+    def fork(self, handle: str) -> dict:
+        session = self._session(handle)
+        return {**self._add_session(session["kind"], session["agent"].fork(), session["key"]), "reused": True}
+
+    def close(self, handle: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(handle, None) is not None
+
+    def _add_session(self, kind: str, agent, key) -> dict:
+        handle = uuid.uuid4().hex[:12]
+        if hasattr(agent, "repair_concurrency"):
+            agent.repair_concurrency = 1  # One request holds one model slot: no parallel repair candidates
+        with self._lock:
+            self._expire_sessions()
+            if len(self._sessions) >= self.max_sessions:
+                raise ServiceError(503, f"{len(self._sessions)} agent sessions are open; close unused ones "
+                                        f"or raise AI_WORKSTATION_SERVICE_SESSIONS")
+            self._sessions[handle] = {"kind": kind, "agent": agent, "key": key, "lock": threading.Lock(),
+                                      "last_used": time.time(), "requests": []}
+        return {"handle": handle, "kind": kind, "model": model_of(agent),
+                "compaction": getattr(agent, "compaction", None),
+                "offline": getattr(getattr(agent, "maven", None), "offline", None)}
+
+    def _session(self, handle: str) -> dict:
+        with self._lock:
+            session = self._sessions.get(handle)
+            if session is None:
+                raise ServiceError(404, f"Unknown or expired agent handle: {handle}")
+            session["last_used"] = time.time()
+            return session
+
+    def _expire_sessions(self):
+        """Drops sessions idle for longer than the TTL (caller holds the lock)."""
+        now = time.time()
+        for handle, session in list(self._sessions.items()):
+            session["requests"] = [r for r in session["requests"] if r.status not in FINISHED]
+            if not session["requests"] and now - session["last_used"] > self.session_ttl_s:
+                del self._sessions[handle]
+
+    # --- CALLS ---
+    def call(self, handle: str, method: str, args: list = None, kwargs: dict = None, priority: str = None) -> Request:
+        """Queues `agent.method(*args, **kwargs)` and returns the request (poll it or wait on it)."""
+        session = self._session(handle)
+        kind, agent = session["kind"], session["agent"]
+        if method not in METHODS[kind]:
+            raise ServiceError(400, f"{kind} agents have no method {method!r}")
+        if priority is not None and priority not in PRIORITIES:
+            raise ServiceError(400, f"Unknown priority {priority!r} (one of {', '.join(PRIORITIES)})")
+        args, kwargs = list(args or []), dict(kwargs or {})
+
+        if method == "check_dependencies":
+            lane, operation = "maven", self._dependency_check(session, *args, **kwargs)
+        else:
+            lane = "cpu" if method in CPU_METHODS else (model_of(agent) or "cpu")
+
+            def operation(request):
+                # Calls of one session share its conversation: one at a time
+                with session["lock"]:
+                    return getattr(agent, method)(*args, **kwargs)
+
+        def tracked(request, operation=operation):
+            try:
+                return operation(request)
+            finally:
+                session["last_used"] = time.time()  # The idle TTL counts from the end of the last call
+
+        coalesce_key = None
+        if method in STATELESS_METHODS.get(kind, ()):
+            coalesce_key = (session["key"], method, json.dumps([args, kwargs], sort_keys=True, default=str))
+        request = self.scheduler.submit(Request(
+            lane, tracked, priority=priority or METHODS[kind][method], name=f"{kind}.{method}",
+            # Same model and same prepared context: run back to back while the prompt prefix is cached
+            batch_key=(lane, session["key"]) if lane not in ("cpu", "maven") else None,
+            coalesce_key=coalesce_key,
+        ))
+        with self._lock:
+            session["requests"].append(request)
+        return request
+
+    @staticmethod
+    def _dependency_check(session: dict, repo_path: str, offline: bool = None):
+        """Streams one partial {"done", "total", "row"} per checked coordinate."""
+        def operation(request):
+            with session["lock"]:
+                agent = session["agent"]
+                if offline is not None:
+                    agent.maven.offline = offline
+                rows = {}
+                for index, total, row in agent.iter_dependency_checks(repo_path):
+                    rows[index] = row
+                    request.report(len(rows) / total, partial={"done": len(rows), "total": total, "row": row})
+                return [rows[i] for i in sorted(rows)]
+
+        return operation
+
+    def metrics(self) -> dict:
+        with self._lock:
+            self._expire_sessions()
+            sessions = len(self._sessions)
+        return {**self.scheduler.metrics(), "sessions": sessions, "agent_pool": self.pool.summary()}
+
+    def shutdown(self):
+        self.scheduler.shutdown()
+
+
+# --- HTTP (local JSON API) ---
+class _Handler(BaseHTTPRequestHandler):
+    """
+    POST   /v1/agents                      {"kind", "provider", "context"} -> session
+    POST   /v1/agents/<handle>/fork        -> session sharing the same context
+    DELETE /v1/agents/<handle>
+    POST   /v1/agents/<handle>/calls       {"method", "args", "kwargs", "priority"} [?wait=s] -> request
+    GET    /v1/requests/<id>?wait=s&since=n  long-polls until finished (or `wait` seconds)
+    DELETE /v1/requests/<id>               cancels a queued request
+    GET    /v1/metrics, GET /v1/health
+    """
+
+    service: AgentService = None
+    max_wait_s = 30.0
+
+    def log_message(self, format, *args):
+        pass  # One line per poll would drown the service log
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def do_DELETE(self):
+        self._route("DELETE")
+
+    def _route(self, method: str):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split("/") if part][1:]  # Drop "v1"
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            body = self._body() if method == "POST" else {}
+            if method == "GET" and parts == ["health"]:
+                return self._send(200, {"ok": True})
+            if method == "GET" and parts == ["metrics"]:
+                return self._send(200, self.service.metrics())
+            if method == "POST" and parts == ["agents"]:
+                return self._send(201, self.service.open(body.get("kind"), body.get("provider", "ollama"),
+                                                         **body.get("context", {})))
+            if len(parts) == 3 and parts[0] == "agents" and method == "POST" and parts[2] == "fork":
+                return self._send(201, self.service.fork(parts[1]))
+            if len(parts) == 2 and parts[0] == "agents" and method == "DELETE":
+                return self._send(200, {"closed": self.service.close(parts[1])})
+            if len(parts) == 3 and parts[0] == "agents" and method == "POST" and parts[2] == "calls":
+                request = self.service.call(parts[1], body.get("method"), body.get("args"), body.get("kwargs"),
+                                            body.get("priority"))
+                return self._send(202, self._poll(request, query))
+            if len(parts) == 2 and parts[0] == "requests":
+                request = self.service.scheduler.get(parts[1])
+                if request is None:
+                    raise ServiceError(404, f"Unknown request: {parts[1]}")
+                if method == "DELETE":
+                    return self._send(200, {"cancelled": self.service.scheduler.cancel(request.id)})
+                if method == "GET":
+                    return self._send(200, self._poll(request, query))
+            raise ServiceError(404, f"No route for {method} {url.path}")
+        except ServiceError as e:
+            self._send(e.status, {"error": str(e)})
+        except (TypeError, ValueError) as e:
+            self._send(400, {"error": f"{type(e).__name__}: {e}"})
+        except Exception as e:
+            print(f"❌ agent-service: {method} {url.path} failed: {e}")
+            self._send(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def _poll(self, request: Request, query: dict) -> dict:
+        """Waits up to ?wait= seconds for the request to finish, or until a new partial result arrives."""
+        since = int(query.get("since", 0))
+        deadline = time.monotonic() + min(float(query.get("wait", 0)), self.max_wait_s)
+        while request.status not in FINISHED and len(request.partial) <= since and time.monotonic() < deadline:
+            request.wait(timeout=min(0.25, max(0.0, deadline - time.monotonic())))
+        return request.snapshot(since=since)
+
+    def _body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+    def _send(self, status: int, payload: dict):
+        body = json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_server(service: AgentService = None, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    handler = type("AgentServiceHandler", (_Handler,), {"service": service or AgentService()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
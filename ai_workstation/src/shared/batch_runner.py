@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+def read_questions(input_path: str) -> list[dict]:
+    """
+    Reads a JSONL question file. Each line is either a JSON string or an object with
+    `question` (or `body` / `title`) and an optional `id` / `request_id`.
+    """
+    questions = []
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                print(f"⚠️ batch: Line {line_number} is not valid JSON ({e}), skipping.")
+                continue
+            if isinstance(record, str):
+                record = {"question": record}
+            if not isinstance(record, dict):
+                print(f"⚠️ batch: Line {line_number} is neither a string nor an object, skipping.")
+                continue
+
+            question = record.get("question") or record.get("body") or record.get("title")
+            if not question:
+                print(f"⚠️ batch: Line {line_number} has no question, skipping.")
+                continue
+
+            question_id = record.get("id") or record.get("request_id") or question_key(question)
+            questions.append({"id": str(question_id), "question": question})
+    return questions
+
+
+def question_key(question: str) -> str:
+    return hashlib.sha1(question.strip().lower().encode("utf-8")).hexdigest()[:12]
+
+
+def answered_ids(output_path: str, retry_invalid: bool = False) -> set[str]:
+    """IDs already present in an output file (so re-runs only do the missing work)."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Partially written line from an interrupted run
+            if retry_invalid and not record.get("valid"):
+                continue
+            done.add(record.get("id"))
+    return done
+
+
+def run_batch(prototype_agent, input_path: str, output_path: str, max_workers: int = 4,
+              retry_invalid: bool = False, agent_name: str = None) -> dict:
+    """
+    Answers every question of a JSONL file with `prototype_agent` (a BigQueryAgent or MongoAgent).
+    Each question runs on its own forked session, at most `max_workers` at a time, and its
+    result is appended to `output_path` as soon as it completes.
+    Returns a summary: {"total", "skipped", "answered", "valid", "elapsed_s"}.
+    """
+    questions = read_questions(input_path)
+    done = answered_ids(output_path, retry_invalid=retry_invalid)
+    pending = [q for q in questions if q["id"] not in done]
+    agent_name = agent_name or type(prototype_agent).__name__
+
+    print(f"📚 batch: {len(questions)} questions, {len(questions) - len(pending)} already answered.")
+    summary = {"total": len(questions), "skipped": len(questions) - len(pending), "answered": 0, "valid": 0}
+    started = time.perf_counter()
+
+    def answer_one(item: dict) -> dict:
+        t0 = time.perf_counter()
+        record = {"id": item["id"], "question": item["question"], "agent": agent_name}
+        agent = None
+        try:
+            agent = prototype_agent.fork()  # A remote fork can fail too (e.g. the service is at its session limit)
+            answer = agent.answer(item["question"])
+            record.update({
+                "query": answer["query"],
+                "valid": not answer["errors"],
+                "errors": answer["errors"],
+                "source": answer["source"],
+            })
+        except Exception as e:
+            record.update({"query": None, "valid": False, "errors": [f"Agent error: {e}"], "source": None})
+        finally:
+            if agent is not None and hasattr(agent, "close"):
+                agent.close()  # Remote sessions (agent service) are released per question
+        record["elapsed_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        return record
+
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(answer_one, item) for item in pending]
+        for future in as_completed(futures):
+            record = future.result()
+            # Results are written from this thread only, in completion order
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            summary["answered"] += 1
+            summary["valid"] += int(record["valid"])
+            status = "✅" if record["valid"] else "❌"
+            print(f"{status} batch: [{summary['answered']}/{len(pending)}] {record['id']} ({record['elapsed_ms']} ms)")
+
+    summary["elapsed_s"] = round(time.perf_counter() - started, 2)
+    return summary
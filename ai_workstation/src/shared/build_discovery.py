@@ -0,0 +1,367 @@
+import os
+import re
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+try:
+    import tomllib
+except ImportError:
+    import tomli as tomllib
+
+# Build output, VCS and IDE folders never contain declarations we care about
+SKIP_DIRS = {".git", ".gradle", ".idea", ".mvn", ".kotlin", "build", "target", "out", "node_modules",
+             "__pycache__", ".venv", "venv"}
+
+GRADLE_FILES = {"build.gradle", "build.gradle.kts", "settings.gradle", "settings.gradle.kts"}
+MANAGED = "BOM-managed"
+
+# implementation("g:a:v"), api 'g:a:v', classpath "g:a:$v", platform("g:a:v"), "g:a:${rootProject.extra["v"]}",
+# implementation("g:a") (version from a platform / BOM) ...
+GRADLE_STRING_DEP = re.compile(
+    r"""\b(?P<conf>\w+)\s*\(?\s*(?P<platform>(?:enforced)?[pP]latform\s*\(\s*)?"""
+    r"""["'](?P<group>[\w.\-]+):(?P<name>[\w.\-]+)(?::(?P<version>(?:\$\{[^}"'\n]*(?:["'][^"'\n]*["'][^}"'\n]*)*\}"""
+    r"""|[^"'\s:@])+))?[^"'\n]*["']""")
+# implementation group: 'g', name: 'a', version: 'v'
+GRADLE_MAP_DEP = re.compile(
+    r"""\b(?P<conf>\w+)\s*\(?\s*group\s*[:=]\s*["'](?P<group>[^"']+)["']\s*,\s*"""
+    r"""name\s*[:=]\s*["'](?P<name>[^"']+)["']\s*,\s*version\s*[:=]\s*["'](?P<version>[^"']+)["']""")
+# ext.kotlinVersion = '1.9.0' / val okhttpVersion = "4.12.0" / def junit = '5.10.0' / extra["x"] = "1"
+GRADLE_ASSIGNMENT = re.compile(
+    r"""^\s*(?:ext\.|val\s+|var\s+|def\s+|extra\[["'])?(?P<key>[\w.]+)["']?\]?\s*=\s*["'](?P<value>[^"'$]+)["']""",
+    re.MULTILINE)
+PROPERTY_LINE = re.compile(r"([^=:\s]+)\s*[=:]\s*(.*)")
+PLACEHOLDER = re.compile(r"\$(?:\{(?P<expr>[^}]+)\}|(?P<name>[\w.]+))$")
+# Names in a placeholder expression: rootProject.extra["x"], property("x"), libs.versions.x.get()
+EXPRESSION_NAME = re.compile(r"""["']([\w.\-]+)["']|(\w+)""")
+# Versions of dependencies declared without one come from a platform / BOM or the Spring plugin
+GRADLE_VERSION_MANAGEMENT = re.compile(r"""\b(?:(?:enforced)?[pP]latform\s*\(|dependencyManagement\b|mavenBom\b)""")
+POM_PLACEHOLDER = re.compile(r"\$\{([^}]+)\}")
+GRADLE_CONFIGURATIONS = re.compile(
+    r"(?i)(implementation|api|compile|runtime|classpath|kapt|ksp|annotationprocessor|platform|only|testfixtures)")
+
+
+# --- DISCOVERY ---
+def is_build_file(filename: str) -> bool:
+    return (filename in GRADLE_FILES or filename == "pom.xml" or filename == "gradle.properties"
+            or filename.endswith(".versions.toml"))
+
+
+def _scan_directory(path: str):
+    """(build files, subdirectories) of one directory."""
+    files, subdirs = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in SKIP_DIRS:
+                        subdirs.append(entry.path)
+                elif is_build_file(entry.name):
+                    files.append(entry.path)
+    except OSError:
+        pass
+    return files, subdirs
+
+
+def find_build_files(repo_path: str, max_workers: int = 8) -> list[str]:
+    """Walks the repository concurrently (one directory per task) and returns every build file found."""
+    found = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {pool.submit(_scan_directory, repo_path)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs = future.result()
+                found.extend(files)
+                pending.update(pool.submit(_scan_directory, d) for d in subdirs)
+    return sorted(found)
+
+
+def module_of(repo_path: str, file_path: str) -> str:
+    """Module name of a build file: its directory relative to the repo ("." for the root)."""
+    directory = os.path.dirname(file_path)
+    if file_path.endswith(".versions.toml") and os.path.basename(directory) == "gradle":
+        directory = os.path.dirname(directory)  # <module>/gradle/libs.versions.toml belongs to <module>
+    relative = os.path.relpath(directory, repo_path)
+    return relative.replace(os.sep, "/")
+
+
+def _declaration(group, name, version, alias=None, kind="library"):
+    return {"alias": alias or name, "group": group, "name": name, "version": version or "unknown", "kind": kind}
+
+
+def is_resolved(version: str) -> bool:
+    return bool(version) and version not in ("unknown", MANAGED) and "$" not in version
+
+
+# --- GRADLE VERSION CATALOGS ---
+def parse_version_catalog(path: str) -> list[dict]:
+    """Libraries of a Gradle version catalog (`[libraries]` with `version.ref` into `[versions]`)."""
+    with open(path, "rb") as f:
+        data = tomllib.load(f)
+
+    versions = data.get("versions", {})
+    libraries = data.get("libraries", {})
+    declarations = []
+
+    for alias, info in libraries.items():
+        group, name, local_version = None, None, "unknown"
+
+        # Parse String format: "group:artifact:version"
+        if isinstance(info, str):
+            parts = info.split(":")
+            if len(parts) == 3:
+                group, name, local_version = parts[0], parts[1], parts[2]
+
+        # Parse Dictionary format
+        elif isinstance(info, dict):
+            module = info.get("module")
+            if module:
+                m_parts = module.split(":")
+                group, name = m_parts[0], m_parts[1]
+            else:
+                group = info.get("group")
+                name = info.get("name")
+
+            v_data = info.get("version")
+            if isinstance(v_data, dict) and "ref" in v_data:
+                local_version = versions.get(v_data["ref"], "unknown")
+            elif isinstance(v_data, dict):  # Rich version: {strictly / require / prefer = "..."}
+                local_version = next((v_data[k] for k in ("strictly", "require", "prefer") if k in v_data), "unknown")
+            else:
+                local_version = str(v_data) if v_data else "unknown"
+
+        declarations.append(_declaration(group, name, local_version, alias=alias))
+    return declarations
+
+
+# --- GRADLE BUILD FILES ---
+def read_gradle_properties(path: str) -> dict:
+    properties = {}
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith(("#", "!")):
+                continue
+            match = PROPERTY_LINE.match(line)
+            if match:
+                properties[match.group(1)] = match.group(2).strip()
+    return properties
+
+
+def gradle_variables(build_text: str) -> dict:
+    """String literals assigned in a build script (ext / val / def / extra[...])."""
+    return {m.group("key").split(".")[-1]: m.group("value") for m in GRADLE_ASSIGNMENT.finditer(build_text)}
+
+
+def _resolve_gradle_version(version: str, variables: dict) -> str:
+    """
+    Resolves a trailing `$name` / `${expression}` from the known properties and variables.
+    Anything that can't be resolved is returned as written (is_resolved() is False for it).
+    """
+    match = PLACEHOLDER.search(version)
+    if not match:
+        return version
+    if match.group("name"):
+        names = [match.group("name")]
+    else:
+        names = [quoted or bare for quoted, bare in EXPRESSION_NAME.findall(match.group("expr"))]
+        names = [n for n in names if n not in ("get", "extra", "ext", "project", "rootProject", "property",
+                                               "findProperty", "properties", "versions")]
+    if not names:
+        return version
+    key = names[-1]
+    # gradle.properties keys keep their dots ("okhttp.version"); script variables are stored by last segment
+    value = variables.get(key) or variables.get(key.split(".")[-1])
+    return version[:match.start()] + value if value else version
+
+
+def parse_gradle_build(path: str, variables: dict) -> list[dict]:
+    """
+    String and map notation dependencies of a build.gradle(.kts), with `$property` versions resolved.
+    Versionless dependencies are BOM-managed when the script declares a platform / BOM.
+    """
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        text = f.read()
+    variables = {**variables, **gradle_variables(text)}
+
+    managed = bool(GRADLE_VERSION_MANAGEMENT.search(text))
+
+    declarations = []
+    for match in list(GRADLE_STRING_DEP.finditer(text)) + list(GRADLE_MAP_DEP.finditer(text)):
+        if not GRADLE_CONFIGURATIONS.search(match.group("conf")):
+            continue
+        kind = "bom" if match.groupdict().get("platform") else "library"
+        if match.group("version") is None:
+            # implementation("g:a"): like a POM dependency without <version>
+            version = MANAGED if managed and kind == "library" else "unknown"
+        else:
+            version = _resolve_gradle_version(match.group("version"), variables)
+        declarations.append(_declaration(match.group("group"), match.group("name"), version, kind=kind))
+    return declarations
+
+
+# --- MAVEN POMS ---
+def _strip_namespaces(root):
+    for element in root.iter():
+        if isinstance(element.tag, str) and "}" in element.tag:
+            element.tag = element.tag.split("}", 1)[1]
+    return root
+
+
+def _text(element, path: str, default=None):
+    found = element.find(path)
+    return found.text.strip() if found is not None and found.text else default
+
+
+class PomResolver:
+    """
+    Parses POMs with their in-repo parent chain: inherited properties, ${...} placeholders,
+    dependencyManagement (managed versions) and imported BOMs.
+    """
+
+    def __init__(self):
+        self._poms = {}
+
+    def load(self, path: str) -> dict:
+        path = os.path.abspath(path)
+        if path in self._poms:
+            return self._poms[path]
+        self._poms[path] = None  # Guards against parent cycles
+
+        root = _strip_namespaces(ET.parse(path).getroot())
+        parent = {}
+        parent_element = root.find("parent")
+        if parent_element is not None:
+            relative = _text(parent_element, "relativePath", "../pom.xml")
+            parent_path = os.path.normpath(os.path.join(os.path.dirname(path), relative))
+            if os.path.isdir(parent_path):
+                parent_path = os.path.join(parent_path, "pom.xml")
+            if os.path.exists(parent_path):
+                parent = self.load(parent_path) or {}
+
+        # groupId / version are inherited from the <parent> element when omitted
+        parent_group = _text(parent_element, "groupId") if parent_element is not None else None
+        parent_version = _text(parent_element, "version") if parent_element is not None else None
+        properties = dict(parent.get("properties", {}))
+        properties.update({"project.groupId": _text(root, "groupId") or parent_group,
+                           "project.version": _text(root, "version") or parent_version,
+                           "project.artifactId": _text(root, "artifactId"),
+                           "project.parent.version": parent_version})
+        properties_element = root.find("properties")
+        if properties_element is not None:
+            properties.update({child.tag: (child.text or "").strip() for child in properties_element})
+
+        pom = {"root": root, "properties": properties,
+               "managed": dict(parent.get("managed", {})), "boms": list(parent.get("boms", []))}
+        for dependency in root.findall("dependencyManagement/dependencies/dependency"):
+            declaration = self._dependency(dependency, properties)
+            if _text(dependency, "scope") == "import" and _text(dependency, "type") == "pom":
+                pom["boms"].append(declaration)
+            else:
+                pom["managed"][(declaration["group"], declaration["name"])] = declaration["version"]
+        self._poms[path] = pom
+        return pom
+
+    @staticmethod
+    def resolve(value: str, properties: dict, depth: int = 5) -> str:
+        for _ in range(depth):
+            if not value or "${" not in value:
+                break
+            value = POM_PLACEHOLDER.sub(lambda m: properties.get(m.group(1)) or m.group(0), value)
+        return value
+
+    def _dependency(self, element, properties: dict) -> dict:
+        group = self.resolve(_text(element, "groupId"), properties)
+        name = self.resolve(_text(element, "artifactId"), properties)
+        version = self.resolve(_text(element, "version"), properties)
+        return _declaration(group, name, version)
+
+    def declarations(self, path: str) -> list[dict]:
+        """Dependencies, managed dependencies and imported BOMs declared in this POM (not inherited ones)."""
+        pom = self.load(path)
+        root, properties = pom["root"], pom["properties"]
+        declarations = []
+
+        for dependency in root.findall("dependencyManagement/dependencies/dependency"):
+            declaration = self._dependency(dependency, properties)
+            if _text(dependency, "scope") == "import" and _text(dependency, "type") == "pom":
+                declaration["kind"] = "bom"
+            declarations.append(declaration)
+
+        for dependency in root.findall("dependencies/dependency"):
+            declaration = self._dependency(dependency, properties)
+            if declaration["version"] == "unknown":
+                managed = pom["managed"].get((declaration["group"], declaration["name"]))
+                declaration["version"] = managed or (MANAGED if pom["boms"] else "unknown")
+            declarations.append(declaration)
+        return declarations
+
+
+# --- REPOSITORY SCAN ---
+def discover_dependencies(repo_path: str, max_workers: int = 8) -> list[dict]:
+    """
+    Finds every version catalog, Gradle build script and POM in the repository and returns one
+    declaration per (module, coordinate, version):
+    {"module", "file", "alias", "group", "name", "version", "kind": library|bom}.
+    """
+    repo_path = os.path.abspath(repo_path)
+    files = find_build_files(repo_path, max_workers=max_workers)
+
+    # gradle.properties apply to their directory and everything below it
+    properties_by_dir = {}
+    for path in files:
+        if os.path.basename(path) == "gradle.properties":
+            properties_by_dir[os.path.dirname(path)] = read_gradle_properties(path)
+    build_variables = {}
+    for path in files:
+        if os.path.basename(path) in GRADLE_FILES:
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                build_variables.setdefault(os.path.dirname(path), {}).update(gradle_variables(f.read()))
+
+    def inherited(directory: str) -> dict:
+        chain = []
+        while True:
+            chain.append(directory)
+            if directory == repo_path or os.path.dirname(directory) == directory:
+                break
+            directory = os.path.dirname(directory)
+        variables = {}
+        for d in reversed(chain):  # Root first, closest directory wins
+            variables.update(properties_by_dir.get(d, {}))
+            variables.update(build_variables.get(d, {}))
+        return variables
+
+    poms = PomResolver()
+
+    def parse(path: str) -> list[dict]:
+        filename = os.path.basename(path)
+        try:
+            if filename.endswith(".versions.toml"):
+                declarations = parse_version_catalog(path)
+            elif filename in GRADLE_FILES:
+                declarations = parse_gradle_build(path, inherited(os.path.dirname(path)))
+            elif filename == "pom.xml":
+                declarations = poms.declarations(path)
+            else:
+                return []
+        except Exception as e:
+            print(f"⚠️ discovery: Could not parse {path}: {e}")
+            return []
+        module = module_of(repo_path, path)
+        relative = os.path.relpath(path, repo_path).replace(os.sep, "/")
+        return [dict(d, module=module, file=relative) for d in declarations]
+
+    # POM parent chains share PomResolver state, so POMs are parsed in this thread
+    gradle_files = [p for p in files if os.path.basename(p) != "pom.xml"]
+    pom_files = [p for p in files if os.path.basename(p) == "pom.xml"]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(parse, gradle_files))
+    results.extend(parse(p) for p in pom_files)
+
+    seen, declarations = set(), []
+    for declaration in (d for result in results for d in result):
+        key = (declaration["module"], declaration["group"], declaration["name"], declaration["version"])
+        if key not in seen:
+            seen.add(key)
+            declarations.append(declaration)
+    return declarations
@@ -0,0 +1,359 @@
+import hashlib
+import os
+import re
+
+from src.shared.llm_clients import estimate_tokens, estimate_tokens_by_chars
+
+# Per-agent profiles. Each option trades context the agent doesn't use for prefill tokens:
+#   comments:  keep | collapse (block / Javadoc comments on one line) | docs (Javadoc only, collapsed) | none
+#   imports:   keep | collapse (one line per package: `import java.util.{List, Map};`) | drop
+#   accessors: keep | summarize (runs of trivial getters / setters become one comment line)
+#   bodies:    keep | drop (method bodies become `{ ... }`, signatures and fields stay)
+#   dedupe:    method bodies identical to one already sent are replaced by a reference to it
+#   indent:    None keeps the original indentation, N re-indents with N spaces per nesting level
+#   number_lines: None | "all" | "anchors": prefix lines with their original number (`42:`) so findings can
+#                 cite it; "anchors" only numbers lines after a gap and every 5th line (counting is cheap)
+PROFILES = {
+    "review": {"comments": "collapse", "imports": "collapse", "accessors": "keep", "bodies": "keep",
+               "package": True, "annotations": True, "dedupe": True, "indent": None, "number_lines": "anchors"},
+    "tests": {"comments": "docs", "imports": "collapse", "accessors": "summarize", "bodies": "keep",
+              "package": True, "annotations": True, "dedupe": True, "indent": 1, "number_lines": None},
+    "diagram": {"comments": "none", "imports": "drop", "accessors": "summarize", "bodies": "drop",
+                "package": False, "annotations": False, "dedupe": False, "indent": 1, "number_lines": None},
+}
+
+LICENSE_WORDS = re.compile(r"copyright|licen[cs]e|spdx|all rights reserved|\(c\)", re.IGNORECASE)
+# Annotations code generators (Lombok's delombok, annotation processors) put on every member
+GENERATED_ANNOTATIONS = re.compile(
+    r"@(?:lombok\.Generated|(?:javax\.annotation\.(?:processing\.)?)?Generated(?:\([^)]*\))?"
+    r"|(?:java\.lang\.)?SuppressWarnings\(\s*\"all\"\s*\))\s*")
+ANNOTATION_LINE = re.compile(r"^(?:@[\w.]+(?:\([^()]*(?:\([^()]*\)[^()]*)*\))?\s*)+$")
+IMPORT_LINE = re.compile(r"^import\s+(static\s+)?([\w.]+)\.(\w+|\*)\s*;$")
+TYPE_PATTERN = r"[\w.]+(?:<[\w<>\[\], ?.]*>)?(?:\[\])*"
+GETTER = re.compile(r"^(?:public\s+|protected\s+)?(?:final\s+)?(" + TYPE_PATTERN + r")\s+((?:get|is)\w+)\(\)\s*"
+                    r"\{\s*return\s+(?:this\.)?\w+\s*;\s*\}$")
+SETTER = re.compile(r"^(?:public\s+|protected\s+)?(?:final\s+)?void\s+(set\w+)\(\s*(?:final\s+)?(" + TYPE_PATTERN +
+                    r")\s+(\w+)\s*\)\s*\{\s*(?:this\.)?\w+\s*=\s*\w+\s*;\s*\}$")
+NOT_A_METHOD = re.compile(r"^(?:[\w.]+\s+)*(?:class|interface|enum|record|@interface)\b|^(?:if|else|for|while|do|"
+                          r"switch|try|catch|finally|synchronized|return|new)\b|^static\s*\{|=|->")
+
+
+# --- SCANNER ---
+def _scan(content: str) -> list[dict]:
+    """
+    Splits Java source into line records: {"no", "code" (comments removed), "comment", "kind"
+    (None | "line" | "block" | "doc"), "block" (id of the multi-line comment it belongs to), "depth"
+    (brace depth at line start), "in_string" (inside a text block)}. Strings and chars are respected.
+    """
+    records = []
+    depth, in_comment, comment_kind, block_id, in_text_block = 0, False, None, 0, False
+    for no, line in enumerate(content.splitlines(), start=1):
+        code, comment = [], []
+        kind, line_block = (comment_kind if in_comment else None), (block_id if in_comment else None)
+        start_depth, started_in_text_block = depth, in_text_block
+        i, n = 0, len(line)
+        while i < n:
+            ch = line[i]
+            if in_comment:
+                end = line.find("*/", i)
+                if end < 0:
+                    comment.append(line[i:])
+                    break
+                comment.append(line[i:end])
+                i, in_comment = end + 2, False
+                continue
+            if in_text_block:
+                end = line.find('"""', i)
+                if end < 0:
+                    code.append(line[i:])
+                    break
+                code.append(line[i:end + 3])
+                i, in_text_block = end + 3, False
+                continue
+            if line.startswith('"""', i):
+                in_text_block = True
+                code.append('"""')
+                i += 3
+                continue
+            if ch in "\"'":
+                j = i + 1
+                while j < n and line[j] != ch:
+                    j += 2 if line[j] == "\\" else 1
+                code.append(line[i:j + 1])
+                i = j + 1
+                continue
+            if line.startswith("//", i):
+                comment.append(line[i + 2:])
+                kind = kind or "line"
+                break
+            if line.startswith("/*", i):
+                in_comment = True
+                comment_kind = "doc" if line.startswith("/**", i) and not line.startswith("/**/", i) else "block"
+                block_id += 1
+                kind, line_block = kind or comment_kind, block_id
+                i += 3 if comment_kind == "doc" else 2
+                continue
+            if ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth = max(0, depth - 1)
+            code.append(ch)
+            i += 1
+        records.append({"no": no, "code": "".join(code).rstrip(), "raw": line,
+                        "comment": " ".join(part.strip().lstrip("*").strip() for part in comment).strip(),
+                        "kind": kind, "block": line_block, "depth": start_depth,
+                        "in_string": started_in_text_block})
+    return records
+
+
+# --- RESULT ---
+class CompactedSource:
+    """Compacted text of one file plus the map back to its original line numbers."""
+
+    def __init__(self, path: str, lines: list[tuple[int, str]], original: str, number_lines: str = None):
+        self.path = path
+        self.line_map = [no for no, _ in lines]  # Compacted line index -> original line number (1-based)
+        rendered, previous = [], None
+        for no, text in lines:
+            anchor = number_lines == "all" or number_lines == "anchors" and (previous is None or no != previous + 1
+                                                                           or no % 5 == 0)
+            rendered.append(f"{no}:{text}" if anchor else text)
+            previous = no
+        self.text = "\n".join(rendered)
+        self.original_tokens = estimate_tokens(original)
+        self.compacted_tokens = estimate_tokens(self.text)
+        # Same savings under the plain characters / 4 estimate, so they don't hinge on one estimator
+        self.original_char_tokens = estimate_tokens_by_chars(original)
+        self.compacted_char_tokens = estimate_tokens_by_chars(self.text)
+
+    def original_line(self, compacted_line: int) -> int:
+        """Original line number of a (1-based) line of the compacted text."""
+        return self.line_map[max(0, min(compacted_line, len(self.line_map)) - 1)] if self.line_map else 0
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.original_tokens - self.compacted_tokens
+
+    def report(self) -> dict:
+        return {"file": self.path, "original_tokens": self.original_tokens, "compacted_tokens": self.compacted_tokens,
+                "saved_tokens": self.saved_tokens, "saved_pct": _pct(self.saved_tokens, self.original_tokens),
+                "saved_pct_chars": _pct(self.original_char_tokens - self.compacted_char_tokens,
+                                        self.original_char_tokens)}
+
+
+def _pct(part: int, whole: int) -> float:
+    return round(100 * part / whole, 1) if whole else 0.0
+
+
+# --- COMPACTOR ---
+class SourceCompactor:
+    """
+    Shrinks Java sources before they go into a prompt, following one of PROFILES.
+    One instance per prompt: bodies are deduplicated across the files it compacts.
+    AI_WORKSTATION_COMPACTION=off sends sources unchanged (still numbered / reported).
+    """
+
+    def __init__(self, profile: str):
+        self.profile = profile
+        self.options = PROFILES[profile]
+        self.enabled = os.getenv("AI_WORKSTATION_COMPACTION", "on").lower() not in ("off", "0", "false")
+        self.files = []
+        self._seen_bodies = {}  # Normalized body hash -> "File.java:line"
+
+    def compact(self, content: str, path: str) -> CompactedSource:
+        if self.enabled:
+            lines = self._compact_lines(_scan(content), os.path.basename(path))
+        else:
+            lines = list(enumerate(content.splitlines(), start=1))
+        result = CompactedSource(path, lines, content, self.options["number_lines"])
+        self.files.append(result)
+        return result
+
+    def report(self) -> list[dict]:
+        return [source.report() for source in self.files]
+
+    def summary(self) -> dict:
+        original = sum(source.original_tokens for source in self.files)
+        compacted = sum(source.compacted_tokens for source in self.files)
+        original_chars = sum(source.original_char_tokens for source in self.files)
+        compacted_chars = sum(source.compacted_char_tokens for source in self.files)
+        return {"profile": self.profile, "files": len(self.files), "original_tokens": original,
+                "compacted_tokens": compacted, "saved_tokens": original - compacted,
+                "saved_pct": _pct(original - compacted, original),
+                "saved_pct_chars": _pct(original_chars - compacted_chars, original_chars)}
+
+    # --- PASSES ---
+    def _compact_lines(self, records: list[dict], filename: str) -> list[tuple[int, str]]:
+        options = self.options
+        records = self._drop_license(records)
+        records = self._apply_comment_mode(records, options["comments"])
+        out = []  # (original line, depth, text, original indentation)
+        imports = []
+        i = 0
+        while i < len(records):
+            record = records[i]
+            code = record["code"] if record["in_string"] else record["code"].strip()
+            if record["in_string"]:
+                out.append((record["no"], None, record["raw"], ""))
+                i += 1
+                continue
+
+            code = GENERATED_ANNOTATIONS.sub("", code).strip()
+            if not options["annotations"] and ANNOTATION_LINE.match(code):
+                code = ""
+            comment = self._render_comment(record)
+            lead = record["raw"][:len(record["raw"]) - len(record["raw"].lstrip())]
+
+            if not code and not comment:
+                i += 1
+                continue
+
+            if code.startswith("package ") and not options["package"]:
+                i += 1
+                continue
+
+            import_match = IMPORT_LINE.match(code)
+            if import_match and options["imports"] != "keep":
+                if options["imports"] == "collapse":
+                    imports.append((record["no"], import_match))
+                i += 1
+                continue
+            if imports:
+                out.extend((no, 0, line, "") for no, line in self._collapse_imports(imports))
+                imports = []
+
+            if options["accessors"] == "summarize":
+                consumed, summary = self._accessor_run(records, i)
+                if consumed:
+                    out.append((record["no"], record["depth"], f"// accessors: {', '.join(summary)}", lead))
+                    i += consumed
+                    continue
+
+            if code.endswith("{") and self._is_method_start(code):
+                end = self._block_end(records, i)
+                body = [r["code"].strip() for r in records[i + 1:end]]
+                if options["bodies"] == "drop":
+                    out.append((record["no"], record["depth"], f"{code[:-1].rstrip()} {{ ... }}", lead))
+                    i = end + 1
+                    continue
+                if options["dedupe"] and len(body) >= 3:
+                    key = hashlib.sha1("\n".join(b for b in body if b).encode("utf-8")).hexdigest()
+                    seen = self._seen_bodies.get(key)
+                    if seen:
+                        text = f"{code[:-1].rstrip()} {{ /* same body as {seen} */ }}"
+                        out.append((record["no"], record["depth"], text, lead))
+                        i = end + 1
+                        continue
+                    self._seen_bodies[key] = f"{filename}:{record['no']}"
+
+            text = f"{code} {comment}".strip() if code else comment
+            out.append((record["no"], record["depth"] - (1 if code.startswith("}") else 0), text, lead))
+            i += 1
+        if imports:
+            out.extend((no, 0, line, "") for no, line in self._collapse_imports(imports))
+
+        return [(no, self._indent(depth, text, lead)) for no, depth, text, lead in out]
+
+    @staticmethod
+    def _drop_license(records: list[dict]) -> list[dict]:
+        """Leading comment blocks (before any code) that mention a copyright or license."""
+        first_code = next((i for i, r in enumerate(records) if r["code"].strip()), len(records))
+        header = records[:first_code]
+        if any(LICENSE_WORDS.search(r["comment"]) for r in header):
+            return [r for r in header if not r["comment"] and r["code"].strip()] + records[first_code:]
+        return records
+
+    @staticmethod
+    def _apply_comment_mode(records: list[dict], mode: str) -> list[dict]:
+        """Drops or merges comments: multi-line block / doc comments end up on their first line."""
+        result, blocks = [], {}
+        for record in records:
+            kind = record["kind"]
+            keep = mode in ("keep", "collapse") or (mode == "docs" and kind == "doc")
+            if kind and not keep:
+                record = dict(record, comment="", kind=None)
+            elif kind in ("block", "doc") and mode != "keep" and record["block"] is not None:
+                first = blocks.get(record["block"])
+                if first is not None and not record["code"].strip():
+                    first["comment"] = f"{first['comment']} {record['comment']}".strip()
+                    continue
+                record = dict(record)
+                blocks[record["block"]] = record
+            result.append(record)
+        return result
+
+    def _render_comment(self, record: dict) -> str:
+        if not record["kind"] or not record["comment"] and self.options["comments"] != "keep":
+            return ""
+        if self.options["comments"] == "keep":
+            return record["raw"].strip() if not record["code"].strip() else record["raw"][len(record["code"]):].strip()
+        if record["kind"] == "line":
+            return f"// {record['comment']}"
+        return f"/** {record['comment']} */" if record["kind"] == "doc" else f"/* {record['comment']} */"
+
+    @staticmethod
+    def _collapse_imports(imports: list) -> list[tuple[int, str]]:
+        """One (line of the first import, import line) per package."""
+        packages = {}
+        for no, match in imports:
+            static, package, name = match.groups()
+            packages.setdefault(((static or "").strip(), package), (no, []))[1].append(name)
+        lines = []
+        for (static, package), (no, names) in packages.items():
+            prefix = f"import {static + ' ' if static else ''}{package}."
+            lines.append((no, prefix + (names[0] if len(names) == 1 else "{" + ", ".join(names) + "}") + ";"))
+        return lines
+
+    @staticmethod
+    def _accessor_run(records: list[dict], start: int):
+        """
+        (records consumed, ["Type getX()", "setX(Type)"]) for the trivial accessors starting at `start`,
+        with the Javadoc and generated-code annotations attached to them.
+        """
+        i, end, summary = start, start, []
+        while i < len(records):
+            # Javadoc / generated annotations in front of an accessor go with it
+            while i < len(records) and not records[i]["in_string"] and records[i]["kind"] in (None, "doc") \
+                    and not GENERATED_ANNOTATIONS.sub("", records[i]["code"]).strip():
+                i += 1
+            for span in (1, 3):
+                chunk = records[i:i + span]
+                if len(chunk) < span or any(r["comment"] or r["in_string"] for r in chunk):
+                    continue
+                joined = " ".join(GENERATED_ANNOTATIONS.sub("", r["code"]).strip() for r in chunk)
+                getter, setter = GETTER.match(joined), SETTER.match(joined)
+                if getter:
+                    summary.append(f"{getter.group(1)} {getter.group(2)}()")
+                elif setter:
+                    summary.append(f"{setter.group(1)}({setter.group(2)})")
+                else:
+                    continue
+                i += span
+                end = i
+                break
+            else:
+                break
+        # A single accessor isn't worth a summary line of its own
+        return (end - start, summary) if len(summary) >= 2 else (0, None)
+
+    @staticmethod
+    def _is_method_start(code: str) -> bool:
+        return "(" in code and ")" in code and not NOT_A_METHOD.search(code)
+
+    @staticmethod
+    def _block_end(records: list[dict], start: int) -> int:
+        """Index of the record that closes the block opened on `start`."""
+        depth = records[start]["depth"]
+        for j in range(start + 1, len(records)):
+            if records[j]["depth"] <= depth:
+                return j - 1
+            if j + 1 < len(records) and records[j + 1]["depth"] <= depth:
+                return j
+        return len(records) - 1
+
+    def _indent(self, depth, text: str, lead: str) -> str:
+        if depth is None:
+            return text
+        if self.options["indent"] is None:
+            return lead + text
+        return " " * (self.options["indent"] * max(0, depth)) + text
@@ -0,0 +1,127 @@
+import getpass
+import os
+import uuid
+from datetime import datetime, timezone
+from functools import lru_cache
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from src.shared.storage import get_cache_dir
+
+# Low-cardinality columns are dictionary-encoded (stored once per row group, loaded as categoricals)
+_LABEL = pa.dictionary(pa.int16(), pa.string())
+
+REPORT_SCHEMA = pa.schema([
+    ("run_id", _LABEL),
+    ("checked_at", pa.timestamp("ms", tz="UTC")),
+    ("module", _LABEL),
+    ("file", _LABEL),
+    ("package", pa.string()),
+    ("group", pa.string()),
+    ("artifact", pa.string()),
+    ("coordinate", pa.string()),
+    ("kind", _LABEL),
+    ("version", pa.string()),
+    ("latest_version", pa.string()),
+    ("status", _LABEL),
+    ("source", _LABEL),
+    ("stale", pa.bool_()),
+    ("mvn_link", pa.string()),
+])
+
+
+def report_dir(user: str = None) -> str:
+    """Per-user directory holding one parquet file per dependency run (an appendable dataset)."""
+    return get_cache_dir("reports", user or getpass.getuser(), "dependencies")
+
+
+def new_run_id() -> str:
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ") + "-" + uuid.uuid4().hex[:6]
+
+
+def write_report(rows: pd.DataFrame, directory: str = None, run_id: str = None) -> str:
+    """
+    Writes one run as `<run_id>.parquet` in the report directory and returns its path.
+    Rows are the flat records from DependencyInspectorAgent.check_project_dependencies.
+    """
+    directory = directory or report_dir()
+    os.makedirs(directory, exist_ok=True)
+    run_id = run_id or new_run_id()
+
+    frame = rows.copy()
+    frame["run_id"] = run_id
+    frame["checked_at"] = pd.Timestamp.now(tz="UTC").floor("ms")
+    for field in REPORT_SCHEMA:
+        if field.name not in frame:
+            frame[field.name] = None
+        if pa.types.is_dictionary(field.type):
+            frame[field.name] = frame[field.name].astype("string").astype("category")
+    table = pa.Table.from_pandas(frame[REPORT_SCHEMA.names], schema=REPORT_SCHEMA, preserve_index=False)
+
+    path = os.path.join(directory, f"{run_id}.parquet")
+    temp_path = path + ".tmp"
+    pq.write_table(table, temp_path)
+    os.replace(temp_path, path)  # Readers never see a half-written run
+    return path
+
+
+def fingerprint(path: str) -> tuple:
+    stat = os.stat(path)
+    return path, stat.st_mtime_ns, stat.st_size
+
+
+@lru_cache(maxsize=16)
+def _load(path: str, mtime_ns: int, size: int) -> pd.DataFrame:
+    return pq.read_table(path).to_pandas()
+
+
+def load_report(path: str) -> pd.DataFrame:
+    """
+    Reads a run, memoized by file fingerprint (reruns of the app don't touch the disk).
+    Each caller gets its own copy, so filtering or adding columns never changes the cached report.
+    """
+    return _load(*fingerprint(path)).copy()
+
+
+@lru_cache(maxsize=16)
+def _summarize(path: str, mtime_ns: int, size: int) -> dict:
+    status = pq.read_table(path, columns=["status", "stale"]).to_pandas()
+    counts = status["status"].value_counts()
+    return {
+        "total": len(status),
+        "outdated": int(counts.get("outdated", 0)),
+        "stale": int(status["stale"].fillna(False).sum()),
+    }
+
+
+def summarize_report(path: str) -> dict:
+    """{"total", "outdated", "stale"} of a run, memoized by file fingerprint."""
+    return dict(_summarize(*fingerprint(path)))
+
+
+def load_history(directory: str = None, columns: list = None, coordinate: str = None) -> pd.DataFrame:
+    """
+    Reads every run of the report directory as one dataset, only the requested columns,
+    optionally for a single coordinate (filter pushed down to the parquet reader).
+    """
+    directory = directory or report_dir()
+    files = sorted(os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(".parquet"))
+    if not files:
+        return pd.DataFrame(columns=columns or REPORT_SCHEMA.names)
+    dataset = ds.dataset(files, schema=REPORT_SCHEMA, format="parquet")
+    condition = ds.field("coordinate") == coordinate if coordinate else None
+    return dataset.to_table(columns=columns, filter=condition).to_pandas()
+
+
+def outdated_over_time(directory: str = None) -> pd.DataFrame:
+    """Outdated / total declarations per run, oldest first."""
+    history = load_history(directory, columns=["run_id", "checked_at", "status"])
+    if history.empty:
+        return history
+    history["outdated"] = history["status"] == "outdated"
+    summary = history.groupby(["run_id", "checked_at"], observed=True).agg(
+        total=("status", "size"), outdated=("outdated", "sum"))
+    return summary.reset_index().sort_values("checked_at")
@@ -1,3 +1,4 @@
+import hashlib
 import os
 from git import Repo
 
@@ -22,3 +23,24 @@ def read_file(repo_path: str, filepath: str) -> str:
             return f.read()
     except Exception as e:
         return f"Error reading file: {e}"
+
+
+def staged_fingerprint(repo_path: str) -> str:
+    """
+    Hash of the staged .java files: their index blob ids (the staged tree) plus the size and
+    mtime of the working copies, which are what the agents actually read.
+    """
+    digest = hashlib.sha1()
+    try:
+        entries = Repo(repo_path).index.entries
+    except Exception:
+        return digest.hexdigest()
+    for path in sorted(get_staged_files(repo_path)):
+        entry = entries.get((path, 0))
+        digest.update(f"{path}\0{entry.hexsha if entry else ''}\0".encode())
+        try:
+            stat = os.stat(os.path.join(repo_path, path))
+            digest.update(f"{stat.st_size}:{stat.st_mtime_ns}\0".encode())
+        except OSError:
+            pass
+    return digest.hexdigest()
@@ -0,0 +1,163 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+CANCEL_REQUESTED = "cancel requested"  # Display label only: the job is still running
+
+
+class JobCancelled(Exception):
+    """Raised inside a job (by Job.report / Job.check) once cancellation was requested."""
+
+
+class Job:
+    """
+    One agent operation running on the JobManager pool.
+    The operation receives the Job and may call `report()` to publish progress and partial
+    results; cancellation is cooperative (checked on every report).
+    """
+
+    def __init__(self, name: str, owner: str = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.owner = owner
+        self.status = QUEUED
+        self.progress = None  # 0..1, None while indeterminate
+        self.message = None
+        self.partial = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._future = None
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    @property
+    def status_label(self) -> str:
+        """Status for display. A model call can't be interrupted: a cancelled job runs until it returns."""
+        if self.status == RUNNING and self.cancel_requested:
+            return CANCEL_REQUESTED
+        return self.status
+
+    @property
+    def elapsed(self) -> float:
+        if not self.started_at:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def check(self):
+        if self._cancel.is_set():
+            raise JobCancelled(self.name)
+
+    def report(self, progress: float = None, message: str = None, partial=None):
+        """Publishes progress (0..1), a status message and/or one partial result."""
+        self.check()
+        with self._lock:
+            if progress is not None:
+                self.progress = max(0.0, min(1.0, progress))
+            if message is not None:
+                self.message = message
+            if partial is not None:
+                self.partial.append(partial)
+
+    def snapshot_partial(self) -> list:
+        with self._lock:
+            return list(self.partial)
+
+    def cancel(self) -> bool:
+        """
+        Requests cancellation. Queued jobs never start; running ones stop at their next report() or,
+        for a single model call, once it returns (its result is discarded). Until then the job keeps
+        status RUNNING and `status_label` reads "cancel requested".
+        """
+        if self.finished:
+            return False
+        self._cancel.set()
+        if self._future is not None and self._future.cancel():
+            self._finish(CANCELLED)
+        return True
+
+    def _finish(self, status: str, result=None, error: str = None):
+        with self._lock:
+            self.status = status
+            self.result = result
+            self.error = error
+            self.finished_at = time.time()
+            if status == DONE:
+                self.progress = 1.0
+
+
+class JobManager:
+    """
+    Bounded worker pool for long agent operations (reviews, test / diagram generation, Maven checks).
+    Thread-safe; one instance can be shared by every session of the app. Finished jobs are kept
+    (most recent `keep_finished`) so their results can still be collected.
+    """
+
+    def __init__(self, max_workers: int = 4, keep_finished: int = 100):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent-job")
+        self.keep_finished = keep_finished
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, name: str, operation, owner: str = None) -> Job:
+        """Runs `operation(job)` on the pool and returns its Job right away."""
+        job = Job(name, owner=owner)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        job._future = self.pool.submit(self._run, job, operation)
+        return job
+
+    @staticmethod
+    def _run(job: Job, operation):
+        if job.cancel_requested:
+            job._finish(CANCELLED)
+            return
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            result = operation(job)
+            job.check()  # A cancelled job's late result is discarded
+            job._finish(DONE, result=result)
+        except JobCancelled:
+            job._finish(CANCELLED)
+        except Exception as e:
+            print(f"❌ job: {job.name} failed: {e}")
+            job._finish(FAILED, error=str(e))
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.get(job_id)
+        return job.cancel() if job else False
+
+    def jobs(self, owner: str = None) -> list[Job]:
+        """Jobs (optionally of one owner), newest first."""
+        with self._lock:
+            jobs = [j for j in self._jobs.values() if owner is None or j.owner == owner]
+        return sorted(jobs, key=lambda j: j.created_at, reverse=True)
+
+    def _prune(self):
+        finished = sorted((j for j in self._jobs.values() if j.finished), key=lambda j: j.finished_at)
+        for job in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job.id]
+
+    def shutdown(self):
+        for job in self.jobs():
+            job.cancel()
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -1,27 +1,107 @@
+import hashlib
+import json
 import os
-import ollama
-from google import genai
-from google.genai import types
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+# Provider SDKs are imported by the client that needs them: `google.genai` alone takes longer to
+# import than the rest of an agent, and a headless Ollama run should never pay for it.
+
+
+# --- USAGE TRACKING ---
+_usage_lock = threading.Lock()
+_usage_log = None  # List collecting every model call while track_usage() is active
+
+
+# BPE-like pieces: whitespace runs (indentation) merge into one token, words split every ~4 characters
+TOKEN_PIECE = re.compile(r"\s+|\w{1,4}|[^\w\s]{1,2}")
+
+
+def estimate_tokens(text) -> int:
+    """Rough token count for providers that don't report usage (close to code-trained BPE vocabularies)."""
+    return len(TOKEN_PIECE.findall(str(text or "")))
+
+
+def estimate_tokens_by_chars(text) -> int:
+    """The earlier ~4 characters per token estimate, kept so savings can be compared across estimators."""
+    return -(-len(str(text or "")) // 4)
+
+
+@contextmanager
+def track_usage():
+    """
+    Collects one entry per model call made in this process (any client, forks and worker threads
+    included) while active: {"model", "prompt_tokens", "cached_tokens", "completion_tokens",
+    "prefill_s", "decode_s", "total_s"}. prefill_s / decode_s are None when the provider doesn't say.
+    """
+    global _usage_log
+    calls = []
+    with _usage_lock:
+        previous, _usage_log = _usage_log, calls
+    try:
+        yield calls
+    finally:
+        with _usage_lock:
+            _usage_log = previous
+
+
+def _usage_target():
+    """Collector active when a call starts; calls finishing after track_usage() exits still land there."""
+    return _usage_log
+
+
+def _log_usage(target, **call):
+    if target is not None:
+        with _usage_lock:
+            target.append(call)
 
 
 # --- GOOGLE CLIENT (Simple) ---
 class GoogleClient:
     def __init__(self, model_name="gemini-3-flash-preview", tools=None):
+        from google import genai
         self.client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
         self.model_name = model_name
         self.chat = None
+        self.config = None
 
     def start_session(self, system_instruction: str):
+        from google.genai import types
         # Gemini handles context natively
+        self.config = types.GenerateContentConfig(
+            system_instruction=system_instruction
+        )
         self.chat = self.client.chats.create(
             model=self.model_name,
-            config=types.GenerateContentConfig(
-                system_instruction=system_instruction
-            )
+            config=self.config
         )
 
     def ask(self, prompt: str) -> str:
-        return self.chat.send_message(prompt).text
+        started, usage_log = time.perf_counter(), _usage_target()
+        response = self.chat.send_message(prompt)
+        usage = getattr(response, "usage_metadata", None)
+        _log_usage(usage_log, model=self.model_name,
+                   prompt_tokens=getattr(usage, "prompt_token_count", None) or estimate_tokens(prompt),
+                   cached_tokens=getattr(usage, "cached_content_token_count", None) or 0,
+                   completion_tokens=getattr(usage, "candidates_token_count", None) or estimate_tokens(response.text),
+                   prefill_s=None, decode_s=None, total_s=time.perf_counter() - started)
+        return response.text
+
+    def fork(self):
+        """Independent copy of the conversation so far (shares the API client)."""
+        forked = GoogleClient.__new__(GoogleClient)
+        forked.client = self.client
+        forked.model_name = self.model_name
+        forked.config = self.config
+        forked.chat = self.client.chats.create(
+            model=self.model_name,
+            config=self.config,
+            history=self.chat.get_history()
+        )
+        return forked
 
 
 # --- OLLAMA CLIENT (The "Dumb Pipe" Fix) ---
@@ -41,8 +121,10 @@ class OllamaClient:
         print(f"🔹 Sending prompt to Ollama...")
         self.messages.append({"role": "user", "content": prompt})
 
+        import ollama
         # SINGLE CALL - NO LOOPS
         # This might take 2-5 seconds to process the context
+        started, usage_log = time.perf_counter(), _usage_target()
         response = ollama.chat(
             model=self.model_name,
             messages=self.messages
@@ -52,4 +134,158 @@ class OllamaClient:
         content = response.message.content
         self.messages.append(response.message)
 
+        # Ollama reports token counts and durations (ns) per phase
+        prefill_ns, decode_ns = getattr(response, "prompt_eval_duration", None), getattr(response, "eval_duration", None)
+        _log_usage(usage_log, model=self.model_name,
+                   prompt_tokens=getattr(response, "prompt_eval_count", None) or sum(
+                       estimate_tokens(m["content"] if isinstance(m, dict) else m.content) for m in self.messages[:-1]),
+                   cached_tokens=0,
+                   completion_tokens=getattr(response, "eval_count", None) or estimate_tokens(content),
+                   prefill_s=prefill_ns / 1e9 if prefill_ns else None, decode_s=decode_ns / 1e9 if decode_ns else None,
+                   total_s=time.perf_counter() - started)
+
+        return content
+
+    def fork(self):
+        """Independent copy of the conversation so far."""
+        forked = OllamaClient(model_name=self.model_name)
+        forked.messages = list(self.messages)
+        return forked
+
+
+# --- REPLAY CLIENT (Benchmarks & offline runs) ---
+@lru_cache(maxsize=8)
+def _load_fixtures(path: str, mtime: float) -> tuple:
+    entries = []
+    paths = sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".jsonl")) \
+        if os.path.isdir(path) else [path]
+    for fixture_file in paths:
+        with open(fixture_file, "r", encoding="utf-8") as f:
+            entries.extend(json.loads(line) for line in f if line.strip())
+    return tuple(entries)
+
+
+def load_fixtures(path: str) -> tuple:
+    """Recorded responses of a .jsonl file, or of every .jsonl file in a directory (in name order)."""
+    mtime = max([os.path.getmtime(path)] + ([os.path.getmtime(os.path.join(path, n)) for n in os.listdir(path)]
+                                            if os.path.isdir(path) else []))
+    return _load_fixtures(path, mtime)
+
+
+def system_fingerprint(system_instruction: str) -> str:
+    return hashlib.sha256(system_instruction.encode("utf-8")).hexdigest()[:16]
+
+
+class ReplayClient:
+    """
+    Deterministic stand-in for a model: answers from recorded fixtures (AI_WORKSTATION_REPLAY_FIXTURES)
+    and sleeps like a local model would, `prefill_ms_per_token` for every prompt token not already in
+    the session's KV cache and `decode_ms_per_token` for every generated token.
+
+    Fixture lines are tried in order; the first one whose given fields all match wins:
+      {"prompt": exact prompt, "match": regex on the prompt, "system_sha": system_fingerprint(),
+       "system_match": regex on the system prompt, "response": text}
+    """
+
+    def __init__(self, model_name="replay", tools=None, fixtures: str = None,
+                 prefill_ms_per_token: float = None, decode_ms_per_token: float = None):
+        self.model_name = model_name
+        self.fixtures = fixtures or os.getenv("AI_WORKSTATION_REPLAY_FIXTURES") or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "benchmarks", "fixtures")
+        self.prefill_ms_per_token = prefill_ms_per_token if prefill_ms_per_token is not None else \
+            float(os.getenv("AI_WORKSTATION_REPLAY_PREFILL_MS", "0.1"))
+        self.decode_ms_per_token = decode_ms_per_token if decode_ms_per_token is not None else \
+            float(os.getenv("AI_WORKSTATION_REPLAY_DECODE_MS", "2"))
+        self.system_instruction = ""
+        self.messages = []
+        self.context_tokens = 0  # Tokens already prefilled (KV cache of this conversation)
+
+    def start_session(self, system_instruction: str):
+        self.system_instruction = system_instruction
+        self.messages = [{"role": "system", "content": system_instruction}]
+        self.context_tokens = 0
+        print(f"🔹 Session started with {self.model_name} (replay)")
+
+    def _lookup(self, prompt: str) -> str:
+        system_sha = system_fingerprint(self.system_instruction)
+        for entry in load_fixtures(self.fixtures):
+            if "prompt" in entry and entry["prompt"] != prompt:
+                continue
+            if "match" in entry and not re.search(entry["match"], prompt):
+                continue
+            if "system_sha" in entry and entry["system_sha"] != system_sha:
+                continue
+            if "system_match" in entry and not re.search(entry["system_match"], self.system_instruction):
+                continue
+            return entry["response"]
+        raise LookupError(f"No recorded response in {self.fixtures} for prompt: {prompt[:80]!r}")
+
+    def ask(self, prompt: str) -> str:
+        started, usage_log = time.perf_counter(), _usage_target()
+        self.messages.append({"role": "user", "content": prompt})
+        content = self._lookup(prompt)
+
+        prompt_tokens = sum(estimate_tokens(m["content"]) for m in self.messages)
+        new_tokens = prompt_tokens - self.context_tokens
+        completion_tokens = estimate_tokens(content)
+        prefill_s = new_tokens * self.prefill_ms_per_token / 1000
+        decode_s = completion_tokens * self.decode_ms_per_token / 1000
+        time.sleep(prefill_s + decode_s)
+
+        self.messages.append({"role": "assistant", "content": content})
+        self.context_tokens = prompt_tokens + completion_tokens
+        _log_usage(usage_log, model=self.model_name, prompt_tokens=prompt_tokens, cached_tokens=prompt_tokens - new_tokens,
+                   completion_tokens=completion_tokens, prefill_s=prefill_s, decode_s=decode_s,
+                   total_s=time.perf_counter() - started)
+        return content
+
+    def fork(self):
+        """Independent copy of the conversation so far (its KV cache included)."""
+        forked = ReplayClient(self.model_name, fixtures=self.fixtures, prefill_ms_per_token=self.prefill_ms_per_token,
+                              decode_ms_per_token=self.decode_ms_per_token)
+        forked.system_instruction = self.system_instruction
+        forked.messages = list(self.messages)
+        forked.context_tokens = self.context_tokens
+        return forked
+
+
+# --- RECORDING (Capture fixtures from a real provider) ---
+class RecordingClient:
+    """Wraps a real client and appends every exchange to a fixture file ReplayClient can replay."""
+
+    _lock = threading.Lock()
+
+    def __init__(self, client, path: str):
+        self.client = client
+        self.path = path
+        self.system_instruction = ""
+
+    def start_session(self, system_instruction: str):
+        self.system_instruction = system_instruction
+        self.client.start_session(system_instruction)
+
+    def ask(self, prompt: str) -> str:
+        content = self.client.ask(prompt)
+        entry = {"prompt": prompt, "system_sha": system_fingerprint(self.system_instruction), "response": content}
+        with RecordingClient._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
         return content
+
+    def fork(self):
+        forked = RecordingClient(self.client.fork(), self.path)
+        forked.system_instruction = self.system_instruction
+        return forked
+
+
+def create_client(provider: str):
+    """
+    Model client for a provider name: "google" (Gemini), "replay" (recorded fixtures) or Ollama.
+    With AI_WORKSTATION_RECORD_FIXTURES set, real exchanges are also recorded to that file.
+    """
+    provider = provider.lower()
+    if "replay" in provider:
+        return ReplayClient()
+    client = GoogleClient(model_name="gemini-3-flash-preview") if "google" in provider \
+        else OllamaClient(model_name="qwen2.5-coder:14b")
+    record_path = os.getenv("AI_WORKSTATION_RECORD_FIXTURES")
+    return RecordingClient(client, record_path) if record_path else client
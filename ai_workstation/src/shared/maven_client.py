@@ -0,0 +1,164 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from src.shared.version_cache import VersionCache
+
+DEFAULT_SEARCH_URL = "https://search.maven.org/solrsearch/select"
+
+NOT_FOUND = "Not Found"
+CONNECTION_ERROR = "Connection Error"
+NOT_CACHED = "Not Cached"
+
+
+class HostRateLimiter:
+    """Spaces requests to the same host at least 1 / requests_per_second apart (thread-safe)."""
+
+    def __init__(self, requests_per_second: float):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def wait(self, url: str):
+        if not self.interval:
+            return
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class MavenCentralClient:
+    """
+    Latest-version lookups against the Maven Central search API.
+    One pooled keep-alive session, per-host rate limiting, retries with exponential backoff
+    (429 / 5xx / connection errors) and a bounded thread pool for bulk lookups.
+    The endpoint can be pointed at a local stand-in with MAVEN_SEARCH_URL.
+
+    With a VersionCache, fresh entries are answered locally and expired ones are revalidated
+    (If-None-Match when an ETag is known). In offline mode (or MAVEN_OFFLINE=1) nothing goes to
+    the network: every answer comes from the cache and is marked stale once past its TTL.
+    """
+
+    def __init__(self, search_url: str = None, max_workers: int = 8, requests_per_second: float = 10.0,
+                 retries: int = 3, backoff_factor: float = 0.5, timeout: float = 5.0,
+                 cache: VersionCache = None, offline: bool = None):
+        self.search_url = search_url or os.getenv("MAVEN_SEARCH_URL") or DEFAULT_SEARCH_URL
+        self.cache = cache
+        if offline is None:
+            offline = os.getenv("MAVEN_OFFLINE", "").lower() in ("1", "true", "yes")
+        self.offline = offline
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.rate_limiter = HostRateLimiter(requests_per_second)
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET",),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _fetch(self, group: str, name: str, etag: str = None):
+        """(latest_version, etag, not_modified). latest_version is NOT_FOUND / CONNECTION_ERROR on failure."""
+        params = {"q": f"g:{group} AND a:{name}", "rows": 1, "wt": "json"}
+        headers = {"If-None-Match": etag} if etag else None
+        try:
+            self.rate_limiter.wait(self.search_url)
+            response = self.session.get(self.search_url, params=params, headers=headers, timeout=self.timeout)
+            if response.status_code == 304:
+                return None, etag, True
+            if response.status_code == 200:
+                docs = response.json().get("response", {}).get("docs", [])
+                if docs and docs[0].get("latestVersion"):
+                    return docs[0]["latestVersion"], response.headers.get("ETag"), False
+                return NOT_FOUND, None, False
+            if response.status_code == 404:
+                return NOT_FOUND, None, False
+            return CONNECTION_ERROR, None, False  # Retries exhausted on 429 / 5xx
+        except Exception:
+            return CONNECTION_ERROR, None, False
+
+    def latest_version(self, group: str, name: str) -> str:
+        """Latest version string, NOT_FOUND or CONNECTION_ERROR (always from the network)."""
+        return self._fetch(group, name)[0]
+
+    @staticmethod
+    def _result(latest_version, source, stale=False, fetched_at=None) -> dict:
+        return {"latest_version": latest_version, "source": source, "stale": stale, "fetched_at": fetched_at}
+
+    def latest_versions(self, coordinates):
+        """
+        Looks up many (group, name) pairs, each one once.
+        Yields ((group, name), result) in completion order, where result is
+        {"latest_version", "source": cache|network|revalidated|offline, "stale", "fetched_at"}.
+        Fresh cache hits come first; expired and missing entries are fetched concurrently and
+        written back to the cache in one transaction.
+        """
+        unique = list(dict.fromkeys(coordinates))
+        cached = self.cache.get_many(VersionCache.key(g, n) for g, n in unique) if self.cache else {}
+        now = time.time()
+
+        pending = []
+        for coordinate in unique:
+            entry = cached.get(VersionCache.key(*coordinate))
+            if entry and self.cache.is_fresh(entry, now):
+                yield coordinate, self._result(entry["latest_version"], "cache", fetched_at=entry["fetched_at"])
+            elif self.offline:
+                if entry:
+                    yield coordinate, self._result(entry["latest_version"], "cache", True, entry["fetched_at"])
+                else:
+                    yield coordinate, self._result(NOT_CACHED, "offline", True)
+            else:
+                pending.append((coordinate, entry))
+
+        if not pending:
+            return
+
+        updates = {}
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            futures = {
+                pool.submit(self._fetch, group, name, entry and entry["etag"]): ((group, name), entry)
+                for (group, name), entry in pending
+            }
+            for future in as_completed(futures):
+                coordinate, entry = futures[future]
+                version, etag, not_modified = future.result()
+                fetched_at = time.time()
+
+                if not_modified and entry:
+                    updates[VersionCache.key(*coordinate)] = dict(entry, fetched_at=fetched_at)
+                    yield coordinate, self._result(entry["latest_version"], "revalidated", fetched_at=fetched_at)
+                elif version == CONNECTION_ERROR and entry:
+                    # Network trouble: fall back to the expired answer instead of an error
+                    yield coordinate, self._result(entry["latest_version"], "cache", True, entry["fetched_at"])
+                elif version == CONNECTION_ERROR:
+                    yield coordinate, self._result(version, "network")
+                else:  # A version or a definitive NOT_FOUND
+                    updates[VersionCache.key(*coordinate)] = {
+                        "latest_version": version, "etag": etag, "fetched_at": fetched_at}
+                    yield coordinate, self._result(version, "network", fetched_at=fetched_at)
+        finally:
+            # Consumer stopped early (e.g. a cancelled job): drop the lookups that haven't started
+            pool.shutdown(wait=False, cancel_futures=True)
+            if self.cache:
+                self.cache.put_many(updates)
+
+    def close(self):
+        self.session.close()
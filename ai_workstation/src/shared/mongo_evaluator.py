@@ -0,0 +1,607 @@
+import copy
+import datetime
+import math
+import re
+from functools import cmp_to_key
+
+from src.shared.mongo_pipeline import ObjectId, parse_date
+
+MISSING = object()
+
+SHELL_OBJECT_ID = re.compile(r"""^ObjectId\(['"]?([^'")]*)['"]?\)$""")
+SHELL_DATE = re.compile(r"""^(?:ISODate|new Date)\(['"]?([^'")]*)['"]?\)$""")
+
+
+class UnsupportedOperation(ValueError):
+    """The pipeline uses a stage or operator the local evaluator does not implement."""
+
+
+# --- DOCUMENT NORMALIZATION ---
+def normalize_document(value):
+    """
+    Converts sample/export values to comparable Python values:
+    extended JSON ({"$oid"}, {"$date"}, {"$numberLong"}...) and shell strings ("ISODate('...')").
+    """
+    if isinstance(value, dict):
+        if len(value) == 1:
+            key, inner = next(iter(value.items()))
+            if key == "$oid":
+                return ObjectId(inner)
+            if key == "$date":
+                if isinstance(inner, dict):  # {"$date": {"$numberLong": "1700000000000"}}
+                    inner = int(next(iter(inner.values())))
+                if isinstance(inner, (int, float)):
+                    return datetime.datetime.fromtimestamp(inner / 1000, tz=datetime.timezone.utc)
+                return parse_date(inner)
+            if key in ("$numberLong", "$numberInt"):
+                return int(inner)
+            if key in ("$numberDouble", "$numberDecimal"):
+                return float(inner)
+        return {k: normalize_document(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [normalize_document(v) for v in value]
+    if isinstance(value, str):
+        match = SHELL_OBJECT_ID.match(value)
+        if match:
+            return ObjectId(match.group(1))
+        match = SHELL_DATE.match(value)
+        if match:
+            try:
+                return parse_date(match.group(1))
+            except ValueError:
+                return value
+    return value
+
+
+# --- FIELD ACCESS ---
+def get_field(document, path: str):
+    """Aggregation-style access: arrays along the path map to arrays of sub-values."""
+    value = document
+    for part in path.split("."):
+        if isinstance(value, dict):
+            value = value.get(part, MISSING)
+        elif isinstance(value, list):
+            values = [v.get(part, MISSING) if isinstance(v, dict) else MISSING for v in value]
+            value = [v for v in values if v is not MISSING]
+        else:
+            return MISSING
+        if value is MISSING:
+            return MISSING
+    return value
+
+
+def query_values(document, path: str) -> list:
+    """Query-style access: every candidate value at a path (array elements and the array itself)."""
+    values = [document]
+    for part in path.split("."):
+        next_values = []
+        for value in values:
+            if isinstance(value, dict) and part in value:
+                next_values.append(value[part])
+            elif isinstance(value, list):
+                if part.isdigit() and int(part) < len(value):
+                    next_values.append(value[int(part)])
+                for item in value:
+                    if isinstance(item, dict) and part in item:
+                        next_values.append(item[part])
+        values = next_values
+    expanded = []
+    for value in values:
+        expanded.append(value)
+        if isinstance(value, list):
+            expanded.extend(value)
+    return expanded
+
+
+def set_field(document: dict, path: str, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        document = document.setdefault(part, {})
+    document[parts[-1]] = value
+
+
+def remove_field(document: dict, path: str):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        document = document.get(part)
+        if not isinstance(document, dict):
+            return
+    document.pop(parts[-1], None)
+
+
+# --- ORDERING (BSON comparison order, simplified) ---
+def _type_rank(value) -> int:
+    if value is None or value is MISSING:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str) and not isinstance(value, ObjectId):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, list):
+        return 5
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime.datetime):
+        return 9
+    return 10
+
+
+def compare(a, b) -> int:
+    rank_a, rank_b = _type_rank(a), _type_rank(b)
+    if rank_a != rank_b:
+        return -1 if rank_a < rank_b else 1
+    if rank_a == 1:
+        return 0
+    if rank_a == 4:
+        return compare(list(a.items()), list(b.items()))
+    if rank_a == 5:
+        for x, y in zip(a, b):
+            result = compare(x, y)
+            if result:
+                return result
+        return (len(a) > len(b)) - (len(a) < len(b))
+    if isinstance(a, tuple):
+        return compare(list(a), list(b))
+    return (a > b) - (a < b)
+
+
+def _comparable(a, b) -> bool:
+    return _type_rank(a) == _type_rank(b) and _type_rank(a) not in (1, 4, 5)
+
+
+# --- QUERY MATCHING ---
+def matches(document: dict, query: dict) -> bool:
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(matches(document, c) for c in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(document, c) for c in condition):
+                return False
+        elif key == "$nor":
+            if any(matches(document, c) for c in condition):
+                return False
+        elif key == "$expr":
+            if not _truthy(evaluate(condition, document)):
+                return False
+        elif key == "$comment":
+            continue
+        elif key.startswith("$"):
+            raise UnsupportedOperation(f"Query operator `{key}` is not supported in previews.")
+        elif not _field_matches(document, key, condition):
+            return False
+    return True
+
+
+def _field_matches(document: dict, path: str, condition) -> bool:
+    values = query_values(document, path)
+    is_operator = isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition)
+    if not is_operator:
+        return _equals_any(values, condition)
+
+    for operator, operand in condition.items():
+        if operator == "$options":
+            continue
+        if not _apply_operator(operator, operand, values, document, path, condition):
+            return False
+    return True
+
+
+def _equals_any(values: list, target) -> bool:
+    if isinstance(target, re.Pattern):
+        return any(isinstance(v, str) and target.search(v) for v in values)
+    if target is None:
+        return not values or any(v is None for v in values)
+    return any(compare(v, target) == 0 and _type_rank(v) == _type_rank(target) for v in values)
+
+
+def _apply_operator(operator, operand, values, document, path, condition) -> bool:
+    if operator == "$eq":
+        return _equals_any(values, operand)
+    if operator == "$ne":
+        return not _equals_any(values, operand)
+    if operator in ("$gt", "$gte", "$lt", "$lte"):
+        check = {"$gt": lambda c: c > 0, "$gte": lambda c: c >= 0,
+                 "$lt": lambda c: c < 0, "$lte": lambda c: c <= 0}[operator]
+        return any(_comparable(v, operand) and check(compare(v, operand)) for v in values)
+    if operator == "$in":
+        return any(_equals_any(values, item) for item in operand)
+    if operator == "$nin":
+        return not any(_equals_any(values, item) for item in operand)
+    if operator == "$exists":
+        return bool(values) == bool(operand)
+    if operator == "$regex":
+        pattern = operand
+        if not isinstance(pattern, re.Pattern):
+            flags = re.IGNORECASE if "i" in condition.get("$options", "") else 0
+            pattern = re.compile(pattern, flags)
+        return _equals_any(values, pattern)
+    if operator == "$not":
+        return not _field_matches(document, path, operand)
+    if operator == "$size":
+        return any(isinstance(v, list) and len(v) == operand for v in query_values(document, path)[:1])
+    if operator == "$all":
+        return all(_equals_any(values, item) for item in operand)
+    if operator == "$elemMatch":
+        arrays = [v for v in query_values(document, path)[:1] if isinstance(v, list)]
+        for array in arrays:
+            for element in array:
+                if isinstance(element, dict) and any(not k.startswith("$") for k in operand):
+                    if matches(element, operand):
+                        return True
+                elif _field_matches({"v": element}, "v", operand):
+                    return True
+        return False
+    raise UnsupportedOperation(f"Query operator `{operator}` is not supported in previews.")
+
+
+# --- AGGREGATION EXPRESSIONS ---
+def _truthy(value) -> bool:
+    return value not in (None, False, 0, MISSING)
+
+
+def _number(value):
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def evaluate(expression, document: dict, variables: dict = None):
+    variables = variables or {}
+    if isinstance(expression, str):
+        if expression.startswith("$$"):
+            name, _, rest = expression[2:].partition(".")
+            base = document if name in ("ROOT", "CURRENT") else variables.get(name, MISSING)
+            return get_field(base, rest) if rest else base
+        if expression.startswith("$"):
+            return get_field(document, expression[1:])
+        return expression
+    if isinstance(expression, list):
+        return [_value(evaluate(e, document, variables)) for e in expression]
+    if not isinstance(expression, dict):
+        return expression
+    if len(expression) == 1:
+        operator, args = next(iter(expression.items()))
+        if operator.startswith("$"):
+            return _evaluate_operator(operator, args, document, variables)
+    return {k: _value(evaluate(v, document, variables)) for k, v in expression.items()}
+
+
+def _value(value):
+    return None if value is MISSING else value
+
+
+def _evaluate_operator(operator, args, document, variables):
+    def arg_list():
+        items = args if isinstance(args, list) else [args]
+        return [_value(evaluate(a, document, variables)) for a in items]
+
+    if operator == "$literal":
+        return args
+    if operator in ("$add", "$multiply"):
+        values = arg_list()
+        if any(v is None for v in values):
+            return None
+        if operator == "$add":
+            dates = [v for v in values if isinstance(v, datetime.datetime)]
+            numbers = sum(v for v in values if not isinstance(v, datetime.datetime))
+            return dates[0] + datetime.timedelta(milliseconds=numbers) if dates else numbers
+        return math.prod(values)
+    if operator in ("$subtract", "$divide", "$mod"):
+        a, b = arg_list()
+        if a is None or b is None:
+            return None
+        if operator == "$subtract":
+            result = a - b
+            return result.total_seconds() * 1000 if isinstance(result, datetime.timedelta) else result
+        if operator == "$divide":
+            return a / b if b else None
+        return a % b
+    if operator in ("$abs", "$ceil", "$floor", "$sqrt"):
+        value = arg_list()[0]
+        functions = {"$abs": abs, "$ceil": math.ceil, "$floor": math.floor, "$sqrt": math.sqrt}
+        return None if value is None else functions[operator](value)
+    if operator == "$round":
+        values = arg_list()
+        return None if values[0] is None else round(values[0], values[1] if len(values) > 1 else 0)
+    if operator == "$concat":
+        values = arg_list()
+        return None if any(v is None for v in values) else "".join(values)
+    if operator in ("$toLower", "$toUpper", "$toString"):
+        value = arg_list()[0]
+        if value is None:
+            return None if operator == "$toString" else ""
+        if operator == "$toString":
+            return value.isoformat() if isinstance(value, datetime.datetime) else str(value)
+        return str(value).lower() if operator == "$toLower" else str(value).upper()
+    if operator in ("$toInt", "$toLong", "$toDouble", "$toDecimal"):
+        value = arg_list()[0]
+        return None if value is None else (float(value) if operator in ("$toDouble", "$toDecimal") else int(value))
+    if operator == "$size":
+        value = arg_list()[0]
+        if not isinstance(value, list):
+            raise UnsupportedOperation("$size requires an array")
+        return len(value)
+    if operator in ("$eq", "$ne", "$gt", "$gte", "$lt", "$lte", "$cmp"):
+        a, b = arg_list()
+        result = compare(a, b)
+        return {"$eq": result == 0, "$ne": result != 0, "$gt": result > 0, "$gte": result >= 0,
+                "$lt": result < 0, "$lte": result <= 0, "$cmp": result}[operator]
+    if operator == "$and":
+        return all(_truthy(v) for v in arg_list())
+    if operator == "$or":
+        return any(_truthy(v) for v in arg_list())
+    if operator == "$not":
+        return not _truthy(arg_list()[0])
+    if operator == "$in":
+        value, array = arg_list()
+        return any(compare(value, item) == 0 for item in array or [])
+    if operator == "$cond":
+        if isinstance(args, dict):
+            condition, then, otherwise = args["if"], args["then"], args["else"]
+        else:
+            condition, then, otherwise = args
+        branch = then if _truthy(evaluate(condition, document, variables)) else otherwise
+        return _value(evaluate(branch, document, variables))
+    if operator == "$ifNull":
+        for value in arg_list():
+            if value is not None:
+                return value
+        return None
+    if operator == "$switch":
+        for branch in args.get("branches", []):
+            if _truthy(evaluate(branch["case"], document, variables)):
+                return _value(evaluate(branch["then"], document, variables))
+        return _value(evaluate(args.get("default"), document, variables))
+    if operator in ("$year", "$month", "$dayOfMonth", "$hour", "$minute", "$second", "$dayOfWeek", "$dayOfYear"):
+        value = _value(evaluate(args.get("date") if isinstance(args, dict) else args, document, variables))
+        if not isinstance(value, datetime.datetime):
+            return None
+        return {"$year": value.year, "$month": value.month, "$dayOfMonth": value.day, "$hour": value.hour,
+                "$minute": value.minute, "$second": value.second, "$dayOfWeek": value.isoweekday() % 7 + 1,
+                "$dayOfYear": value.timetuple().tm_yday}[operator]
+    if operator == "$dateToString":
+        value = _value(evaluate(args["date"], document, variables))
+        if not isinstance(value, datetime.datetime):
+            return None
+        return value.strftime(args.get("format", "%Y-%m-%dT%H:%M:%S.%LZ").replace("%L", "000"))
+    if operator in ("$sum", "$avg", "$min", "$max"):
+        values = arg_list()
+        if len(values) == 1 and isinstance(values[0], list):
+            values = values[0]
+        return _accumulate(operator, values)
+    if operator in ("$arrayElemAt", "$first", "$last"):
+        values = arg_list()
+        array = values[0]
+        if not isinstance(array, list) or not array:
+            return None
+        index = values[1] if operator == "$arrayElemAt" else (0 if operator == "$first" else -1)
+        return array[index] if -len(array) <= index < len(array) else None
+    if operator in ("$filter", "$map"):
+        array = _value(evaluate(args["input"], document, variables)) or []
+        name = args.get("as", "this")
+        if operator == "$filter":
+            return [item for item in array
+                    if _truthy(evaluate(args["cond"], document, {**variables, name: item}))]
+        return [_value(evaluate(args["in"], document, {**variables, name: item})) for item in array]
+    raise UnsupportedOperation(f"Expression operator `{operator}` is not supported in previews.")
+
+
+def _accumulate(operator, values):
+    present = [v for v in values if v is not None and v is not MISSING]
+    if operator == "$sum":
+        return sum(v for v in present if _number(v) is not None)
+    if operator == "$avg":
+        numbers = [v for v in present if _number(v) is not None]
+        return sum(numbers) / len(numbers) if numbers else None
+    if not present:
+        return None
+    key = cmp_to_key(compare)
+    return min(present, key=key) if operator == "$min" else max(present, key=key)
+
+
+# --- STAGES ---
+def run_pipeline(documents: list, pipeline: list, collections: dict = None) -> list:
+    """
+    Evaluates an aggregation pipeline over in-memory documents.
+    `collections` ({name: documents}) feeds $lookup. Raises UnsupportedOperation for
+    anything outside the implemented subset.
+    """
+    collections = collections or {}
+    docs = [copy.deepcopy(d) for d in documents]
+    for stage in pipeline:
+        name, spec = next(iter(stage.items()))
+        handler = STAGES.get(name)
+        if handler is None:
+            raise UnsupportedOperation(f"Stage `{name}` is not supported in previews.")
+        docs = handler(docs, spec, collections)
+    return docs
+
+
+def _stage_match(docs, spec, _):
+    return [d for d in docs if matches(d, spec)]
+
+
+def _stage_project(docs, spec, _):
+    values = {k: v for k, v in spec.items() if k != "_id"}
+    exclusion = values and all(v in (0, False) for v in values.values())
+    results = []
+    for doc in docs:
+        if exclusion or (not values and spec.get("_id") in (0, False)):
+            result = copy.deepcopy(doc)
+            for key, value in spec.items():
+                if value in (0, False):
+                    remove_field(result, key)
+        else:
+            result = {}
+            if spec.get("_id", 1) not in (0, False):
+                if spec.get("_id", 1) in (1, True):
+                    if "_id" in doc:
+                        result["_id"] = doc["_id"]
+                else:
+                    result["_id"] = _value(evaluate(spec["_id"], doc))
+            for key, value in values.items():
+                if value in (1, True):
+                    field = get_field(doc, key)
+                    if field is not MISSING:
+                        set_field(result, key, field)
+                else:
+                    set_field(result, key, _value(evaluate(value, doc)))
+        results.append(result)
+    return results
+
+
+def _stage_add_fields(docs, spec, _):
+    results = []
+    for doc in docs:
+        result = copy.deepcopy(doc)
+        for key, value in spec.items():
+            set_field(result, key, _value(evaluate(value, doc)))
+        results.append(result)
+    return results
+
+
+def _stage_unset(docs, spec, _):
+    fields = [spec] if isinstance(spec, str) else spec
+    results = []
+    for doc in docs:
+        result = copy.deepcopy(doc)
+        for field in fields:
+            remove_field(result, field)
+        results.append(result)
+    return results
+
+
+def _stage_unwind(docs, spec, _):
+    if isinstance(spec, str):
+        spec = {"path": spec}
+    path = spec["path"].lstrip("$")
+    keep_empty = spec.get("preserveNullAndEmptyArrays", False)
+    index_field = spec.get("includeArrayIndex")
+
+    results = []
+    for doc in docs:
+        value = get_field(doc, path)
+        if isinstance(value, list) and value:
+            for index, item in enumerate(value):
+                result = copy.deepcopy(doc)
+                set_field(result, path, item)
+                if index_field:
+                    result[index_field] = index
+                results.append(result)
+        elif value is not MISSING and value is not None and not isinstance(value, list):
+            results.append(doc)  # Non-array values pass through unchanged
+        elif keep_empty:
+            result = copy.deepcopy(doc)
+            if index_field:
+                result[index_field] = None
+            results.append(result)
+    return results
+
+
+def _stage_group(docs, spec, _):
+    groups = {}
+    order = []
+    for doc in docs:
+        key = _value(evaluate(spec["_id"], doc))
+        hashable = repr(key)
+        if hashable not in groups:
+            groups[hashable] = {"_id": key, "_docs": []}
+            order.append(hashable)
+        groups[hashable]["_docs"].append(doc)
+
+    results = []
+    for hashable in order:
+        group = groups[hashable]
+        result = {"_id": group["_id"]}
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            (operator, expression), = accumulator.items()
+            if operator == "$count":
+                result[field] = len(group["_docs"])
+                continue
+            values = [_value(evaluate(expression, d)) for d in group["_docs"]]
+            if operator in ("$sum", "$avg", "$min", "$max"):
+                result[field] = _accumulate(operator, values)
+            elif operator == "$first":
+                result[field] = values[0] if values else None
+            elif operator == "$last":
+                result[field] = values[-1] if values else None
+            elif operator == "$push":
+                result[field] = values
+            elif operator == "$addToSet":
+                unique = []
+                for value in values:
+                    if not any(compare(value, u) == 0 for u in unique):
+                        unique.append(value)
+                result[field] = unique
+            else:
+                raise UnsupportedOperation(f"Accumulator `{operator}` is not supported in previews.")
+        results.append(result)
+    return results
+
+
+def _stage_sort(docs, spec, _):
+    def sort_key(a, b):
+        for field, direction in spec.items():
+            result = compare(_value(get_field(a, field)), _value(get_field(b, field)))
+            if result:
+                return result * (1 if direction in (1, "asc", "ascending") else -1)
+        return 0
+    return sorted(docs, key=cmp_to_key(sort_key))
+
+
+def _stage_lookup(docs, spec, collections):
+    if "localField" not in spec:
+        raise UnsupportedOperation("$lookup with a sub-pipeline is not supported in previews.")
+    foreign = collections.get(spec["from"], [])
+    results = []
+    for doc in docs:
+        local_values = query_values(doc, spec["localField"]) or [None]
+        joined = [
+            copy.deepcopy(other) for other in foreign
+            if any(_equals_any(query_values(other, spec["foreignField"]) or [None], v) for v in local_values)
+        ]
+        result = copy.deepcopy(doc)
+        set_field(result, spec["as"], joined)
+        results.append(result)
+    return results
+
+
+def _stage_replace_root(docs, spec, _):
+    expression = spec["newRoot"] if isinstance(spec, dict) and "newRoot" in spec else spec
+    results = []
+    for doc in docs:
+        value = _value(evaluate(expression, doc))
+        if not isinstance(value, dict):
+            raise UnsupportedOperation("$replaceRoot expression must evaluate to a document")
+        results.append(value)
+    return results
+
+
+def _stage_sort_by_count(docs, spec, collections):
+    grouped = _stage_group(docs, {"_id": spec, "count": {"$sum": 1}}, collections)
+    return _stage_sort(grouped, {"count": -1}, collections)
+
+
+STAGES = {
+    "$match": _stage_match,
+    "$project": _stage_project,
+    "$addFields": _stage_add_fields,
+    "$set": _stage_add_fields,
+    "$unset": _stage_unset,
+    "$unwind": _stage_unwind,
+    "$group": _stage_group,
+    "$sort": _stage_sort,
+    "$limit": lambda docs, n, _: docs[:n],
+    "$skip": lambda docs, n, _: docs[n:],
+    "$sample": lambda docs, spec, _: docs[:spec.get("size", len(docs))],
+    "$count": lambda docs, name, _: [{name: len(docs)}] if docs else [],
+    "$lookup": _stage_lookup,
+    "$replaceRoot": _stage_replace_root,
+    "$replaceWith": _stage_replace_root,
+    "$sortByCount": _stage_sort_by_count,
+}
@@ -0,0 +1,693 @@
+import datetime
+import json
+import re
+
+# --- VALUES THAT HAVE NO JSON EQUIVALENT ---
+
+
+class ObjectId(str):
+    """ObjectId("...") from shell code or sample documents (compared as its hex string)."""
+
+    def __repr__(self):
+        return f'ObjectId("{self}")'
+
+
+class ShellCallError(ValueError):
+    """The shell text could not be parsed, or it calls something that is not allowed."""
+
+
+READ_METHODS = {"find", "findOne", "aggregate", "countDocuments", "count", "distinct"}
+WRITE_METHODS = {"insert", "insertOne", "insertMany", "update", "updateOne", "updateMany", "replaceOne",
+                 "delete", "deleteOne", "deleteMany", "remove", "bulkWrite", "findAndModify",
+                 "findOneAndUpdate", "findOneAndReplace", "findOneAndDelete", "drop", "dropIndex",
+                 "dropIndexes", "createIndex", "createIndexes", "renameCollection"}
+CURSOR_METHODS = {"sort", "skip", "limit", "project", "pretty", "toArray", "count", "itcount"}
+WRITE_STAGES = {"$out", "$merge"}
+
+# Stages that map each input document to exactly one output document (no filtering, no reordering)
+ONE_TO_ONE_STAGES = {"$project", "$addFields", "$set", "$unset", "$replaceRoot", "$replaceWith"}
+
+# --- TOKENIZER ---
+TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+|//[^\n]*|/\*.*?\*/)
+  | (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  | (?P<number>-?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<regex>/(?:[^/\\\n]|\\.)+/[gimsux]*)
+  | (?P<ident>[A-Za-z_$][\w$]*)
+  | (?P<punct>[{}\[\](),:.;])
+""", re.VERBOSE | re.DOTALL)
+
+# Regex literals are only possible where a value starts (otherwise `/` is division)
+VALUE_START = {"{", "[", "(", ",", ":"}
+
+
+def _tokenize(text: str) -> list[tuple[str, str]]:
+    tokens, position = [], 0
+    while position < len(text):
+        match = TOKEN_RE.match(text, position)
+        if not match:
+            raise ShellCallError(f"Unexpected character {text[position]!r} at offset {position}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "regex" and (not tokens or tokens[-1][1] not in VALUE_START):
+            raise ShellCallError(f"Unexpected '/' at offset {position}")
+        if kind != "ws":
+            tokens.append((kind, value))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser for the subset of JavaScript the Mongo shell queries use."""
+
+    def __init__(self, text: str):
+        self.tokens = _tokenize(text)
+        self.index = 0
+
+    def peek(self, offset: int = 0):
+        position = self.index + offset
+        return self.tokens[position] if position < len(self.tokens) else (None, None)
+
+    def take(self, expected: str = None) -> str:
+        kind, value = self.peek()
+        if value is None:
+            raise ShellCallError("Unexpected end of query")
+        if expected is not None and value != expected:
+            raise ShellCallError(f"Expected {expected!r} but found {value!r}")
+        self.index += 1
+        return value
+
+    def at_end(self) -> bool:
+        return self.index >= len(self.tokens)
+
+    # value := object | array | string | number | regex | literal | constructor call
+    def value(self):
+        kind, token = self.peek()
+        if token is None:
+            raise ShellCallError("Unexpected end of query")
+        if token == "{":
+            return self.object()
+        if token == "[":
+            return self.array()
+        if kind == "string":
+            self.take()
+            return _unquote(token)
+        if kind == "number":
+            self.take()
+            return float(token) if any(c in token for c in ".eE") else int(token)
+        if kind == "regex":
+            self.take()
+            pattern, flags = token[1:].rsplit("/", 1)
+            return _regex(pattern, flags)
+        if kind == "ident":
+            self.take()
+            if token in ("true", "false"):
+                return token == "true"
+            if token in ("null", "undefined"):
+                return None
+            if token == "new":
+                token = self.take()
+            if self.peek()[1] == "(":
+                return self.constructor(token, self.arguments())
+            raise ShellCallError(f"Unsupported bare identifier `{token}` (variables are not allowed)")
+        raise ShellCallError(f"Unexpected token {token!r}")
+
+    def object(self) -> dict:
+        self.take("{")
+        result = {}
+        while self.peek()[1] != "}":
+            kind, key = self.peek()
+            if kind not in ("ident", "string", "number"):
+                raise ShellCallError(f"Invalid object key {key!r}")
+            self.take()
+            key = _unquote(key) if kind == "string" else key
+            self.take(":")
+            result[key] = self.value()
+            if self.peek()[1] == ",":
+                self.take()
+            elif self.peek()[1] != "}":
+                raise ShellCallError(f"Expected ',' or '}}' after `{key}`")
+        self.take("}")
+        return result
+
+    def array(self) -> list:
+        self.take("[")
+        items = []
+        while self.peek()[1] != "]":
+            items.append(self.value())
+            if self.peek()[1] == ",":
+                self.take()
+            elif self.peek()[1] != "]":
+                raise ShellCallError("Expected ',' or ']' in array")
+        self.take("]")
+        return items
+
+    def arguments(self) -> list:
+        self.take("(")
+        args = []
+        while self.peek()[1] != ")":
+            args.append(self.value())
+            if self.peek()[1] == ",":
+                self.take()
+            elif self.peek()[1] != ")":
+                raise ShellCallError("Expected ',' or ')' in arguments")
+        self.take(")")
+        return args
+
+    @staticmethod
+    def constructor(name: str, args: list):
+        if name in ("ISODate", "Date"):
+            try:
+                return parse_date(args[0]) if args else datetime.datetime.now(datetime.timezone.utc)
+            except (TypeError, ValueError):
+                raise ShellCallError(f"Invalid date {args[0]!r}")
+        if name == "ObjectId":
+            return ObjectId(args[0] if args else "")
+        if name in ("NumberInt", "NumberLong"):
+            return int(args[0])
+        if name in ("NumberDecimal", "Decimal128"):
+            return float(args[0])
+        if name == "RegExp":
+            return _regex(args[0], args[1] if len(args) > 1 else "")
+        raise ShellCallError(f"Unsupported function `{name}()`")
+
+
+def _unquote(token: str) -> str:
+    body = token[1:-1]
+    if token[0] == "'":
+        body = body.replace("\\'", "'").replace('"', '\\"')
+    return json.loads(f'"{body}"')
+
+
+def _regex(pattern: str, flags: str) -> re.Pattern:
+    re_flags = 0
+    for flag, value in (("i", re.IGNORECASE), ("m", re.MULTILINE), ("s", re.DOTALL), ("x", re.VERBOSE)):
+        if flag in flags:
+            re_flags |= value
+    return re.compile(pattern, re_flags)
+
+
+def parse_date(value) -> datetime.datetime:
+    if isinstance(value, datetime.datetime):
+        return value
+    text = str(value).strip()
+    if len(text) == 10:
+        text += "T00:00:00"
+    parsed = datetime.datetime.fromisoformat(text.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=datetime.timezone.utc)
+
+
+# --- STRUCTURED QUERY ---
+class MongoQuery:
+    """
+    A parsed shell read query. `find` style queries keep their filter / projection / cursor
+    modifiers; everything can be viewed as an aggregation pipeline with to_pipeline().
+    """
+
+    def __init__(self, collection: str, method: str, filter: dict = None, projection: dict = None,
+                 sort: dict = None, skip: int = None, limit: int = None, pipeline: list = None,
+                 field: str = None):
+        self.collection = collection
+        self.method = method
+        self.filter = filter or {}
+        self.projection = projection
+        self.sort = sort
+        self.skip = skip
+        self.limit = limit
+        self.pipeline = pipeline
+        self.field = field  # distinct()
+
+    def to_pipeline(self) -> list:
+        if self.method == "aggregate":
+            return self.pipeline
+        stages = [{"$match": self.filter}] if self.filter else []
+        if self.method == "distinct":
+            return stages + [{"$group": {"_id": f"${self.field}"}}]
+        if self.method in ("countDocuments", "count"):
+            return stages + [{"$count": "count"}]
+        if self.sort:
+            stages.append({"$sort": self.sort})
+        if self.skip:
+            stages.append({"$skip": self.skip})
+        if self.limit:
+            stages.append({"$limit": self.limit})
+        if self.projection:
+            stages.append({"$project": self.projection})
+        return stages
+
+    def to_shell(self) -> str:
+        target = f"db.{self.collection}" if re.match(r"^[A-Za-z_$][\w$]*$", self.collection) \
+            else f'db.getCollection("{self.collection}")'
+        if self.method == "aggregate":
+            stages = ",\n".join(f"  {to_js(stage)}" for stage in self.pipeline)
+            return f"{target}.aggregate([\n{stages}\n])"
+        if self.method == "distinct":
+            args = [to_js(self.field)] + ([to_js(self.filter)] if self.filter else [])
+            return f"{target}.distinct({', '.join(args)})"
+        if self.method in ("countDocuments", "count"):
+            return f"{target}.countDocuments({to_js(self.filter)})"
+
+        args = to_js(self.filter)
+        if self.projection:
+            args += f", {to_js(self.projection)}"
+        text = f"{target}.{self.method}({args})"
+        if self.sort:
+            text += f".sort({to_js(self.sort)})"
+        if self.skip:
+            text += f".skip({self.skip})"
+        if self.limit and self.method != "findOne":
+            text += f".limit({self.limit})"
+        return text
+
+
+def parse_shell_query(text: str) -> MongoQuery:
+    """
+    Parses `db.<collection>.<read method>(...)` (plus cursor modifiers) into a MongoQuery.
+    Raises ShellCallError for syntax errors and for any write method or write stage.
+    """
+    parser = _Parser(text.strip().rstrip(";"))
+    parser.take("db")
+
+    # db.orders / db.getCollection("orders") / db["orders"]
+    if parser.peek()[1] == "[":
+        parser.take("[")
+        collection = _unquote(parser.take())
+        parser.take("]")
+    else:
+        parser.take(".")
+        collection = parser.take()
+        if collection == "getCollection":
+            collection = parser.arguments()[0]
+
+    calls = []
+    while not parser.at_end():
+        parser.take(".")
+        kind, name = parser.peek()
+        if kind != "ident":
+            raise ShellCallError(f"Expected a method name, found {name!r}")
+        parser.take()
+        calls.append((name, parser.arguments()))
+    if not calls:
+        raise ShellCallError("No method called on the collection")
+
+    method, args = calls[0]
+    if method in WRITE_METHODS:
+        raise ShellCallError(f"Write operation `{method}()` is not allowed.")
+    if method not in READ_METHODS:
+        raise ShellCallError(f"Unsupported method `{method}()`.")
+
+    query = MongoQuery(collection, method)
+    if method == "aggregate":
+        pipeline = args[0] if args else []
+        if not isinstance(pipeline, list) or not all(isinstance(s, dict) and len(s) == 1 for s in pipeline):
+            raise ShellCallError("aggregate() expects an array of single-key stage objects.")
+        for stage in pipeline:
+            if next(iter(stage)) in WRITE_STAGES:
+                raise ShellCallError(f"Write stage `{next(iter(stage))}` is not allowed.")
+        query.pipeline = pipeline
+    elif method == "distinct":
+        query.field = args[0] if args else None
+        query.filter = args[1] if len(args) > 1 else {}
+    else:
+        query.filter = args[0] if args else {}
+        query.projection = args[1] if len(args) > 1 and args[1] else None
+        if method == "findOne":
+            query.limit = 1
+
+    for name, args in calls[1:]:
+        if name in WRITE_METHODS or name not in CURSOR_METHODS:
+            raise ShellCallError(f"Unsupported cursor method `{name}()`.")
+        if name == "sort":
+            query.sort = args[0]
+        elif name == "skip":
+            query.skip = args[0]
+        elif name == "limit":
+            query.limit = args[0]
+        elif name == "project":
+            query.projection = args[0]
+        elif name in ("count", "itcount") and method == "find":
+            query.method = "countDocuments"
+    return query
+
+
+# --- SHELL SERIALIZATION ---
+def to_js(value) -> str:
+    """Renders a value back to compact Mongo Shell syntax."""
+    if isinstance(value, ObjectId):
+        return f'ObjectId("{value}")'
+    if isinstance(value, datetime.datetime):
+        return f'ISODate("{value.isoformat().replace("+00:00", "Z")}")'
+    if isinstance(value, re.Pattern):
+        flags = "".join(f for f, v in (("i", re.IGNORECASE), ("m", re.MULTILINE), ("s", re.DOTALL)) if value.flags & v)
+        return f"/{value.pattern}/{flags}"
+    if isinstance(value, dict):
+        if not value:
+            return "{}"
+        items = []
+        for key, item in value.items():
+            key_text = key if re.match(r"^[A-Za-z_$][\w$]*$", key) else json.dumps(key)
+            items.append(f"{key_text}: {to_js(item)}")
+        return "{ " + ", ".join(items) + " }"
+    if isinstance(value, list):
+        return "[" + ", ".join(to_js(item) for item in value) + "]"
+    if isinstance(value, bool) or value is None:
+        return json.dumps(value)
+    if isinstance(value, float) and value.is_integer():
+        return str(value)
+    return json.dumps(value, ensure_ascii=False)
+
+
+# --- FIELD REFERENCES ---
+def match_fields(query: dict, prefix: str = "") -> set:
+    """Field paths a $match / find filter reads."""
+    fields = set()
+    for key, value in query.items():
+        if key in ("$and", "$or", "$nor"):
+            for clause in value:
+                fields |= match_fields(clause, prefix)
+        elif key == "$expr":
+            fields |= {f"{prefix}{f}" for f in expression_fields(value)}
+        elif key.startswith("$"):
+            continue  # $text, $where, $comment...
+        else:
+            path = f"{prefix}{key}"
+            fields.add(path)
+            if isinstance(value, dict) and isinstance(value.get("$elemMatch"), dict):
+                elem = value["$elemMatch"]
+                # $elemMatch on scalars uses operators only; on documents it names sub-fields
+                if any(not k.startswith("$") for k in elem):
+                    fields |= match_fields(elem, prefix=f"{path}.")
+    return fields
+
+
+def expression_fields(expression) -> set:
+    """Field paths referenced as "$path" in an aggregation expression ("$$vars" excluded)."""
+    if isinstance(expression, str):
+        return {expression[1:]} if expression.startswith("$") and not expression.startswith("$$") else set()
+    if isinstance(expression, list):
+        return set().union(*(expression_fields(e) for e in expression)) if expression else set()
+    if isinstance(expression, dict):
+        if "$literal" in expression:
+            return set()
+        return set().union(*(expression_fields(v) for v in expression.values())) if expression else set()
+    return set()
+
+
+def _touches(path: str, fields: set) -> bool:
+    """True if any field is `path`, below it, or above it."""
+    return any(f == path or f.startswith(path + ".") or path.startswith(f + ".") for f in fields)
+
+
+# --- SCHEMA CHECK ---
+def check_against_schema(query: MongoQuery, field_types: dict, collections: set) -> list[str]:
+    """
+    Walks the pipeline tracking which fields exist after every stage and reports references
+    to fields (or collections) that the inferred schema does not have.
+    `field_types` is {path: types} for the queried collection.
+    """
+    if query.collection not in collections:
+        return [f"Unknown collection `{query.collection}`."]
+
+    known = set(field_types) | {"_id"}
+    opaque = set()  # Fields whose shape is unknown (computed, joined): any sub-path is accepted
+    errors = []
+
+    def is_known(path: str) -> bool:
+        return (path in known or any(k.startswith(path + ".") for k in known)
+                or any(path == o or path.startswith(o + ".") for o in opaque))
+
+    def check(paths, stage_name, position):
+        for path in sorted(paths):
+            if path and not is_known(path):
+                errors.append(f"Unknown field `{path}` in {stage_name} (stage {position}).")
+
+    pipeline = query.to_pipeline()
+    if query.method == "find" and query.projection:
+        check(_projection_fields(query.projection), "projection", len(pipeline))
+
+    for position, stage in enumerate(pipeline, start=1):
+        name, spec = next(iter(stage.items()))
+        if name == "$match":
+            check(match_fields(spec), name, position)
+        elif name == "$sort":
+            check(spec.keys(), name, position)
+        elif name in ("$project",):
+            check(_projection_fields(spec), name, position)
+            included = {k for k, v in spec.items() if v in (1, True)}
+            computed = {k for k, v in spec.items() if v not in (0, 1, True, False)}
+            if included or computed:
+                keep_id = spec.get("_id", 1) not in (0, False)
+                known = {k for k in known if any(k == i or k.startswith(i + ".") for i in included)}
+                opaque = {o for o in opaque if o in included} | computed
+                if keep_id:
+                    known.add("_id")
+            else:
+                excluded = {k for k, v in spec.items() if v in (0, False)}
+                known = {k for k in known if not _touches(k, excluded)}
+        elif name in ("$addFields", "$set"):
+            check(expression_fields(spec), name, position)
+            opaque |= set(spec.keys())
+        elif name == "$unset":
+            removed = {spec} if isinstance(spec, str) else set(spec)
+            known = {k for k in known if not _touches(k, removed)}
+        elif name == "$unwind":
+            path = (spec if isinstance(spec, str) else spec.get("path", ""))
+            check({path.lstrip("$")}, name, position)
+            if isinstance(spec, dict) and spec.get("includeArrayIndex"):
+                opaque.add(spec["includeArrayIndex"])
+        elif name == "$group":
+            check(expression_fields(spec), name, position)
+            known, opaque = set(), set(spec.keys())
+        elif name == "$lookup":
+            if spec.get("from") not in collections:
+                errors.append(f"Unknown collection `{spec.get('from')}` in $lookup (stage {position}).")
+            if "localField" in spec:
+                check({spec["localField"]}, name, position)
+            opaque.add(spec.get("as", ""))
+        elif name == "$sortByCount":
+            check(expression_fields(spec), name, position)
+            known, opaque = {"_id", "count"}, set()
+        elif name == "$count":
+            known, opaque = {spec}, set()
+        elif name in ("$limit", "$skip", "$sample"):
+            continue
+        else:
+            break  # $replaceRoot, $facet, ...: shape unknown from here on
+    return errors
+
+
+def _projection_fields(projection: dict) -> set:
+    fields = set()
+    for key, value in projection.items():
+        if value in (0, 1, True, False):
+            fields.add(key)
+        else:
+            fields |= expression_fields(value)
+    return fields
+
+
+# --- OPTIMIZER ---
+def optimize_pipeline(pipeline: list) -> tuple[list, list[str]]:
+    """
+    Rewrites a pipeline into an equivalent, cheaper one:
+    - $match moves before $unwind / $lookup / $sort when it doesn't read what they produce
+      (a $match is split when only some of its conditions can move),
+    - adjacent $match stages and adjacent $project stages are merged,
+    - $limit / $skip move up past 1:1 stages, ending next to the $sort they cap.
+    Returns (pipeline, notes) where notes describe each rewrite.
+    """
+    pipeline = [dict(stage) for stage in pipeline]
+    notes = []
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(pipeline) - 1):
+            (first, first_spec), = pipeline[i].items()
+            (second, second_spec), = pipeline[i + 1].items()
+
+            # 1. Push $match up
+            if second == "$match" and first in ("$unwind", "$lookup", "$sort"):
+                movable, fixed = _split_match(second_spec, _produced_fields(first, first_spec))
+                if movable:
+                    pipeline[i:i + 2] = [{"$match": movable}, pipeline[i]] + ([{"$match": fixed}] if fixed else [])
+                    notes.append(f"Moved $match before {first} so fewer documents reach it.")
+                    changed = True
+                    break
+
+            # 2. Merge adjacent $match
+            if first == "$match" and second == "$match":
+                pipeline[i:i + 2] = [{"$match": _merge_matches(first_spec, second_spec)}]
+                notes.append("Merged adjacent $match stages.")
+                changed = True
+                break
+
+            # 3. Merge adjacent $project
+            if first == "$project" and second == "$project":
+                merged = _merge_projects(first_spec, second_spec)
+                if merged is not None:
+                    pipeline[i:i + 2] = [{"$project": merged}]
+                    notes.append("Merged adjacent $project stages.")
+                    changed = True
+                    break
+
+            # 4. Move $limit / $skip up past 1:1 stages (towards the $sort)
+            if second in ("$limit", "$skip") and first in ONE_TO_ONE_STAGES:
+                pipeline[i], pipeline[i + 1] = pipeline[i + 1], pipeline[i]
+                notes.append(f"Moved {second} before {first} so it caps the work earlier.")
+                changed = True
+                break
+    return pipeline, list(dict.fromkeys(notes))
+
+
+def _produced_fields(stage: str, spec) -> set:
+    """Fields whose values are created or changed by a stage (what a later $match may depend on)."""
+    if stage == "$unwind":
+        path = spec if isinstance(spec, str) else spec.get("path", "")
+        fields = {path.lstrip("$")}
+        if isinstance(spec, dict) and spec.get("includeArrayIndex"):
+            fields.add(spec["includeArrayIndex"])
+        return fields
+    if stage == "$lookup":
+        return {spec.get("as", "")}
+    return set()  # $sort only reorders
+
+
+def _split_match(match: dict, produced: set) -> tuple[dict, dict]:
+    """Splits a $match into (conditions independent of `produced`, the rest)."""
+    clauses = []
+    for key, value in match.items():
+        if key == "$and":
+            clauses.extend(value)
+        else:
+            clauses.append({key: value})
+
+    movable, fixed = [], []
+    for clause in clauses:
+        keys = set(clause)
+        # $text, $where, $expr with variables: leave where the model put them
+        pinned = keys & {"$text", "$where", "$comment"} or ("$expr" in keys and "$$" in json.dumps(clause, default=str))
+        if not pinned and not _touches_any(match_fields(clause), produced):
+            movable.append(clause)
+        else:
+            fixed.append(clause)
+    return _combine(movable), _combine(fixed)
+
+
+def _touches_any(fields: set, produced: set) -> bool:
+    return any(_touches(p, fields) for p in produced)
+
+
+def _combine(clauses: list) -> dict:
+    if not clauses:
+        return {}
+    merged = {}
+    for clause in clauses:
+        merged = _merge_matches(merged, clause) if merged else dict(clause)
+    return merged
+
+
+def _merge_matches(first: dict, second: dict) -> dict:
+    if not (set(first) & set(second)) and "$and" not in first and "$and" not in second:
+        return {**first, **second}
+    clauses = []
+    for match in (first, second):
+        clauses.extend(match["$and"] if set(match) == {"$and"} else [match])
+    return {"$and": clauses}
+
+
+def _merge_projects(first: dict, second: dict):
+    """Only plain inclusion/exclusion projections are merged; computed fields are left alone."""
+    def kind(projection):
+        values = {v for k, v in projection.items() if k != "_id"}
+        if values and values <= {1, True}:
+            return "include"
+        if values and values <= {0, False}:
+            return "exclude"
+        return None
+
+    first_kind, second_kind = kind(first), kind(second)
+    if first_kind is None or first_kind != second_kind:
+        return None
+    if first_kind == "include":
+        # Narrowing only: every field kept by `second` must be kept as-is by `first`. Disjoint keys
+        # or sub-paths ("address" then "address.city") would change the result, so both stages stay.
+        first_fields = {k for k in first if k != "_id"}
+        second_fields = {k for k in second if k != "_id"}
+        if not second_fields or not second_fields <= first_fields or _overlapping_paths(first_fields):
+            return None
+        merged = {k: 1 for k in second_fields}
+        if first.get("_id", 1) in (0, False) or second.get("_id", 1) in (0, False):
+            merged["_id"] = 0
+        return merged
+    # Exclusions add up, unless one excluded path contains another ("a" then "a.b"): MongoDB rejects
+    # that as a path collision
+    if _overlapping_paths(set(first) | set(second)):
+        return None
+    return {**first, **second}
+
+
+def _overlapping_paths(fields: set) -> bool:
+    """True when one field is a dotted prefix of another ("address" and "address.city")."""
+    return any(other.startswith(field + ".") for field in fields for other in fields)
+
+
+# --- INDEX SUGGESTIONS ---
+EQUALITY_OPERATORS = {"$eq", "$in"}
+RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte", "$ne", "$nin", "$regex", "$exists", "$not"}
+
+
+def suggest_indexes(query: MongoQuery, pipeline: list = None) -> list[dict]:
+    """
+    Suggests a compound index for the leading $match / $sort following the
+    Equality -> Sort -> Range rule. Returns [{"keys": [(field, direction)], "shell": ...}].
+    """
+    pipeline = pipeline if pipeline is not None else query.to_pipeline()
+    match, sort = {}, {}
+    if pipeline and "$match" in pipeline[0]:
+        match = pipeline[0]["$match"]
+        if len(pipeline) > 1 and "$sort" in pipeline[1]:
+            sort = pipeline[1]["$sort"]
+    elif pipeline and "$sort" in pipeline[0]:
+        sort = pipeline[0]["$sort"]
+
+    equality, ranges = [], []
+    for key, value in match.items():
+        if key == "$and":
+            for clause in value:
+                for k, v in clause.items():
+                    if not k.startswith("$"):
+                        (ranges if _is_range(v) else equality).append(k)
+        elif not key.startswith("$"):
+            (ranges if _is_range(value) else equality).append(key)
+
+    keys = []
+    for field in equality:
+        keys.append((field, 1))
+    for field, direction in sort.items():
+        if isinstance(direction, int):
+            keys.append((field, direction))
+    for field in ranges:
+        keys.append((field, 1))
+
+    # Dedupe (first position wins) and skip what the default _id index already serves
+    seen, unique = set(), []
+    for field, direction in keys:
+        if field not in seen:
+            seen.add(field)
+            unique.append((field, direction))
+    if not unique or [f for f, _ in unique] == ["_id"]:
+        return []
+
+    spec = "{ " + ", ".join(f"{to_js({f: d})[2:-2]}" for f, d in unique) + " }"
+    return [{
+        "collection": query.collection,
+        "keys": unique,
+        "shell": f"db.{query.collection}.createIndex({spec})",
+        "reason": "Equality fields first, then sort keys, then range filters (ESR rule).",
+    }]
+
+
+def _is_range(condition) -> bool:
+    if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+        return not set(condition) <= EQUALITY_OPERATORS
+    return isinstance(condition, re.Pattern)
@@ -0,0 +1,280 @@
+import io
+import json
+import os
+import random
+import re
+from collections import Counter
+
+CHUNK_SIZE = 64 * 1024
+SEPARATORS = re.compile(r"[\s,\[\]]*")
+
+# Hand-written samples use shell constructors as strings: "ObjectId('...')", "ISODate('...')"
+SHELL_OBJECT_ID = re.compile(r"^ObjectId\(['\"]?[^)]*['\"]?\)$")
+SHELL_DATE = re.compile(r"^(ISODate|new Date)\(['\"]?[^)]*['\"]?\)$")
+
+
+# --- STREAMING READER ---
+def iter_documents(source, chunk_size: int = CHUNK_SIZE):
+    """
+    Yields documents from a JSON array, NDJSON / JSON Lines or concatenated JSON objects.
+    `source` is a path or a (text or binary) file object. Memory stays bounded by one
+    document plus one chunk, whatever the size of the export.
+    """
+    if isinstance(source, str):
+        with open(source, "r", encoding="utf-8") as f:
+            yield from iter_documents(f, chunk_size)
+        return
+
+    if isinstance(source.read(0), bytes):
+        source = io.TextIOWrapper(source, encoding="utf-8")
+
+    decoder = json.JSONDecoder()
+    buffer, position, eof = "", 0, False
+    while True:
+        # Skip separators: whitespace, array brackets and commas between documents
+        position = SEPARATORS.match(buffer, position).end()
+        if position < len(buffer):
+            try:
+                document, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                if isinstance(document, dict):
+                    yield document
+                continue
+        elif eof:
+            return
+
+        # Need more input: keep only the unconsumed tail of the buffer
+        chunk = source.read(chunk_size)
+        eof = not chunk
+        buffer, position = buffer[position:] + chunk, 0
+
+
+def is_collection_export(source) -> bool:
+    """
+    True for JSON arrays / NDJSON exports (and .ndjson / .jsonl files), False for a
+    {collection: sample_document} schema file, pretty-printed or on one line. Rewinds the file object.
+    """
+    if os.path.splitext(getattr(source, "name", "") or "")[1].lower() in (".ndjson", ".jsonl"):
+        return True
+    position = source.tell()
+    head = source.read(CHUNK_SIZE)
+    source.seek(position)
+    if isinstance(head, bytes):
+        head = head.decode("utf-8", errors="ignore")
+    head = head.lstrip()
+    if head.startswith("["):
+        return True
+
+    lines = [line.strip() for line in head.split("\n") if line.strip()]
+    try:
+        first = json.loads(lines[0]) if lines else None
+    except ValueError:
+        return False  # Multi-line (pretty-printed) JSON: a schema file
+    if not isinstance(first, dict):
+        return False
+    if "_id" in first or len(lines) > 1:
+        return True  # A document, or one object per line
+    # A lone line: a compact schema maps collection names to sample documents
+    return not (first and all(isinstance(value, dict) for value in first.values()))
+
+
+# --- TYPE DETECTION ---
+def bson_type(value) -> str:
+    """Type name of a (relaxed / canonical extended JSON) value."""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "double"
+    if isinstance(value, str):
+        if SHELL_OBJECT_ID.match(value):
+            return "objectId"
+        if SHELL_DATE.match(value):
+            return "date"
+        return "string"
+    if isinstance(value, list):
+        return "array"
+    if isinstance(value, dict):
+        if len(value) == 1:
+            key = next(iter(value))
+            extended = {"$oid": "objectId", "$date": "date", "$numberLong": "long", "$numberInt": "int",
+                        "$numberDouble": "double", "$numberDecimal": "decimal", "$binary": "binData",
+                        "$regularExpression": "regex", "$timestamp": "timestamp"}
+            if key in extended:
+                return extended[key]
+        return "object"
+    return type(value).__name__
+
+
+def _example(value):
+    """Short, prompt-friendly rendering of a scalar example."""
+    if isinstance(value, dict) and len(value) == 1:
+        value = next(iter(value.values()))
+        if isinstance(value, dict):  # {"$date": {"$numberLong": ...}}
+            value = next(iter(value.values()), value)
+    text = json.dumps(value, ensure_ascii=False, default=str) if not isinstance(value, str) else f'"{value}"'
+    return text if len(text) <= 40 else text[:37] + '..."'
+
+
+# --- INFERENCE ---
+class CollectionProfile:
+    """
+    Incremental schema profile of one collection: field paths (dot notation, arrays traversed
+    implicitly like MongoDB does), observed types, presence frequency, array element types and
+    lengths, a few example values and a bounded reservoir sample of whole documents.
+    """
+
+    def __init__(self, name: str, description: str = None, max_examples: int = 3,
+                 max_paths: int = 500, sample_size: int = 200, seed: int = 7):
+        self.name = name
+        self.description = description
+        self.max_examples = max_examples
+        self.max_paths = max_paths
+        self.sample_size = sample_size
+        self.document_count = 0
+        self.truncated = False
+        self.fields = {}   # path -> {"present": int, "types": Counter, "examples": list, ...}
+        self.sample = []   # Reservoir of raw documents (for local previews)
+        self._random = random.Random(seed)
+
+    def add(self, document: dict):
+        self.document_count += 1
+        seen = set()
+        self._walk(document, "", seen)
+        for path in seen:
+            self.fields[path]["present"] += 1
+
+        # Reservoir sampling keeps a uniform sample with bounded memory
+        if len(self.sample) < self.sample_size:
+            self.sample.append(document)
+        else:
+            slot = self._random.randrange(self.document_count)
+            if slot < self.sample_size:
+                self.sample[slot] = document
+
+    def _field(self, path: str):
+        field = self.fields.get(path)
+        if field is None:
+            if len(self.fields) >= self.max_paths:
+                self.truncated = True
+                return None
+            field = {"present": 0, "types": Counter(), "examples": [], "example_tries": 0,
+                     "element_types": Counter(), "min_items": None, "max_items": None}
+            self.fields[path] = field
+        return field
+
+    def _walk(self, value, path: str, seen: set):
+        if isinstance(value, dict) and bson_type(value) == "object":
+            for key, child in value.items():
+                child_path = f"{path}.{key}" if path else key
+                self._observe(child, child_path, seen)
+        # Scalars at the root are ignored: documents are always objects
+
+    def _observe(self, value, path: str, seen: set):
+        field = self._field(path)
+        if field is None:
+            return
+        seen.add(path)
+        value_type = bson_type(value)
+        field["types"][value_type] += 1
+
+        if value_type == "array":
+            length = len(value)
+            field["min_items"] = length if field["min_items"] is None else min(field["min_items"], length)
+            field["max_items"] = length if field["max_items"] is None else max(field["max_items"], length)
+            for element in value:
+                element_type = bson_type(element)
+                field["element_types"][element_type] += 1
+                if element_type == "object":
+                    self._walk(element, path, seen)
+                else:
+                    self._add_example(field, element)
+        elif value_type == "object":
+            self._walk(value, path, seen)
+        elif value_type != "null":
+            self._add_example(field, value)
+
+    def _add_example(self, field: dict, value):
+        # Low-cardinality fields never fill up: stop looking after a few dozen tries
+        if len(field["examples"]) >= self.max_examples or field["example_tries"] > 50:
+            return
+        field["example_tries"] += 1
+        example = _example(value)
+        if example not in field["examples"]:
+            field["examples"].append(example)
+
+    def field_types(self) -> dict:
+        """{path: set of observed types} (used to check generated queries against the schema)."""
+        return {path: set(field["types"]) for path, field in self.fields.items()}
+
+    def render(self, max_examples: int = 2) -> str:
+        """Compact text summary for the prompt: one line per field path."""
+        header = f"## {self.name}"
+        if self.description:
+            header += f" — {self.description}"
+        header += f" ({self.document_count:,} docs profiled)" if self.document_count > 1 else ""
+        lines = [header]
+
+        for path, field in self.fields.items():
+            types = [t for t, _ in field["types"].most_common()]
+            type_text = "|".join(types)
+            if "array" in types and field["element_types"]:
+                elements = "|".join(t for t, _ in field["element_types"].most_common())
+                type_text = type_text.replace("array", f"array<{elements}>")
+
+            details = []
+            presence = field["present"] / self.document_count if self.document_count else 0
+            if presence < 1:
+                details.append(f"{presence:.0%}")
+            if field["max_items"] is not None and self.document_count > 1:
+                details.append(f"{field['min_items']}-{field['max_items']} items")
+
+            line = f"{path}: {type_text}"
+            if details:
+                line += f" ({', '.join(details)})"
+            if field["examples"] and types[0] not in ("objectId",):
+                line += " e.g. " + ", ".join(field["examples"][:max_examples])
+            lines.append(line)
+
+        if self.truncated:
+            lines.append(f"... (more than {self.max_paths} field paths, truncated)")
+        return "\n".join(lines)
+
+
+def profile_collection(name: str, documents, description: str = None, max_documents: int = None,
+                       **kwargs) -> CollectionProfile:
+    """Profiles an iterable of documents (optionally only the first `max_documents`)."""
+    profile = CollectionProfile(name, description=description, **kwargs)
+    for document in documents:
+        profile.add(document)
+        if max_documents and profile.document_count >= max_documents:
+            break
+    return profile
+
+
+def profiles_from_sample_schema(data: dict) -> dict:
+    """
+    Profiles the hand-written schema format: {collection: sample_document} or
+    {collection: {"description": ..., "sample_document": {...}}}.
+    """
+    profiles = {}
+    for name, entry in data.items():
+        if not isinstance(entry, dict):
+            continue
+        if "sample_document" in entry:
+            document, description = entry["sample_document"], entry.get("description")
+        else:
+            document, description = entry, None
+        documents = document if isinstance(document, list) else [document]
+        profiles[name] = profile_collection(name, documents, description=description)
+    return profiles
+
+
+def render_schema(profiles: dict) -> str:
+    return "\n\n".join(profile.render() for profile in profiles.values())
@@ -0,0 +1,225 @@
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+from src.shared.storage import get_cache_dir
+
+NUMBER_SLOT = "<num>"
+
+# Words that carry no meaning for "which query answers this question". Connectives and
+# direction words ("from", "to", "and", "or", "than"...) are kept: they change the query.
+STOPWORDS = {
+    "a", "an", "the", "of", "for", "in", "on", "by", "with", "at", "as",
+    "is", "are", "was", "were", "be", "been", "me", "my", "our", "us", "we", "i", "you", "your",
+    "show", "list", "get", "give", "find", "display", "return", "fetch", "what", "which", "who",
+    "please", "all", "each", "per", "that", "this", "these", "those", "there", "do", "does", "can",
+}
+
+# Phrasings that mean the same ranking / aggregation
+SYNONYMS = {
+    "highest": "top", "largest": "top", "biggest": "top", "most": "top", "best": "top", "greatest": "top",
+    "lowest": "bottom", "smallest": "bottom", "least": "bottom", "fewest": "bottom", "worst": "bottom",
+    "newest": "latest", "recent": "latest", "last": "latest",
+    "number": "count", "many": "count", "total": "sum",
+    "client": "customer", "buyer": "customer", "purchaser": "customer",
+    "sale": "revenue", "income": "revenue", "earning": "revenue",
+}
+
+# Words whose meaning depends on what follows them: "from Paris to London" != "from London to Paris"
+DIRECTION_WORDS = {"from", "to", "into", "than", "before", "after", "since", "until", "between", "and", "or",
+                   "not", "without", "vs", "versus"}
+
+NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+def normalize_question(question: str) -> tuple[list[str], list[str]]:
+    """
+    Turns a question into (tokens, numbers).
+    Numbers are replaced by a slot token so "top 10" and "top 5" share a template.
+    """
+    numbers = NUMBER_RE.findall(question)
+    text = NUMBER_RE.sub(f" {NUMBER_SLOT} ", question.lower())
+
+    tokens = []
+    for word in re.findall(r"<num>|[a-z_]+", text):
+        if word in STOPWORDS:
+            continue
+        # Light stemming: customers -> customer, sales -> sale
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(SYNONYMS.get(word, word))
+    return tokens, numbers
+
+
+def ordered_pairs(tokens: list[str]) -> list[str]:
+    """Ordered bigrams anchored on direction words ("from>paris", "to>london")."""
+    return [f"{word}>{following}" for word, following in zip(tokens, tokens[1:]) if word in DIRECTION_WORDS]
+
+
+def schema_hash(schema_content: str) -> str:
+    return hashlib.sha256(schema_content.encode("utf-8")).hexdigest()
+
+
+class QueryCache:
+    """
+    Question -> query cache scoped to a schema hash.
+    Near-duplicate questions are matched with a TF-IDF cosine similarity over normalized tokens
+    plus the ordered bigrams of direction words, which must also match exactly: word order there
+    changes the meaning.
+    """
+
+    def __init__(self, schema_content: str, namespace: str, threshold: float = 0.85,
+                 cache_dir: str = None, max_entries: int = 2000):
+        self.schema_hash = schema_hash(schema_content)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        cache_dir = cache_dir or get_cache_dir("query_cache")
+        self.path = os.path.join(cache_dir, f"{namespace}_{self.schema_hash[:16]}.json")
+
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self._index = None  # Rebuilt lazily after writes
+
+    # --- PERSISTENCE ---
+    def _load(self) -> list[dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("schema_hash") == self.schema_hash:
+                entries = data.get("entries", [])
+                for entry in entries:
+                    # Re-normalized on load, so entries written by older rules stay comparable
+                    entry["tokens"], entry["numbers"] = normalize_question(entry["question"])
+                    entry["key"] = " ".join(entry["tokens"])
+                return [entry for entry in entries if entry["tokens"]]
+        except (OSError, ValueError):
+            pass
+        return []
+
+    def _save(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"schema_hash": self.schema_hash, "entries": self._entries}, f)
+        os.replace(tmp_path, self.path)
+
+    # --- SIMILARITY INDEX ---
+    def _build_index(self):
+        doc_freq = Counter()
+        for entry in self._entries:
+            doc_freq.update(set(entry["tokens"] + ordered_pairs(entry["tokens"])))
+
+        total = len(self._entries)
+        idf = {term: math.log((1 + total) / (1 + df)) + 1 for term, df in doc_freq.items()}
+        vectors = [self._vectorize(entry["tokens"], idf, total) for entry in self._entries]
+        self._index = (idf, vectors)
+
+    @staticmethod
+    def _vectorize(tokens: list[str], idf: dict, total: int) -> dict:
+        counts = Counter(tokens + ordered_pairs(tokens))
+        unseen_idf = math.log(1 + total) + 1
+        vector = {term: count * idf.get(term, unseen_idf) for term, count in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        return {term: v / norm for term, v in vector.items()}
+
+    def _best_match(self, tokens: list[str]) -> tuple[dict, float]:
+        key = " ".join(tokens)
+        for entry in self._entries:
+            if entry["key"] == key:
+                return entry, 1.0
+
+        if self._index is None:
+            self._build_index()
+        idf, vectors = self._index
+        query_vector = self._vectorize(tokens, idf, len(self._entries))
+
+        pairs = sorted(ordered_pairs(tokens))
+        best, best_score = None, 0.0
+        for entry, vector in zip(self._entries, vectors):
+            if sorted(ordered_pairs(entry["tokens"])) != pairs:
+                continue
+            score = sum(weight * vector.get(term, 0.0) for term, weight in query_vector.items())
+            if score > best_score:
+                best, best_score = entry, score
+        return best, best_score
+
+    # --- PUBLIC API ---
+    def lookup(self, question: str, validator=None) -> str | None:
+        """
+        Returns a cached query for a (near-)duplicate question, or None on a miss.
+        Number slots are re-filled with the new question's values.
+        `validator(query) -> bool` re-checks the query before it is returned.
+        """
+        tokens, numbers = normalize_question(question)
+        if not tokens:
+            return None
+
+        with self._lock:
+            if not self._entries:
+                return None
+            entry, score = self._best_match(tokens)
+            if entry is None or score < self.threshold:
+                return None
+
+            query = self._fill_slots(entry["query"], entry["numbers"], numbers)
+            if query is None:
+                return None
+            if validator is not None and not validator(query):
+                return None
+
+            entry["hits"] = entry.get("hits", 0) + 1
+        print(f"⚡ query-cache: Hit (similarity {score:.2f})")
+        return query
+
+    def store(self, question: str, query: str):
+        tokens, numbers = normalize_question(question)
+        if not tokens:
+            return
+
+        with self._lock:
+            key = " ".join(tokens)
+            self._entries = [e for e in self._entries if e["key"] != key]
+            self._entries.append({
+                "question": question,
+                "key": key,
+                "tokens": tokens,
+                "numbers": numbers,
+                "query": query,
+                "created_at": time.time(),
+                "hits": 0,
+            })
+            # Keep the newest entries only
+            self._entries = self._entries[-self.max_entries:]
+            self._index = None
+            try:
+                self._save()
+            except OSError as e:
+                print(f"⚠️ query-cache: Could not persist cache: {e}")
+
+    @staticmethod
+    def _fill_slots(query: str, old_numbers: list[str], new_numbers: list[str]) -> str | None:
+        """Swaps the cached question's numbers for the new ones (e.g. LIMIT 10 -> LIMIT 5)."""
+        if old_numbers == new_numbers:
+            return query
+        if len(old_numbers) != len(new_numbers):
+            return None
+
+        replacements = {}
+        for old, new in zip(old_numbers, new_numbers):
+            if old == new:
+                continue
+            if replacements.get(old, new) != new:
+                return None  # Same number mapped to two different values: ambiguous
+            replacements[old] = new
+
+        for old, new in replacements.items():
+            pattern = re.compile(r"(?<![\w.'\"-])" + re.escape(old) + r"(?![\w.'\"-])")
+            # Only substitute when the literal is unambiguous in the query
+            if len(pattern.findall(query)) != 1:
+                return None
+            query = pattern.sub(new, query)
+        return query
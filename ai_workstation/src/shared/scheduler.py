@@ -0,0 +1,272 @@
+import os
+import statistics
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from src.shared.jobs import QUEUED, RUNNING, DONE, FAILED, CANCELLED, FINISHED
+
+# Lower runs first. Queued requests age: every `aging_s` of waiting moves them up one class,
+# so bulk work is delayed by interactive traffic but never starved.
+PRIORITIES = {"interactive": 0, "normal": 1, "bulk": 2}
+
+# Concurrent requests per model lane. One local Ollama instance serializes generation anyway;
+# letting more through only makes every request slower. Override with
+# AI_WORKSTATION_MODEL_CONCURRENCY="qwen2.5-coder:14b=2,gemini-3-flash-preview=16".
+DEFAULT_LIMITS = {"qwen2.5-coder:14b": 1, "gemini-3-flash-preview": 8, "replay": 4, "maven": 2, "cpu": 4}
+
+
+def limits_from_env(value: str = None) -> dict:
+    limits = dict(DEFAULT_LIMITS)
+    for item in (value if value is not None else os.getenv("AI_WORKSTATION_MODEL_CONCURRENCY", "")).split(","):
+        if "=" in item:
+            lane, limit = item.rsplit("=", 1)
+            limits[lane.strip()] = max(1, int(limit))
+    return limits
+
+
+class Request:
+    """
+    One queued agent call. `operation(request)` runs on a worker once its lane has a free slot;
+    it may call `report()` to publish progress and partial results (like jobs.Job).
+    """
+
+    def __init__(self, lane: str, operation, priority: str = "normal", batch_key=None, coalesce_key=None,
+                 name: str = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.lane = lane
+        self.operation = operation
+        self.priority = priority if priority in PRIORITIES else "normal"
+        self.batch_key = batch_key
+        self.coalesce_key = coalesce_key
+        self.name = name or lane
+        self.status = QUEUED
+        self.progress = None
+        self.partial = []
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.coalesced = 0  # Identical requests answered by this one
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    def effective_priority(self, now: float, aging_s: float) -> float:
+        return PRIORITIES[self.priority] - (now - self.submitted_at) // aging_s
+
+    @property
+    def wait_s(self) -> float:
+        return (self.started_at or time.time()) - self.submitted_at
+
+    @property
+    def run_s(self) -> float:
+        return (self.finished_at or time.time()) - self.started_at if self.started_at else 0.0
+
+    def report(self, progress: float = None, partial=None):
+        with self._lock:
+            if progress is not None:
+                self.progress = max(0.0, min(1.0, progress))
+            if partial is not None:
+                self.partial.append(partial)
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._done.wait(timeout)
+
+    def snapshot(self, since: int = 0) -> dict:
+        with self._lock:
+            return {"id": self.id, "name": self.name, "lane": self.lane, "priority": self.priority,
+                    "status": self.status, "progress": self.progress, "partial": self.partial[since:],
+                    "partial_total": len(self.partial), "result": self.result, "error": self.error,
+                    "wait_s": round(self.wait_s, 3), "run_s": round(self.run_s, 3)}
+
+    def _finish(self, status: str, result=None, error: str = None):
+        with self._lock:
+            self.status, self.result, self.error = status, result, error
+            self.finished_at = time.time()
+            if status == DONE:
+                self.progress = 1.0
+        self._done.set()
+
+
+def _percentiles(values) -> dict:
+    values = sorted(values)
+    if not values:
+        return {"p50": None, "p95": None, "max": None}
+    p95 = values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))]
+    return {"p50": round(statistics.median(values), 3), "p95": round(p95, 3), "max": round(values[-1], 3)}
+
+
+class RequestScheduler:
+    """
+    Priority queue in front of the models. Each lane (one per model, plus "maven" and "cpu") runs at
+    most `limits[lane]` requests at a time; the best queued request of a lane (priority, then age)
+    takes the next free slot.
+
+    Batching: a worker that takes a request also takes up to `max_batch - 1` queued requests with the
+    same `batch_key` (same model and prepared context) and no lower priority, and runs them back to back
+    on its slot, so the model keeps the shared prompt prefix in its KV cache. Identical requests (same `coalesce_key`)
+    are not queued twice: they share the result of the one already queued or running.
+    """
+
+    def __init__(self, limits: dict = None, max_batch: int = None, aging_s: float = None, history: int = 1000):
+        self.limits = limits or limits_from_env()
+        self.max_batch = max_batch or int(os.getenv("AI_WORKSTATION_MAX_BATCH", "4"))
+        self.aging_s = aging_s or float(os.getenv("AI_WORKSTATION_PRIORITY_AGING_S", "30"))
+        self.started_at = time.time()
+        self._queue = []
+        self._running = {}
+        self._requests = {}
+        self._by_coalesce_key = {}
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._pool = ThreadPoolExecutor(max_workers=max(8, sum(self.limits.values()) + 4),
+                                        thread_name_prefix="agent-request")
+        self._history = history
+        self._stats = {}
+        threading.Thread(target=self._dispatch_loop, name="agent-scheduler", daemon=True).start()
+
+    # --- SUBMISSION ---
+    def submit(self, request: Request) -> Request:
+        """Queues `request`, or returns the identical request already queued / running."""
+        with self._cond:
+            existing = self._by_coalesce_key.get(request.coalesce_key) if request.coalesce_key else None
+            if existing is not None and existing.status not in FINISHED:
+                existing.coalesced += 1
+                self._lane_stats(existing.lane)["coalesced"] += 1
+                return existing
+            self._requests[request.id] = request
+            if request.coalesce_key:
+                self._by_coalesce_key[request.coalesce_key] = request
+            self._queue.append(request)
+            self._prune()
+            self._cond.notify_all()
+        return request
+
+    def get(self, request_id: str):
+        with self._cond:
+            return self._requests.get(request_id)
+
+    def cancel(self, request_id: str) -> bool:
+        """
+        Cancels a queued request (running ones finish: model calls can't be interrupted). A coalesced
+        request stays queued until every client that submitted it has cancelled.
+        """
+        with self._cond:
+            request = self._requests.get(request_id)
+            if request is None or request.status != QUEUED:
+                return False
+            if request.coalesced > 0:
+                request.coalesced -= 1
+                return True
+            self._queue.remove(request)
+            self._lane_stats(request.lane)["cancelled"] += 1
+        request._finish(CANCELLED)
+        return True
+
+    def shutdown(self):
+        with self._cond:
+            self._stopped = True
+            queued, self._queue = self._queue, []
+            self._cond.notify_all()
+        for request in queued:
+            request._finish(CANCELLED)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # --- DISPATCH ---
+    def _dispatch_loop(self):
+        with self._cond:
+            while not self._stopped:
+                self._dispatch()
+                # Re-evaluated on every submit / completion, and periodically for aging
+                self._cond.wait(timeout=1.0)
+
+    def _dispatch(self):
+        now = time.time()
+        order = sorted(self._queue, key=lambda r: (r.effective_priority(now, self.aging_s), r.submitted_at))
+        for head in order:
+            if head.status != QUEUED or head not in self._queue:
+                continue
+            lane = head.lane
+            if self._running.get(lane, 0) >= self.limits.get(lane, 1):
+                continue
+            batch = [head]
+            if head.batch_key is not None:
+                # Head is the best queued request of its lane: only requests of the same effective priority
+                # join it, so a batch of bulk work never holds the slot ahead of another key's interactive one
+                head_priority = head.effective_priority(now, self.aging_s)
+                batch += [r for r in order if r is not head and r.batch_key == head.batch_key
+                          and r.status == QUEUED and r in self._queue
+                          and r.effective_priority(now, self.aging_s) <= head_priority][:self.max_batch - 1]
+            for request in batch:
+                self._queue.remove(request)
+                request.status = RUNNING
+                request.started_at = now
+            self._running[lane] = self._running.get(lane, 0) + 1
+            stats = self._lane_stats(lane)
+            stats["batches"] += 1
+            stats["batched_requests"] += len(batch) - 1
+            self._pool.submit(self._run_batch, lane, batch)
+
+    def _run_batch(self, lane: str, batch: list):
+        try:
+            for request in batch:
+                request.started_at = time.time()  # Batched requests start when their turn on the slot comes
+                try:
+                    request._finish(DONE, result=request.operation(request))
+                except Exception as e:
+                    print(f"❌ scheduler: {request.name} failed: {e}")
+                    request._finish(FAILED, error=f"{type(e).__name__}: {e}")
+                self._record(request)
+        finally:
+            with self._cond:
+                self._running[lane] -= 1
+                self._cond.notify_all()
+
+    # --- METRICS ---
+    def _lane_stats(self, lane: str) -> dict:
+        if lane not in self._stats:
+            self._stats[lane] = {"completed": 0, "failed": 0, "cancelled": 0, "coalesced": 0, "batches": 0,
+                                 "batched_requests": 0, "waits": deque(maxlen=self._history),
+                                 "runs": deque(maxlen=self._history)}
+        return self._stats[lane]
+
+    def _record(self, request: Request):
+        with self._cond:
+            stats = self._lane_stats(request.lane)
+            stats["completed" if request.status == DONE else "failed"] += 1
+            stats["waits"].append((request.priority, request.wait_s))
+            stats["runs"].append(request.run_s)
+
+    def _prune(self, keep_finished: int = 1000):
+        finished = [r for r in self._requests.values() if r.status in FINISHED]
+        for request in sorted(finished, key=lambda r: r.finished_at)[:max(0, len(finished) - keep_finished)]:
+            del self._requests[request.id]
+            if self._by_coalesce_key.get(request.coalesce_key) is request:
+                del self._by_coalesce_key[request.coalesce_key]
+
+    def metrics(self) -> dict:
+        """Queue depth, running requests and wait / run time percentiles (seconds) per lane and priority."""
+        now = time.time()
+        with self._cond:
+            lanes = {}
+            for lane in sorted(set(self.limits) | set(self._stats) | {r.lane for r in self._queue}):
+                stats = self._lane_stats(lane)
+                queued = [r for r in self._queue if r.lane == lane]
+                lanes[lane] = {
+                    "limit": self.limits.get(lane, 1),
+                    "running": self._running.get(lane, 0),
+                    "queued": len(queued),
+                    "queued_by_priority": {p: sum(1 for r in queued if r.priority == p) for p in PRIORITIES},
+                    "oldest_wait_s": round(max((now - r.submitted_at for r in queued), default=0.0), 3),
+                    **{key: stats[key] for key in ("completed", "failed", "cancelled", "coalesced", "batches",
+                                                   "batched_requests")},
+                    "wait_s": _percentiles(wait for _, wait in stats["waits"]),
+                    "run_s": _percentiles(stats["runs"]),
+                }
+            priorities = {p: _percentiles(wait for stats in self._stats.values() for priority, wait in stats["waits"]
+                                          if priority == p) for p in PRIORITIES}
+            return {"uptime_s": round(now - self.started_at, 1), "queued": len(self._queue),
+                    "running": sum(self._running.values()), "lanes": lanes, "wait_s_by_priority": priorities}
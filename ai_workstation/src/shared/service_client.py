@@ -0,0 +1,144 @@
+import os
+from types import SimpleNamespace
+
+from src.shared.jobs import DONE, FAILED, CANCELLED
+
+DEFAULT_URL = "http://127.0.0.1:8765"
+POLL_WAIT_S = 10
+
+
+class AgentServiceError(RuntimeError):
+    """The agent service rejected a request, or the call failed on the service."""
+
+
+class AgentServiceClient:
+    """Thin JSON client of the local agent service (server.py); AI_WORKSTATION_SERVICE_URL points at it."""
+
+    def __init__(self, url: str = None, timeout: float = 600):
+        import requests  # Only clients of a running service need it
+
+        self.url = (url or os.getenv("AI_WORKSTATION_SERVICE_URL") or DEFAULT_URL).rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _request(self, method: str, path: str, payload: dict = None, params: dict = None) -> dict:
+        response = self.session.request(method, f"{self.url}/v1{path}", json=payload, params=params,
+                                        timeout=self.timeout)
+        body = response.json()
+        if response.status_code >= 400:
+            raise AgentServiceError(body.get("error", f"HTTP {response.status_code}"))
+        return body
+
+    def health(self) -> bool:
+        try:
+            return self._request("GET", "/health")["ok"]
+        except Exception:
+            return False
+
+    def metrics(self) -> dict:
+        return self._request("GET", "/metrics")
+
+    def open(self, kind: str, provider: str, **context) -> "RemoteAgent":
+        """Remote agent for this context (uploaded collection exports are sent by content)."""
+        if context.get("collections"):
+            context["collections"] = {
+                name: {"content": source.getvalue().decode("utf-8")} if hasattr(source, "getvalue")
+                else {"path": os.path.abspath(source)}
+                for name, source in context["collections"].items()
+            }
+        if context.get("repo_path"):
+            context["repo_path"] = os.path.abspath(context["repo_path"])
+        return RemoteAgent(self, self._request("POST", "/agents", {"kind": kind, "provider": provider,
+                                                                   "context": context}))
+
+    def call(self, handle: str, method: str, *args, priority: str = None, on_partial=None, **kwargs):
+        """
+        Queues a call and long-polls it to completion. `on_partial(item)` gets every partial result
+        as it is published. Returns the result, or raises AgentServiceError.
+        """
+        state = self._request("POST", f"/agents/{handle}/calls",
+                              {"method": method, "args": list(args), "kwargs": kwargs, "priority": priority},
+                              params={"wait": POLL_WAIT_S})
+        seen = 0
+        while True:
+            for item in state["partial"]:
+                if on_partial:
+                    on_partial(item)
+            seen += len(state["partial"])
+            if state["status"] == DONE:
+                return state["result"]
+            if state["status"] in (FAILED, CANCELLED):
+                raise AgentServiceError(f"{state['name']} {state['status']}: {state.get('error') or ''}".strip(": "))
+            state = self._request("GET", f"/requests/{state['id']}", params={"wait": POLL_WAIT_S, "since": seen})
+
+
+class RemoteAgent:
+    """
+    Stands in for an agent hosted by the service: agent methods become queued remote calls.
+    Report helpers of the dependency agent run locally (they only read the Parquet report).
+    """
+
+    def __init__(self, client: AgentServiceClient, session: dict, priority: str = None):
+        self.client = client
+        self.handle = session["handle"]
+        self.kind = session["kind"]
+        self.model = session.get("model")
+        self.reused = session.get("reused", False)
+        self.compaction = session.get("compaction")
+        self.priority = priority  # None: the service's default for each method
+        if self.kind == "deps":
+            self.maven = SimpleNamespace(offline=bool(session.get("offline")))
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def remote_call(*args, **kwargs):
+            kwargs.setdefault("priority", self.priority)
+            return self.client.call(self.handle, name, *args, **kwargs)
+
+        return remote_call
+
+    def fork(self):
+        """Own session (conversation) on the service, sharing this agent's prepared context."""
+        session = self.client._request("POST", f"/agents/{self.handle}/fork")
+        return RemoteAgent(self.client, session, priority=self.priority)
+
+    def close(self):
+        """Releases the session on the service (idle sessions also expire on their own)."""
+        try:
+            self.client._request("DELETE", f"/agents/{self.handle}")
+        except Exception as e:
+            print(f"⚠️ agent-service: Could not close session {self.handle}: {e}")
+
+    # --- DEPENDENCY AGENT ---
+    def iter_dependency_checks(self, repo_path):
+        """Yields (index, total, row) like DependencyInspectorAgent, once the service has checked them all."""
+        rows = self.client.call(self.handle, "check_dependencies", os.path.abspath(repo_path),
+                                offline=self.maven.offline, priority=self.priority)
+        for index, row in enumerate(rows):
+            yield index, len(rows), row
+
+    def check_project_dependencies(self, repo_path, progress_callback=None):
+        import pandas as pd
+
+        def on_partial(item):
+            if progress_callback:
+                progress_callback(item["done"], item["total"], item["row"])
+
+        rows = self.client.call(self.handle, "check_dependencies", os.path.abspath(repo_path),
+                                offline=self.maven.offline, priority=self.priority, on_partial=on_partial)
+        return pd.DataFrame(rows) if rows else pd.DataFrame()
+
+    def _report_helper(self):
+        from src.registry import load_agent_class
+        return load_agent_class("deps")(maven_client=self.maven)  # No network: only the report methods are used
+
+    def drift_matrix(self, report_df):
+        return self._report_helper().drift_matrix(report_df)
+
+    def write_report(self, report_df, directory=None):
+        return self._report_helper().write_report(report_df, directory=directory)
+
+    def interpret_report(self, report_path):
+        return self._report_helper().interpret_report(report_path)
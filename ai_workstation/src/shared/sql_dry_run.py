@@ -0,0 +1,212 @@
+import threading
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.optimizer.scope import traverse_scope
+
+from src.shared.sql_validator import DIALECT, SqlSchema, qualify_against_schema
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# Comparisons that BigQuery can use to prune partitions when one side is the partition column
+PRUNING_PREDICATES = (exp.EQ, exp.GT, exp.GTE, exp.LT, exp.LTE, exp.Between, exp.In)
+
+
+class DryRunEngine:
+    """
+    Offline replica of a BigQuery schema in an in-memory DuckDB database.
+    Queries are transpiled with sqlglot and executed against empty or synthetic tables,
+    so errors, the result schema and the plan are known before anything is billed.
+    """
+
+    def __init__(self, schema: SqlSchema, synthetic_rows: int = 100):
+        if duckdb is None:
+            raise RuntimeError("duckdb is not installed. Run `pip install duckdb` to enable dry runs.")
+        self.schema = schema
+        self.synthetic_rows = synthetic_rows
+        self._lock = threading.Lock()
+        self._conn = duckdb.connect(database=":memory:")
+        self._build_tables()
+
+    # --- REPLICA ---
+    def _build_tables(self):
+        for name, table in self.schema.tables.items():
+            table_sql = exp.to_identifier(name, quoted=True).sql("duckdb")
+            column_defs = ", ".join(
+                f"{exp.to_identifier(col, quoted=True).sql('duckdb')} {dtype.sql('duckdb')}"
+                for col, dtype in table["columns"].items()
+            )
+            self._conn.execute(f"CREATE TABLE {table_sql} ({column_defs})")
+
+            if self.synthetic_rows and table["columns"]:
+                values = ", ".join(self._synthetic_value(dtype) for dtype in table["columns"].values())
+                self._conn.execute(
+                    f"INSERT INTO {table_sql} SELECT {values} FROM range({int(self.synthetic_rows)}) AS r(i)"
+                )
+
+    @staticmethod
+    def _synthetic_value(dtype: exp.DataType) -> str:
+        """Deterministic value per row number `i`; nested types stay NULL."""
+        kind = dtype.this
+        if kind in exp.DataType.INTEGER_TYPES:
+            return "i"
+        if kind in exp.DataType.REAL_TYPES:
+            return f"CAST(i * 1.5 AS {dtype.sql('duckdb')})"
+        if kind in exp.DataType.TEXT_TYPES:
+            return "'value_' || CAST(i AS VARCHAR)"
+        if kind == exp.DataType.Type.BOOLEAN:
+            return "i % 2 = 0"
+        if kind == exp.DataType.Type.DATE:
+            return "DATE '2024-01-01' + CAST(i AS INTEGER)"
+        if kind in exp.DataType.TEMPORAL_TYPES:
+            return f"CAST(TIMESTAMP '2024-01-01' + i * INTERVAL 1 HOUR AS {dtype.sql('duckdb')})"
+        return f"CAST(NULL AS {dtype.sql('duckdb')})"
+
+    # --- DRY RUN ---
+    def run(self, sql: str) -> dict:
+        """
+        Transpiles and executes a (validated) BigQuery query.
+        Returns a report with errors, result schema, plan text and partition-pruning checks.
+        """
+        report = {
+            "ok": False,
+            "error": None,
+            "duckdb_sql": None,
+            "result_schema": [],
+            "row_count": None,
+            "plan": None,
+            "partition_filters": [],
+            "scanned_columns": {},
+        }
+
+        try:
+            query = sqlglot.parse_one(sql, read=DIALECT)
+        except Exception as e:
+            report["error"] = f"Syntax error: {e}"
+            return report
+
+        qualified, errors = qualify_against_schema(query, self.schema)
+        if errors:
+            report["error"] = "; ".join(errors)
+            return report
+
+        report["partition_filters"] = partition_filter_report(qualified, self.schema)
+        report["scanned_columns"] = scanned_columns(qualified, self.schema)
+
+        duckdb_sql = qualified.sql("duckdb")
+        report["duckdb_sql"] = duckdb_sql
+
+        with self._lock:
+            cursor = self._conn.cursor()
+            try:
+                report["result_schema"] = [
+                    (row[0], row[1]) for row in cursor.execute(f"DESCRIBE {duckdb_sql}").fetchall()
+                ]
+                report["plan"] = "\n".join(row[1] for row in cursor.execute(f"EXPLAIN {duckdb_sql}").fetchall())
+                report["row_count"] = len(cursor.execute(duckdb_sql).fetchall())
+                report["ok"] = True
+            except Exception as e:
+                report["error"] = f"Execution error: {e}"
+            finally:
+                cursor.close()
+
+        return report
+
+
+def partition_filter_report(qualified: exp.Expression, schema: SqlSchema) -> list[dict]:
+    """
+    For every scan of a partitioned table, checks whether WHERE / JOIN ON filters the partition column
+    with a constant (the shape BigQuery can prune on). Missing pruning means a full table scan.
+    """
+    findings = []
+    for scope in traverse_scope(qualified):
+        for alias, (_, source) in scope.selected_sources.items():
+            if not isinstance(source, exp.Table) or source.name not in schema.tables:
+                continue
+            partition_by = schema.tables[source.name]["partition_by"]
+            if partition_by is None:
+                continue
+
+            partition_column = partition_by.find(exp.Column)
+            if partition_column is None:
+                continue
+
+            conditions = []
+            where = scope.expression.args.get("where")
+            if where:
+                conditions.append(where.this)
+            for join in scope.expression.args.get("joins") or []:
+                if join.args.get("on"):
+                    conditions.append(join.args["on"])
+
+            pruned = any(
+                _is_pruning_predicate(predicate, alias, partition_column.name, partition_by)
+                for condition in conditions
+                for predicate in condition.find_all(*PRUNING_PREDICATES)
+            )
+            findings.append({
+                "table": source.name,
+                "alias": alias,
+                "partition_by": partition_by.sql(DIALECT),
+                "pruned": pruned,
+            })
+    return findings
+
+
+def _is_pruning_predicate(predicate: exp.Expression, alias: str, column_name: str,
+                          partition_by: exp.Expression) -> bool:
+    # Skip predicates under OR / NOT: they don't restrict the scan on their own
+    parent = predicate.parent
+    while parent is not None and not isinstance(parent, (exp.Where, exp.Join)):
+        if isinstance(parent, (exp.Or, exp.Not)):
+            return False
+        parent = parent.parent
+
+    operands = [predicate.this] + [v for k, v in predicate.args.items() if k != "this" and isinstance(v, exp.Expression)]
+    operands += list(predicate.args.get("expressions") or [])
+
+    column_side = None
+    for operand in operands:
+        if _is_partition_reference(operand, alias, column_name, partition_by):
+            column_side = operand
+            break
+    if column_side is None:
+        return False
+
+    # Every other side must be constant (no columns, no subqueries)
+    others = [o for o in operands if o is not column_side]
+    return bool(others) and all(
+        not o.find(exp.Column) and not o.find(exp.Select) for o in others
+    )
+
+
+def _is_partition_reference(node: exp.Expression, alias: str, column_name: str,
+                            partition_by: exp.Expression) -> bool:
+    """The bare partition column, or the partitioning expression itself (e.g. DATE(order_ts))."""
+    def is_column(n):
+        return isinstance(n, exp.Column) and n.name.lower() == column_name.lower() and n.table in (alias, "")
+
+    if is_column(node):
+        return True
+    if not isinstance(partition_by, exp.Column) and type(node) is type(partition_by):
+        inner = node.find(exp.Column)
+        return inner is not None and is_column(inner)
+    return False
+
+
+def scanned_columns(qualified: exp.Expression, schema: SqlSchema) -> dict:
+    """Top-level columns read per table: BigQuery bills by the columns a query scans."""
+    scanned = {}
+    for scope in traverse_scope(qualified):
+        for column in scope.columns:
+            # alias.column or alias.struct_column.field -> the top-level column is parts[1]
+            parts = [p.name for p in column.parts]
+            if len(parts) < 2:
+                continue
+            source = scope.sources.get(parts[0])
+            if isinstance(source, exp.Table) and source.name in schema.tables:
+                scanned.setdefault(source.name, set()).add(parts[1])
+    return {table: sorted(columns) for table, columns in scanned.items()}
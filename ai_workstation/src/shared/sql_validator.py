@@ -0,0 +1,250 @@
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import OptimizeError, ParseError
+from sqlglot.optimizer.qualify import qualify
+from sqlglot.optimizer.scope import traverse_scope
+
+DIALECT = "bigquery"
+
+# Anything that is not a plain read is rejected, wherever it appears in the tree
+FORBIDDEN_NODES = (exp.Insert, exp.Update, exp.Delete, exp.Merge, exp.Create, exp.Drop,
+                   exp.Alter, exp.Command, exp.TruncateTable)
+
+
+class SqlSchema:
+    """
+    Tables parsed from BigQuery DDL (CREATE TABLE statements).
+    Each table keeps its column types (as sqlglot DataTypes) plus partitioning/clustering info.
+    """
+
+    def __init__(self, tables: dict):
+        # { "my-gcp-project.ecommerce_prod.users": {"columns": {...}, "partition_by": exp | None, "cluster_by": [...]}}
+        self.tables = tables
+
+    def __bool__(self):
+        return bool(self.tables)
+
+    def resolve_table(self, table: exp.Table) -> str | None:
+        """Maps a table reference (full, dataset.table or bare name) to its schema key."""
+        parts = [p.name for p in table.parts]
+        wanted = ".".join(parts).lower()
+        suffix_matches = []
+        for name in self.tables:
+            lowered = name.lower()
+            if lowered == wanted:
+                return name
+            if lowered.endswith("." + wanted):
+                suffix_matches.append(name)
+        # Partial names only count when unambiguous
+        return suffix_matches[0] if len(suffix_matches) == 1 else None
+
+    def mapping(self) -> dict:
+        """Flat {table_key: {column: type_sql}} mapping for sqlglot's MappingSchema."""
+        return {
+            name: {col: dtype.sql(DIALECT) for col, dtype in table["columns"].items()}
+            for name, table in self.tables.items()
+        }
+
+
+def parse_schema(ddl: str) -> SqlSchema:
+    """Parses CREATE TABLE statements. Non-DDL content (e.g. a JSON upload) yields an empty schema."""
+    try:
+        statements = sqlglot.parse(ddl, read=DIALECT)
+    except Exception:
+        return SqlSchema({})
+
+    tables = {}
+    for statement in statements:
+        if not isinstance(statement, exp.Create) or not isinstance(statement.this, exp.Schema):
+            continue
+        table = statement.this.this
+        name = ".".join(p.name for p in table.parts)
+
+        columns = {}
+        for column_def in statement.this.expressions:
+            if isinstance(column_def, exp.ColumnDef) and column_def.args.get("kind"):
+                columns[column_def.name] = column_def.args["kind"]
+
+        partition_by, cluster_by = None, []
+        properties = statement.args.get("properties")
+        for prop in properties.expressions if properties else []:
+            if isinstance(prop, exp.PartitionedByProperty):
+                partition_by = prop.this
+                # `PARTITION BY signup_date` parses as a bare identifier
+                if isinstance(partition_by, exp.Identifier):
+                    partition_by = exp.column(partition_by)
+            elif isinstance(prop, exp.ClusterProperty):
+                cluster_by = [c.sql(DIALECT) for c in prop.expressions]
+
+        tables[name] = {"columns": columns, "partition_by": partition_by, "cluster_by": cluster_by}
+    return SqlSchema(tables)
+
+
+def flatten_tables(query: exp.Expression, schema: SqlSchema) -> tuple[exp.Expression, list[str]]:
+    """
+    Rewrites every known table reference to its single-identifier schema key, keeping
+    the original name as alias so qualified column references still resolve.
+    Returns the rewritten copy and the list of unknown table names.
+    """
+    query = query.copy()
+    cte_names = {cte.alias_or_name.lower() for cte in query.find_all(exp.CTE)}
+    unknown = []
+
+    for table in list(query.find_all(exp.Table)):
+        if not table.name or (not table.db and table.name.lower() in cte_names):
+            continue
+        key = schema.resolve_table(table)
+        if key is None:
+            unknown.append(".".join(p.name for p in table.parts))
+            continue
+        alias = table.alias or table.name
+        table.replace(exp.Table(
+            this=exp.to_identifier(key, quoted=True),
+            alias=exp.TableAlias(this=exp.to_identifier(alias)),
+        ))
+    return query, unknown
+
+
+def validate_query(sql: str, schema: SqlSchema = None) -> tuple[str, list[str]]:
+    """
+    Validates a generated query and pretty-prints it.
+    Checks: single statement, SELECT-only, known tables, known columns and nested STRUCT paths.
+    Returns (formatted_sql, errors); errors is empty when the query is valid.
+    """
+    try:
+        statements = [s for s in sqlglot.parse(sql, read=DIALECT) if s is not None]
+    except ParseError as e:
+        return sql, [f"Syntax error: {e}"]
+
+    if len(statements) != 1:
+        return sql, [f"Expected exactly one statement, found {len(statements)}."]
+
+    query = statements[0]
+    formatted = query.sql(DIALECT, pretty=True)
+
+    # 1. SELECT-ONLY
+    if not isinstance(query, exp.Query):
+        return formatted, [f"Only SELECT queries are allowed (got {query.key.upper()})."]
+    forbidden = next(iter(query.find_all(*FORBIDDEN_NODES)), None)
+    if forbidden is not None:
+        return formatted, [f"Only SELECT queries are allowed ({forbidden.key.upper()} found)."]
+
+    if not schema:
+        return formatted, []
+
+    # 2. TABLES & 3. COLUMNS
+    qualified, errors = qualify_against_schema(query, schema)
+    if errors:
+        return formatted, errors
+
+    # 4. NESTED STRUCT PATHS
+    return formatted, _check_struct_paths(qualified, schema)
+
+
+def qualify_against_schema(query: exp.Expression, schema: SqlSchema) -> tuple[exp.Expression, list[str]]:
+    """
+    Flattens table names and fully qualifies every column against the schema.
+    Returns (qualified_query, errors) for unknown tables or unresolvable columns.
+    """
+    flat_query, unknown_tables = flatten_tables(query, schema)
+    if unknown_tables:
+        return None, [f"Unknown table: `{name}`" for name in unknown_tables]
+
+    try:
+        qualified = qualify(flat_query, schema=schema.mapping(), dialect=DIALECT,
+                            validate_qualify_columns=True, quote_identifiers=False)
+    except OptimizeError as e:
+        return None, [str(e)]
+    except Exception as e:
+        return None, [f"Could not qualify query: {e}"]
+    return qualified, []
+
+
+def _check_struct_paths(qualified: exp.Expression, schema: SqlSchema) -> list[str]:
+    errors = []
+    scope_types = {}  # id(scope) -> source types, outer scopes included (correlated subqueries)
+    for scope in traverse_scope(qualified):
+        source_types = _scope_source_types(scope, schema, scope_types)
+        for column in scope.columns:
+            path = _column_path(column)
+            if len(path) < 3 or path[0] not in source_types:
+                continue
+            error = _check_path(source_types, path)
+            if error:
+                errors.append(error)
+    return list(dict.fromkeys(errors))
+
+
+def _scope_source_types(scope, schema: SqlSchema, cache: dict) -> dict:
+    """
+    Types of the tables and UNNEST aliases visible in `scope`: its own sources on top of those of
+    every enclosing scope, so `UNNEST(o.items) AS x` in a subquery over an outer `o` resolves.
+    """
+    if id(scope) in cache:
+        return cache[id(scope)]
+    source_types = dict(_scope_source_types(scope.parent, schema, cache)) if scope.parent else {}
+    for alias, source in scope.sources.items():
+        if isinstance(source, exp.Table) and source.name in schema.tables:
+            source_types[alias] = schema.tables[source.name]["columns"]
+
+    # UNNEST(alias.array_col) AS x -> x is one element of the array.
+    # qualify() wraps it as a derived source, so `x.field` becomes `_0.x.field`.
+    for unnest in scope.expression.find_all(exp.Unnest):
+        alias = unnest.args.get("alias")
+        columns = alias.columns if alias else []
+        target = unnest.expressions[0] if unnest.expressions else None
+        if not columns or not isinstance(target, exp.Column):
+            continue
+        array_type = _resolve_path(source_types, _column_path(target))
+        if isinstance(array_type, exp.DataType) and array_type.this == exp.DataType.Type.ARRAY:
+            element_type = array_type.expressions[0]
+            source_types[columns[0].name] = element_type
+            if alias.this:
+                source_types[alias.name] = {columns[0].name: element_type}
+    cache[id(scope)] = source_types
+    return source_types
+
+
+def _column_path(column: exp.Column) -> list[str]:
+    path = [p.name for p in column.parts]
+    node = column
+    while isinstance(node.parent, exp.Dot) and node.parent.this is node:
+        node = node.parent
+        path.append(node.expression.name)
+    return path
+
+
+def _struct_fields(dtype) -> dict:
+    if isinstance(dtype, dict):
+        return dtype
+    if isinstance(dtype, exp.DataType) and dtype.this == exp.DataType.Type.STRUCT:
+        return {f.name: f.args.get("kind") for f in dtype.expressions if isinstance(f, exp.ColumnDef)}
+    return None
+
+
+def _resolve_path(source_types: dict, path: list[str]):
+    current = source_types
+    for part in path:
+        fields = _struct_fields(current)
+        if fields is None:
+            return None
+        match = next((v for k, v in fields.items() if k.lower() == part.lower()), None)
+        if match is None:
+            return None
+        current = match
+    return current
+
+
+def _check_path(source_types: dict, path: list[str]) -> str | None:
+    current = source_types
+    for depth, part in enumerate(path):
+        fields = _struct_fields(current)
+        if fields is None:
+            # Not a STRUCT (e.g. an ARRAY that must be UNNESTed first): nothing more to check
+            return None
+        match = next((v for k, v in fields.items() if k.lower() == part.lower()), None)
+        if match is None:
+            # Skip the source alias in the message: `address`, not `u.address`
+            return f"Unknown field `{part}` in `{'.'.join(path[1:depth]) or path[0]}`"
+        current = match
+    return None
@@ -0,0 +1,40 @@
+import os
+
+SHARED_DIR_MODE = 0o2775  # Group-writable; setgid so new files keep the directory's group
+SHARED_FILE_MODE = 0o664
+
+
+def cache_root() -> str:
+    return os.getenv("AI_WORKSTATION_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "ai_workstation")
+
+
+def is_shared_cache() -> bool:
+    """The default root is per-user; a configured AI_WORKSTATION_CACHE_DIR is meant to be shared."""
+    return bool(os.getenv("AI_WORKSTATION_CACHE_DIR"))
+
+
+def get_cache_dir(*parts: str, shared: bool = False) -> str:
+    """
+    Returns (and creates) a directory under the workstation cache root.
+    The root defaults to ~/.cache/ai_workstation and can be moved with
+    the AI_WORKSTATION_CACHE_DIR environment variable (e.g. to a shared path).
+    With `shared`, the root and the directories below it are made group-writable.
+    """
+    root = cache_root()
+    path = os.path.join(root, *parts)
+    os.makedirs(path, exist_ok=True)
+    if shared:
+        directory = root
+        for part in ("",) + parts:
+            directory = os.path.join(directory, part) if part else directory
+            make_group_writable(directory, SHARED_DIR_MODE)
+    return path
+
+
+def make_group_writable(path: str, mode: int = SHARED_FILE_MODE):
+    """Best effort: only the owner can change the mode, and another user may have set it already."""
+    try:
+        if os.stat(path).st_mode & 0o7777 != mode:
+            os.chmod(path, mode)
+    except OSError:
+        pass
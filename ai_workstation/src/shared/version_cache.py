@@ -0,0 +1,83 @@
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+from src.shared.storage import SHARED_FILE_MODE, get_cache_dir, is_shared_cache, make_group_writable
+
+DEFAULT_TTL_HOURS = 24.0
+
+
+class VersionCache:
+    """
+    On-disk cache of latest artifact versions, keyed by "group:artifact".
+    Stores the version, fetch time and ETag. Backed by SQLite (WAL mode), so several processes can
+    use one file. The default location (~/.cache) is per-user; with AI_WORKSTATION_CACHE_DIR pointing
+    at a shared path (or `shared=True`), the directory and database are created group-writable so
+    developers in the same group can share them.
+    """
+
+    def __init__(self, path: str = None, ttl_hours: float = None, shared: bool = None):
+        shared = is_shared_cache() if shared is None else shared
+        self.path = path or os.path.join(get_cache_dir("maven", shared=shared), "versions.sqlite")
+        if ttl_hours is None:
+            ttl_hours = float(os.getenv("MAVEN_CACHE_TTL_HOURS", DEFAULT_TTL_HOURS))
+        self.ttl_seconds = ttl_hours * 3600
+
+        if shared:
+            # The -wal / -shm files SQLite creates next to the database copy its mode, so the
+            # database must be group-writable before the first connection (not chmod-ed after)
+            try:
+                os.close(os.open(self.path, os.O_CREAT | os.O_WRONLY, SHARED_FILE_MODE))
+            except OSError:
+                pass
+            make_group_writable(self.path)
+        with closing(self._connect()) as db, db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS artifacts ("
+                " coordinate TEXT PRIMARY KEY,"
+                " latest_version TEXT NOT NULL,"
+                " etag TEXT,"
+                " fetched_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def key(group: str, name: str) -> str:
+        return f"{group}:{name}"
+
+    def is_fresh(self, entry: dict, now: float = None) -> bool:
+        return ((now or time.time()) - entry["fetched_at"]) < self.ttl_seconds
+
+    def get_many(self, keys) -> dict:
+        """{key: {"latest_version", "etag", "fetched_at"}} for the keys present in the cache."""
+        keys = list(keys)
+        entries = {}
+        with closing(self._connect()) as db:
+            # Chunked to stay under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = db.execute(
+                    f"SELECT coordinate, latest_version, etag, fetched_at FROM artifacts"
+                    f" WHERE coordinate IN ({','.join('?' * len(chunk))})", chunk)
+                for coordinate, latest_version, etag, fetched_at in rows:
+                    entries[coordinate] = {"latest_version": latest_version, "etag": etag, "fetched_at": fetched_at}
+        return entries
+
+    def put_many(self, entries: dict):
+        """Upserts {key: {"latest_version", "etag", "fetched_at"}} in one transaction."""
+        if not entries:
+            return
+        rows = [(k, e["latest_version"], e.get("etag"), e["fetched_at"]) for k, e in entries.items()]
+        with closing(self._connect()) as db, db:
+            db.executemany(
+                "INSERT INTO artifacts (coordinate, latest_version, etag, fetched_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(coordinate) DO UPDATE SET latest_version=excluded.latest_version,"
+                " etag=excluded.etag, fetched_at=excluded.fetched_at", rows)
+
+    def clear(self):
+        with closing(self._connect()) as db, db:
+            db.execute("DELETE FROM artifacts")
@@ -1,12 +1,26 @@
-import sqlglot
-from src.shared.llm_clients import GoogleClient, OllamaClient
+import copy
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from src.shared.llm_clients import create_client
+from src.shared.query_cache import QueryCache
+from src.shared.sql_dry_run import DryRunEngine
+from src.shared.sql_validator import parse_schema, validate_query
 
 
 class BigQueryAgent:
-    def __init__(self, schema_content: str, provider: str):
+    def __init__(self, schema_content: str, provider: str, cache: QueryCache = None, cache_threshold: float = 0.85,
+                 repair_candidates: int = 3, repair_rounds: int = 2):
         # 1. READ SCHEMA
         print(f"📄 sql-agent: Loading schema from content...")
         schema_context = schema_content
+        # Parsed DDL for schema-aware validation (empty for non-DDL uploads -> syntax checks only)
+        self.schema = parse_schema(schema_content)
+        self.repair_candidates = repair_candidates
+        self.repair_rounds = repair_rounds
+        # Candidates generated at once; the agent service sets 1 so a request never exceeds its model slot
+        self.repair_concurrency = repair_candidates
+        self._dry_run = {"engine": None, "lock": threading.Lock()}  # Built on first dry run, shared by forks
 
         # 2. UNIFIED SYSTEM PROMPT (Works for Qwen & Gemini)
         self.system_prompt = f"""
@@ -60,34 +74,134 @@ Return only the SQL query, nothing else.
 """
 
         # 3. CLIENT SELECTION
-        if "google" in provider.lower():
-            self.client = GoogleClient(model_name="gemini-3-flash-preview")
-        else:
-            # Qwen 2.5 Coder 14B is the best local SQL engine for your M4 Pro
-            self.client = OllamaClient(model_name="qwen2.5-coder:14b")
+        # Gemini, Qwen 2.5 Coder 14B (the best local SQL engine for your M4 Pro) or recorded replies
+        self.client = create_client(provider)
 
         self.client.start_session(self.system_prompt)
 
+        # 4. QUESTION CACHE (Scoped to this schema)
+        self.cache = cache or QueryCache(schema_content, namespace="bigquery", threshold=cache_threshold)
+
     def ask(self, user_question: str) -> str:
+        answer = self.answer(user_question)
+        if answer["errors"]:
+            return self._validation_warning(answer["errors"], answer["query"])
+        return answer["query"]
+
+    def answer(self, user_question: str) -> dict:
+        """
+        Structured variant of ask(): {"query", "errors", "source"}.
+        source is "cache", "model" or "repair"; errors is empty when the query validated.
+        """
+        # 0. CACHE (Repeat questions skip the model entirely)
+        cached_sql = self.cache.lookup(user_question, validator=self._is_valid)
+        if cached_sql:
+            return {"query": cached_sql, "errors": [], "source": "cache"}
+
         # 1. GENERATE
         raw_response = self.client.ask(user_question)
 
         # 2. VALIDATE & FORMAT (The safety net)
-        return self._validate_and_format(raw_response)
+        formatted_sql, errors = self.validate(raw_response)
+        source = "model"
+
+        # 3. REPAIR (Parallel candidates, first valid wins)
+        if errors:
+            formatted_sql, errors = self._repair(user_question, raw_response, errors)
+            source = "repair"
+        if errors:
+            return {"query": formatted_sql, "errors": errors, "source": source}
+
+        self.cache.store(user_question, formatted_sql)
+        return {"query": formatted_sql, "errors": [], "source": source}
+
+    def fork(self):
+        """Same schema, cache and replica; independent model session (used for batch runs)."""
+        forked = copy.copy(self)
+        forked.client = self.client.fork()
+        return forked
+
+    def validate(self, raw_text: str) -> tuple[str, list[str]]:
+        """Schema-aware validation. Returns (formatted_sql, errors)."""
+        # Clean markdown formatting
+        clean_sql = raw_text.replace("```sql", "").replace("```", "").strip()
+        return validate_query(clean_sql, self.schema)
+
+    def dry_run(self, sql: str) -> dict:
+        """
+        Executes the query offline against an in-memory DuckDB replica of the schema.
+        Reports execution errors, the result schema, the plan and partition pruning per table.
+        """
+        if not self.schema:
+            return {"ok": False, "error": "Dry runs need a DDL (.sql) schema."}
+        with self._dry_run["lock"]:
+            if self._dry_run["engine"] is None:
+                print("🦆 sql-agent: Building offline replica of the schema...")
+                self._dry_run["engine"] = DryRunEngine(self.schema)
+        return self._dry_run["engine"].run(sql)
+
+    def _is_valid(self, sql: str) -> bool:
+        return not self.validate(sql)[1]
+
+    def _repair(self, user_question: str, bad_sql: str, errors: list[str]) -> tuple[str, list[str]]:
+        """
+        Generates several candidates on forked sessions (`repair_concurrency` at a time) and
+        returns the first one that validates. Bounded by repair_rounds * repair_candidates calls.
+        """
+        for round_number in range(1, self.repair_rounds + 1):
+            print(f"🔁 sql-agent: Repair round {round_number} ({len(errors)} validation errors)...")
+            prompt = self._repair_prompt(user_question, bad_sql, errors)
 
-    def _validate_and_format(self, raw_text: str) -> str:
+            for candidate in self._repair_candidates(prompt):
+                formatted_sql, candidate_errors = self.validate(candidate)
+                if not candidate_errors:
+                    return formatted_sql, []
+                bad_sql, errors = candidate, candidate_errors
+
+        return bad_sql, errors
+
+    def _repair_candidates(self, prompt: str):
+        """Yields candidate answers as they complete; the caller stops pulling once one validates."""
+        if self.repair_concurrency <= 1:
+            for _ in range(self.repair_candidates):
+                try:
+                    yield self.client.fork().ask(prompt)
+                except Exception as e:
+                    print(f"⚠️ sql-agent: Candidate failed: {e}")
+            return
+
+        pool = ThreadPoolExecutor(max_workers=min(self.repair_concurrency, self.repair_candidates))
+        futures = [pool.submit(self.client.fork().ask, prompt) for _ in range(self.repair_candidates)]
         try:
-            # Clean markdown formatting
-            clean_sql = raw_text.replace("```sql", "").replace("```", "").strip()
-
-            # Use SQLGlot to Validate and Format
-            formatted_sql = sqlglot.transpile(
-                clean_sql,
-                read="bigquery",
-                write="bigquery",
-                pretty=True
-            )[0]
-            return formatted_sql
-
-        except Exception as e:
-            return f"⚠️ **Syntax Warning:**\n{e}\n\n```sql\n{raw_text}\n```"
+            for future in as_completed(futures):
+                try:
+                    yield future.result()
+                except Exception as e:
+                    print(f"⚠️ sql-agent: Candidate failed: {e}")
+        finally:
+            # Don't wait for the slower candidates once we have a winner
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _repair_prompt(user_question: str, bad_sql: str, errors: list[str]) -> str:
+        error_list = "\n".join(f"- {e}" for e in errors)
+        return f"""
+The query below failed validation against the schema.
+
+**QUESTION:**
+{user_question}
+
+**QUERY:**
+{bad_sql}
+
+**ERRORS:**
+{error_list}
+
+Fix the query using only tables and columns from the schema.
+Output only the raw SQL query.
+"""
+
+    @staticmethod
+    def _validation_warning(errors: list[str], raw_text: str) -> str:
+        error_list = "\n".join(f"- {e}" for e in errors)
+        return f"⚠️ **Validation Warning:**\n{error_list}\n\n```sql\n{raw_text}\n```"
@@ -1,7 +1,9 @@
 # src/test_agent_logic.py
+import copy
 
+from src.shared.compactor import SourceCompactor
 from src.shared.git_utils import get_staged_files, read_file
-from src.shared.llm_clients import GoogleClient, OllamaClient
+from src.shared.llm_clients import create_client
 
 
 class TestGenAgent:
@@ -63,30 +65,39 @@ No explanations, comments, or additional text outside the class.
 """
 
         # 3. INITIALIZE CLIENT
-        if "google" in provider.lower():
-            self.client = GoogleClient(model_name="gemini-3-flash-preview")
-        else:
-            # Qwen 2.5 Coder is EXCELLENT at writing tests
-            self.client = OllamaClient(model_name="qwen2.5-coder:14b")
+        # Gemini, Qwen 2.5 Coder (EXCELLENT at writing tests) or recorded replies
+        self.client = create_client(provider)
 
         self.client.start_session(system_prompt)
 
     def _gather_code_context(self) -> str:
-        """Reads files without running the linter."""
+        """Reads files without running the linter (compacted: Javadoc kept, trivial accessors summarized)."""
+        self.compaction = []
         files = get_staged_files(self.repo_path)
         if not files:
             return "No staged files found."
 
+        compactor = SourceCompactor("tests")
         report = []
         for f in files:
             content = read_file(self.repo_path, f)
-            report.append(f"=== FILE: {f} ===\n{content}\n")
+            report.append(f"=== FILE: {f} ===\n{compactor.compact(content, f).text}\n")
 
+        self.compaction = compactor.report()
+        summary = compactor.summary()
+        print(f"✂️ test-agent: Compacted {summary['files']} files, {summary['saved_tokens']} tokens saved "
+              f"({summary['saved_pct']}%, {summary['saved_pct_chars']}% by characters)")
         return "\n".join(report)
 
     def ask(self, prompt: str):
         return self.client.ask(prompt)
 
+    def fork(self):
+        """Same prepared context, independent conversation (agents shared between sessions hand out forks)."""
+        forked = copy.copy(self)
+        forked.client = self.client.fork()
+        return forked
+
     def generate_tests(self):
         """Shortcut command to just generate the test file."""
         return self.client.ask("Generate the complete JUnit 5 test class for this code.")